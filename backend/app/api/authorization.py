@@ -0,0 +1,137 @@
+"""资源访问授权
+
+测井、预测的访问权限由其所属项目的所有者决定。Access 以一次联表查询解析
+预测 → 测井 → 项目，并把已加载的对象缓存在 request.state 中，同一请求内
+再次校验或交给服务层时不再重复查询。AsyncAccess 是供 async 端点使用的
+协程版本。
+"""
+
+from typing import Any, Dict, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.security import Principal, get_current_user, get_current_user_async
+from app.crud import (
+    AsyncPredictionCRUD, AsyncProjectCRUD, AsyncWellLogCRUD,
+    PredictionCRUD, ProjectCRUD, WellLogCRUD
+)
+from app.db.session import get_async_db, get_db
+from app.models import Prediction, Project, WellLog
+
+
+class Access:
+    """请求级授权上下文"""
+
+    def __init__(
+        self,
+        request: Request,
+        current_user: Principal = Depends(get_current_user),
+        db: Session = Depends(get_db)
+    ):
+        self.db = db
+        self.user_id, self.role = current_user.id, current_user.role
+        if not hasattr(request.state, "access_cache"):
+            request.state.access_cache = {}
+        self._cache: Dict[Tuple[str, int], Any] = request.state.access_cache
+
+    def _check_owner(self, project: Project) -> None:
+        if self.role != "admin" and project.owner_id != self.user_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="权限不足"
+            )
+
+    def project(self, project_id: int) -> Project:
+        """获取有权访问的项目"""
+        key = ("project", project_id)
+        if key not in self._cache:
+            self._cache[key] = ProjectCRUD.get_by_id(self.db, project_id)
+        project = self._cache[key]
+        if not project:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="项目不存在"
+            )
+        self._check_owner(project)
+        return project
+
+    def log(self, log_id: int) -> Tuple[WellLog, Project]:
+        """获取有权访问的测井及其项目"""
+        key = ("log", log_id)
+        if key not in self._cache:
+            row = WellLogCRUD.get_with_project(self.db, log_id)
+            self._cache[key] = row
+            if row:
+                self._cache[("project", row[1].id)] = row[1]
+        row = self._cache[key]
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="测井数据不存在"
+            )
+        self._check_owner(row[1])
+        return row[0], row[1]
+
+    def prediction(self, prediction_id: int) -> Tuple[Prediction, WellLog, Project]:
+        """获取有权访问的预测及其测井、项目"""
+        key = ("prediction", prediction_id)
+        if key not in self._cache:
+            row = PredictionCRUD.get_with_log_and_project(self.db, prediction_id)
+            self._cache[key] = row
+            if row:
+                self._cache[("log", row[1].id)] = (row[1], row[2])
+                self._cache[("project", row[2].id)] = row[2]
+        row = self._cache[key]
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="预测结果不存在"
+            )
+        self._check_owner(row[2])
+        return row[0], row[1], row[2]
+
+
+class AsyncAccess(Access):
+    """请求级授权上下文（协程版本）
+
+    通过 async_access 依赖创建，避免同步依赖占用线程池。
+    """
+
+    async def project(self, project_id: int) -> Project:
+        """获取有权访问的项目"""
+        key = ("project", project_id)
+        if key not in self._cache:
+            self._cache[key] = await AsyncProjectCRUD.get_by_id(self.db, project_id)
+        return super().project(project_id)
+
+    async def log(self, log_id: int) -> Tuple[WellLog, Project]:
+        """获取有权访问的测井及其项目"""
+        key = ("log", log_id)
+        if key not in self._cache:
+            row = await AsyncWellLogCRUD.get_with_project(self.db, log_id)
+            self._cache[key] = row
+            if row:
+                self._cache[("project", row[1].id)] = row[1]
+        return super().log(log_id)
+
+    async def prediction(self, prediction_id: int) -> Tuple[Prediction, WellLog, Project]:
+        """获取有权访问的预测及其测井、项目"""
+        key = ("prediction", prediction_id)
+        if key not in self._cache:
+            row = await AsyncPredictionCRUD.get_with_log_and_project(self.db, prediction_id)
+            self._cache[key] = row
+            if row:
+                self._cache[("log", row[1].id)] = (row[1], row[2])
+                self._cache[("project", row[2].id)] = row[2]
+        return super().prediction(prediction_id)
+
+
+async def async_access(
+    request: Request,
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+) -> AsyncAccess:
+    """AsyncAccess 依赖"""
+    return AsyncAccess(request, current_user=current_user, db=db)
@@ -0,0 +1,176 @@
+"""响应压缩中间件
+
+按 Accept-Encoding 协商 zstd / br / gzip（按 q 值，q 相同时按
+settings.COMPRESSION_ENCODINGS 的顺序），只压缩不小于
+settings.COMPRESSION_MIN_SIZE 字节、且类型可压缩的响应。
+brotli / zstandard 未安装时对应编码不参与协商。
+"""
+
+import zlib
+from typing import Callable, Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+
+
+# 各编码的压缩级别取偏向速度的值：响应是动态生成的，压缩耗时计入延迟
+def _gzip_compressor():
+    # wbits=31: 带 gzip 头尾
+    return zlib.compressobj(1, zlib.DEFLATED, 31)
+
+
+def _brotli_compressor():
+    import brotli
+
+    class _Brotli:
+        def __init__(self):
+            self._compressor = brotli.Compressor(quality=4)
+
+        def compress(self, data: bytes) -> bytes:
+            return self._compressor.process(data)
+
+        def flush(self) -> bytes:
+            return self._compressor.finish()
+
+    return _Brotli()
+
+
+def _zstd_compressor():
+    import zstandard
+    return zstandard.ZstdCompressor(level=3).compressobj()
+
+
+def _available(module: str) -> bool:
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+def available_encoders() -> Dict[str, Callable]:
+    """当前环境可用的编码 → 压缩器工厂"""
+    encoders = {"gzip": _gzip_compressor}
+    if _available("brotli"):
+        encoders["br"] = _brotli_compressor
+    if _available("zstandard"):
+        encoders["zstd"] = _zstd_compressor
+    return encoders
+
+
+def negotiate(accept_encoding: str, preference: List[str]) -> Optional[str]:
+    """从 Accept-Encoding 中选出编码；无可接受的编码时返回 None"""
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in preference:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressionMiddleware:
+    """协商压缩的 ASGI 中间件，支持流式响应"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        encodings: Optional[List[str]] = None
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoders = available_encoders()
+        self.preference = [e for e in (encodings or ["zstd", "br", "gzip"]) if e in self.encoders]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.preference)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponder(self, encoding)(self.app, scope, receive, send)
+
+
+class _CompressedResponder:
+    """缓冲响应头与第一块响应体，决定是否压缩后再发送"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.start_message: Optional[Message] = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def __call__(self, app: ASGIApp, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await app(scope, receive, self.send_with_compression)
+
+    def _compressible(self, headers: Headers) -> bool:
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    async def send_with_compression(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            if not self._compressible(headers) or (not more_body and len(body) < self.middleware.minimum_size):
+                self.passthrough = True
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+
+            self.compressor = self.middleware.encoders[self.encoding]()
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                # 压缩后的表示与原表示字节不同，强 ETag 降为弱 ETag
+                headers["ETag"] = f"W/{etag}"
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                body = self.compressor.compress(body) + self.compressor.flush()
+                headers["Content-Length"] = str(len(body))
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            await self.send(self.start_message)
+
+        data = self.compressor.compress(body)
+        if not more_body:
+            data += self.compressor.flush()
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
@@ -0,0 +1,90 @@
+"""条件请求（ETag / If-None-Match）
+
+GET 端点根据记录的 id + updated_at（或结果内容的哈希）生成强 ETag，
+在序列化响应体之前比较 If-None-Match，匹配时直接返回 304。
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from fastapi import Request, Response
+
+# 可变数据：客户端可以缓存，但每次使用前须用 ETag 重新验证
+REVALIDATE = "private, no-cache"
+# 不可变数据（按内容寻址的预测结果）：有效期内无需重新验证
+IMMUTABLE = "private, max-age=31536000, immutable"
+
+
+def _part(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return repr(value)
+
+
+def make_etag(*parts: Any) -> str:
+    """由若干组成部分（类型、id、时间戳、内容摘要……）生成强 ETag"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(_part(part).encode("utf-8"))
+        digest.update(b"\x1f")
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def row_version(row: Any) -> tuple:
+    """记录的版本标识：表名、id、updated_at（无则 created_at）"""
+    return (
+        row.__tablename__,
+        row.id,
+        getattr(row, "updated_at", None) or getattr(row, "created_at", None),
+    )
+
+
+def rows_etag(rows: Iterable[Any], *parts: Any) -> str:
+    """一组记录（列表页）的 ETag"""
+    return make_etag(*parts, *(row_version(row) for row in rows))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否与 ETag 匹配（弱比较，支持多个值与 *）"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class Conditional:
+    """当前请求的条件 GET 处理
+
+    端点直接返回 Response（如 ORJSONResponse）时 FastAPI 不会合并注入的
+    response 上的头，须把 headers 传给该响应。
+    """
+
+    def __init__(self, request: Request, response: Response):
+        self.request = request
+        self.response = response
+        self.headers: Dict[str, str] = {}
+
+    def check(self, etag: str, cache_control: str = REVALIDATE) -> Optional[Response]:
+        """设置 ETag / Cache-Control；If-None-Match 匹配时返回 304 响应，否则返回 None"""
+        self.headers = {
+            "ETag": etag,
+            "Cache-Control": cache_control,
+            "Vary": "Authorization",
+        }
+        if etag_matches(self.request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=self.headers)
+        self.response.headers.update(self.headers)
+        return None
+
+
+async def conditional(request: Request, response: Response) -> Conditional:
+    """Conditional 的协程依赖（不占用线程池）"""
+    return Conditional(request, response)
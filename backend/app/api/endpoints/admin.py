@@ -1,94 +1,93 @@
 """管理后台API端点"""
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
-from app.core.security import get_current_user, get_current_admin, SecurityUtility
-from app.crud import UserCRUD, ProjectCRUD, WellLogCRUD, AIModelCRUD, PredictionCRUD
+from app.db.session import get_db, pool_statuses
+from app.core.settings import settings
+from app.api.pagination import PageParams
+from app.core.cache import cached, response_cache
+from app.core.security import get_current_user, get_current_admin, SecurityUtility, password_hasher
+from app.crud import UserCRUD, ProjectCRUD, WellLogCRUD, AIModelCRUD, PredictionCRUD, SystemCounterCRUD
+from app.crud.pagination import count_total
+from app.models import User, Project, AIModel
+from app.services import PredictionService
+from app.services.log_purge_service import log_purger
 
 router = APIRouter(prefix="/api/v1/admin", tags=["admin"])
 
 
 @router.get("/stats")
+@cached("admin_stats:{days}", tags=["stats"], ttl=60)
 def get_system_stats(
+    days: int = Query(30, ge=1, le=365),
     current_user = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    """获取系统统计信息（仅管理员）"""
-    users_count = UserCRUD.count(db)
-    projects_count = ProjectCRUD.count(db)
-    logs_count = WellLogCRUD.count(db)
-    models_count = AIModelCRUD.count(db)
-    predictions_count = PredictionCRUD.count(db)
+    """获取系统统计信息（仅管理员）
+    
+    - **days**: 增长曲线的天数（默认30天）
+    
+    总数来自 CRUD 层维护的系统计数器，增长曲线来自按天计数，
+    查询代价与各表的行数无关。
+    """
+    counters = SystemCounterCRUD.get_all(db)
     
     return {
-        "users": users_count,
-        "projects": projects_count,
-        "logs": logs_count,
-        "models": models_count,
-        "predictions": predictions_count
+        "users": counters["users"],
+        "projects": counters["projects"],
+        "logs": counters["logs"],
+        "models": counters["models"],
+        "predictions": counters["predictions"],
+        "bytes_stored": counters["bytes_stored"],
+        "growth": SystemCounterCRUD.growth(db, days)
     }
 
 
 @router.get("/users")
 def get_all_users(
-    skip: int = 0,
-    limit: int = 10,
+    page: PageParams = Depends(),
     role: str = None,
     status: str = None,
     current_user = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """获取所有用户（仅管理员）"""
-    users = UserCRUD.list_users(db, skip=skip, limit=limit, role=role, status=status)
-    total = UserCRUD.count(db)
+    users = UserCRUD.list_users(
+        db, skip=page.skip, limit=page.limit, role=role, status=status, cursor=page.cursor
+    )
+    total = count_total(db, User, page.count_mode, lambda: UserCRUD.count(db))
     
-    return {
-        "data": users,
-        "total": total,
-        "skip": skip,
-        "limit": limit
-    }
+    return page.response(users, total)
 
 
 @router.get("/projects")
 def get_all_projects(
-    skip: int = 0,
-    limit: int = 10,
+    page: PageParams = Depends(),
     status: str = None,
     current_user = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """获取所有项目（仅管理员）"""
-    projects = ProjectCRUD.list_projects(db, skip=skip, limit=limit, status=status)
-    total = ProjectCRUD.count(db)
+    projects = ProjectCRUD.list_projects(
+        db, skip=page.skip, limit=page.limit, status=status, cursor=page.cursor
+    )
+    total = count_total(db, Project, page.count_mode, lambda: ProjectCRUD.count(db))
     
-    return {
-        "data": projects,
-        "total": total,
-        "skip": skip,
-        "limit": limit
-    }
+    return page.response(projects, total)
 
 
 @router.get("/models")
 def get_all_models(
-    skip: int = 0,
-    limit: int = 10,
+    page: PageParams = Depends(),
     current_user = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """获取所有AI模型（仅管理员）"""
-    models = AIModelCRUD.list_models(db, skip=skip, limit=limit)
-    total = AIModelCRUD.count(db)
+    models = AIModelCRUD.list_models(db, skip=page.skip, limit=page.limit, cursor=page.cursor)
+    total = count_total(db, AIModel, page.count_mode, lambda: AIModelCRUD.count(db))
     
-    return {
-        "data": models,
-        "total": total,
-        "skip": skip,
-        "limit": limit
-    }
+    return page.response(models, total)
 
 
 @router.post("/models")
@@ -131,6 +130,56 @@ def create_ai_model(
         )
 
 
+@router.get("/models/{model_id}/stats")
+def get_model_stats(
+    model_id: int,
+    current_user = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """获取模型预测统计：数量、平均值、耗时百分位和失败率（仅管理员）"""
+    result = PredictionService.get_model_statistics(db, model_id)
+    
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND if result.get("error") == "model_not_found"
+            else status.HTTP_400_BAD_REQUEST,
+            detail=result.get("message")
+        )
+    
+    return result.get("statistics")
+
+
+@router.get("/models/{model_id}/history")
+def get_model_history(
+    model_id: int,
+    hours: int = Query(24, ge=1, le=24 * 30),
+    bucket_minutes: int = Query(60, ge=1, le=24 * 60),
+    current_user = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """获取模型按时间分桶的预测历史（仅管理员）
+    
+    - **hours**: 统计最近多少小时（最多30天）
+    - **bucket_minutes**: 分桶间隔（分钟，最多1天；分桶数不超过720）
+    """
+    result = PredictionService.get_model_history(
+        db, model_id, hours=hours, bucket_minutes=bucket_minutes
+    )
+    
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND if result.get("error") == "model_not_found"
+            else status.HTTP_400_BAD_REQUEST,
+            detail=result.get("message")
+        )
+    
+    return {
+        "model_id": model_id,
+        "bucket_minutes": bucket_minutes,
+        "history": result.get("history")
+    }
+
+
 @router.get("/health")
 def system_health(
     current_user = Depends(get_current_admin),
@@ -147,10 +196,43 @@ def system_health(
     return {
         "status": "ok",
         "database": db_status,
+        "password_hasher": password_hasher.stats(),
+        "response_cache": response_cache.stats(),
         "timestamp": __import__("datetime").datetime.utcnow().isoformat()
     }
 
 
+@router.get("/db/pool")
+def database_pool_status(
+    current_user = Depends(get_current_admin)
+):
+    """获取数据库连接池状态（仅管理员）
+    
+    返回本工作进程内各引擎的连接占用、溢出连接数、获取连接的等待耗时，
+    以及饱和度（已借出连接 / 连接上限）。
+    """
+    pools = pool_statuses()
+    
+    return {
+        "workers": settings.WORKERS,
+        "saturation": max((p.get("saturation", 0.0) for p in pools), default=0.0),
+        "pools": pools
+    }
+
+
+@router.get("/purges")
+def log_purge_status(
+    current_user = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """获取测井后台清除进度（仅管理员）
+    
+    返回全部已删除、等待清除曲线数据的测井，附带认领的清除进程、
+    已删除的曲线数据点数、批次数和最近一批的时间（各工作进程共享）。
+    """
+    return log_purger.status(db)
+
+
 @router.post("/users/{user_id}/reset-password")
 def reset_user_password(
     user_id: int,
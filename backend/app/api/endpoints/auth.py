@@ -1,16 +1,17 @@
 """认证API端点"""
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import timedelta
 
-from app.db.session import get_db
+from app.db.session import get_async_db, get_db
 from app.schemas import (
     UserCreate, UserResponse, TokenResponse, 
     LoginRequest, RefreshTokenRequest
 )
-from app.crud import UserCRUD
-from app.core.security import SecurityUtility, get_current_user
+from app.crud import AsyncUserCRUD, UserCRUD
+from app.core.security import PasswordHasherBusy, SecurityUtility, get_current_user, token_keys
 from app.core.settings import settings
 
 router = APIRouter(prefix="/api/v1/auth", tags=["auth"])
@@ -48,6 +49,8 @@ def register(
     try:
         new_user = UserCRUD.create(db, user_data)
         return new_user
+    except PasswordHasherBusy:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -56,19 +59,22 @@ def register(
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(
+async def login(
     login_data: LoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """用户登录
     
     - **username**: 用户名或邮箱
     - **password**: 密码
+    
+    bcrypt 在密码哈希线程池中执行，等待期间不占用请求线程；
+    等待中的密码操作过多时返回 503。
     """
     # 通过用户名或邮箱获取用户
-    user = UserCRUD.get_by_username(db, login_data.username)
+    user = await AsyncUserCRUD.get_by_username(db, login_data.username)
     if not user:
-        user = UserCRUD.get_by_email(db, login_data.username)
+        user = await AsyncUserCRUD.get_by_email(db, login_data.username)
     
     if not user:
         raise HTTPException(
@@ -77,7 +83,10 @@ def login(
         )
     
     # 验证密码
-    if not SecurityUtility.verify_password(login_data.password, user.password_hash):
+    valid, new_hash = await SecurityUtility.verify_and_update_password_async(
+        login_data.password, user.password_hash
+    )
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="密码错误"
@@ -90,10 +99,15 @@ def login(
             detail="账户已被禁用"
         )
     
+    # 哈希参数已过时则按当前参数重新哈希
+    if new_hash:
+        user.password_hash = new_hash
+        await db.commit()
+    
     # 生成令牌
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = SecurityUtility.create_access_token(
-        data={"sub": str(user.id), "role": user.role},
+        data={"sub": str(user.id), "username": user.username, "role": user.role},
         expires_delta=access_token_expires
     )
     
@@ -139,7 +153,7 @@ def refresh_token(
     # 生成新的访问令牌
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = SecurityUtility.create_access_token(
-        data={"sub": str(user.id), "role": user.role},
+        data={"sub": str(user.id), "username": user.username, "role": user.role},
         expires_delta=access_token_expires
     )
     
@@ -165,3 +179,21 @@ def verify_token(
         "username": current_user.username,
         "role": current_user.role
     }
+
+
+@router.get("/public-key")
+def get_public_key():
+    """获取令牌验证公钥
+    
+    使用 RS256/EdDSA 等非对称算法时，其他服务可用该公钥离线验证访问令牌
+    """
+    if token_keys.public_pem is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="当前令牌算法不使用公钥"
+        )
+    
+    return {
+        "algorithm": token_keys.algorithm,
+        "public_key": token_keys.public_pem
+    }
@@ -1,87 +1,79 @@
 """数据管理API端点"""
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Response, status, UploadFile, File
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import json
 
-from app.db.session import get_db
+from app.db.session import get_async_db, get_db
+from app.api.authorization import Access, AsyncAccess, async_access
+from app.api.pagination import PageParams, page_params
+from app.api.conditional import Conditional, conditional, make_etag, row_version, rows_etag
+from app.api.responses import ORJSONResponse
 from app.schemas import (
     WellLogResponse, WellLogCreate, WellLogUpdate, 
     WellLogListResponse, CurveDataResponse
 )
-from app.crud import WellLogCRUD, CurveDataCRUD, ProjectCRUD
+from app.crud import WellLogCRUD, CurveDataCRUD, AsyncWellLogCRUD, AsyncCurveDataCRUD
+from app.crud.pagination import count_total_async
+from app.models import QualityFlag, WellLog
 from app.core.security import get_current_user, get_current_admin, SecurityUtility
 from app.services import DataService
+from app.services.log_purge_service import log_purger
 
 router = APIRouter(prefix="/api/v1/data", tags=["data"])
 
 
 @router.get("/logs", response_model=WellLogListResponse)
-def list_logs(
-    skip: int = 0,
-    limit: int = 10,
+async def list_logs(
+    page: PageParams = Depends(page_params),
     project_id: int = None,
-    current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    access: AsyncAccess = Depends(async_access),
+    cond: Conditional = Depends(conditional),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """列出测井数据
     
     - **skip**: 跳过的记录数
     - **limit**: 返回的记录数
+    - **cursor**: 上一页返回的 next_cursor（可选，游标分页）
+    - **count_mode**: 总数统计方式 exact / estimate / none
     - **project_id**: 项目ID（可选，筛选特定项目）
     """
     if project_id:
-        project = ProjectCRUD.get_by_id(db, project_id)
-        if not project:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="项目不存在"
-            )
-        
         # 权限检查
-        if project.owner_id != current_user.id and current_user.role != "admin":
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="权限不足"
-            )
+        await access.project(project_id)
         
-        logs = WellLogCRUD.get_by_project(db, project_id, skip=skip, limit=limit)
-        total = WellLogCRUD.count_by_project(db, project_id)
+        logs = await AsyncWellLogCRUD.get_by_project(
+            db, project_id, skip=page.skip, limit=page.limit, cursor=page.cursor
+        )
+        total = await count_total_async(
+            db, WellLog, page.count_mode,
+            lambda: AsyncWellLogCRUD.count_by_project(db, project_id), filtered=True
+        )
     else:
-        logs = WellLogCRUD.list_logs(db, skip=skip, limit=limit)
-        total = WellLogCRUD.count(db)
+        logs = await AsyncWellLogCRUD.list_logs(db, skip=page.skip, limit=page.limit, cursor=page.cursor)
+        total = await count_total_async(db, WellLog, page.count_mode, lambda: AsyncWellLogCRUD.count(db))
     
-    return {
-        "data": logs,
-        "total": total,
-        "skip": skip,
-        "limit": limit
-    }
+    not_modified = cond.check(rows_etag(logs, total))
+    if not_modified:
+        return not_modified
+    return page.response(logs, total)
 
 
 @router.get("/logs/{log_id}", response_model=WellLogResponse)
-def get_log(
+async def get_log(
     log_id: int,
-    current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    access: AsyncAccess = Depends(async_access),
+    cond: Conditional = Depends(conditional)
 ):
-    """获取测井数据详情"""
-    log = WellLogCRUD.get_by_id(db, log_id)
-    
-    if not log:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="测井数据不存在"
-        )
-    
-    # 权限检查
-    project = ProjectCRUD.get_by_id(db, log.project_id)
-    if project.owner_id != current_user.id and current_user.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="权限不足"
-        )
+    """获取测井数据详情（支持 If-None-Match）"""
+    # 权限检查（测井、项目一次查询加载）
+    log, project = await access.log(log_id)
     
+    not_modified = cond.check(make_etag(*row_version(log)))
+    if not_modified:
+        return not_modified
     return log
 
 
@@ -89,7 +81,7 @@ def get_log(
 def create_log(
     project_id: int,
     log_data: WellLogCreate,
-    current_user = Depends(get_current_user),
+    access: Access = Depends(),
     db: Session = Depends(get_db)
 ):
     """上传新的测井数据
@@ -103,22 +95,11 @@ def create_log(
     - **sample_count**: 样本数
     - **curves_json**: 曲线数据（JSON格式）
     """
-    project = ProjectCRUD.get_by_id(db, project_id)
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="项目不存在"
-        )
-    
     # 权限检查
-    if project.owner_id != current_user.id and current_user.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="权限不足"
-        )
+    project = access.project(project_id)
     
     # 使用服务层创建测井数据
-    result = DataService.upload_well_log(db, project_id, log_data)
+    result = DataService.upload_well_log(db, project_id, log_data, project=project)
     
     if not result.get("success"):
         raise HTTPException(
@@ -133,24 +114,12 @@ def create_log(
 def update_log(
     log_id: int,
     log_update: WellLogUpdate,
-    current_user = Depends(get_current_user),
+    access: Access = Depends(),
     db: Session = Depends(get_db)
 ):
     """更新测井数据"""
-    log = WellLogCRUD.get_by_id(db, log_id)
-    if not log:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="测井数据不存在"
-        )
-    
-    # 权限检查
-    project = ProjectCRUD.get_by_id(db, log.project_id)
-    if project.owner_id != current_user.id and current_user.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="权限不足"
-        )
+    # 权限检查（测井、项目一次查询加载）
+    log, project = access.log(log_id)
     
     updated_log = WellLogCRUD.update(db, log_id, log_update)
     return updated_log
@@ -159,27 +128,19 @@ def update_log(
 @router.delete("/logs/{log_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_log(
     log_id: int,
-    current_user = Depends(get_current_user),
+    access: Access = Depends(),
     db: Session = Depends(get_db)
 ):
-    """删除测井数据"""
-    log = WellLogCRUD.get_by_id(db, log_id)
-    if not log:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="测井数据不存在"
-        )
+    """删除测井数据
     
-    # 权限检查
-    project = ProjectCRUD.get_by_id(db, log.project_id)
-    if project.owner_id != current_user.id and current_user.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="权限不足"
-        )
+    曲线数据量大的测井立即对所有查询不可见，曲线数据在后台分批清除，
+    此时返回 202（进度见 /api/v1/admin/purges）。
+    """
+    # 权限检查（测井、项目一次查询加载）
+    log, project = access.log(log_id)
     
     # 使用服务层删除（级联删除相关数据）
-    result = DataService.delete_log_with_data(db, log_id)
+    result = DataService.delete_log_with_data(db, log_id, log=log)
     
     if not result.get("success"):
         raise HTTPException(
@@ -187,58 +148,68 @@ def delete_log(
             detail=result.get("message")
         )
     
+    if result.get("scheduled"):
+        log_purger.wake()
+        return Response(status_code=status.HTTP_202_ACCEPTED)
+    
     return None
 
 
-@router.get("/logs/{log_id}/curves")
-def get_log_curves(
+@router.get("/logs/{log_id}/curves", response_class=ORJSONResponse)
+async def get_log_curves(
     log_id: int,
     depth_from: float = None,
     depth_to: float = None,
     curve_name: str = None,
-    current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    access: AsyncAccess = Depends(async_access),
+    cond: Conditional = Depends(conditional),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取测井的曲线数据
     
     - **depth_from**: 深度起点（可选）
     - **depth_to**: 深度终点（可选）
     - **curve_name**: 曲线名称（可选）
-    """
-    log = WellLogCRUD.get_by_id(db, log_id)
-    if not log:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="测井数据不存在"
-        )
     
-    # 权限检查
-    project = ProjectCRUD.get_by_id(db, log.project_id)
-    if project.owner_id != current_user.id and current_user.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="权限不足"
-        )
+    ETag 为曲线数据内容的哈希，If-None-Match 匹配时返回 304。
+    """
+    # 权限检查（测井、项目一次查询加载）
+    log, project = await access.log(log_id)
     
     if curve_name:
-        curves = CurveDataCRUD.get_by_curve_name(db, log_id, curve_name)
+        curves = await AsyncCurveDataCRUD.get_by_curve_name(db, log_id, curve_name)
     elif depth_from is not None and depth_to is not None:
-        curves = CurveDataCRUD.get_by_log_and_depth(db, log_id, depth_from, depth_to)
+        curves = await AsyncCurveDataCRUD.get_by_log_and_depth(db, log_id, depth_from, depth_to)
     else:
         curves = []
     
-    return {
+    not_modified = cond.check(make_etag(
+        log_id, *((c.id, c.curve_name, c.depth, c.value, c.quality_flag) for c in curves)
+    ))
+    if not_modified:
+        return not_modified
+    return ORJSONResponse({
         "log_id": log_id,
         "curve_count": len(curves),
-        "curves": curves
-    }
+        "curves": [
+            {
+                "id": c.id,
+                "log_id": c.log_id,
+                "curve_name": c.curve_name,
+                "depth": c.depth,
+                "value": c.value,
+                "quality_flag": c.quality_flag
+            }
+            for c in curves
+        ]
+    }, headers=cond.headers)
 
 
 @router.post("/logs/{log_id}/curves")
 def add_curve_data(
     log_id: int,
     curve_data: dict,
-    current_user = Depends(get_current_user),
+    access: Access = Depends(),
     db: Session = Depends(get_db)
 ):
     """添加曲线数据点
@@ -246,21 +217,17 @@ def add_curve_data(
     - **curve_name**: 曲线名称
     - **depth**: 深度
     - **value**: 数值
-    - **quality_flag**: 质量标志
+    - **quality_flag**: 质量标志（位掩码或名称：good / suspect / bad / interpolated / missing）
     """
-    log = WellLogCRUD.get_by_id(db, log_id)
-    if not log:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="测井数据不存在"
-        )
+    # 权限检查（测井、项目一次查询加载）
+    log, project = access.log(log_id)
     
-    # 权限检查
-    project = ProjectCRUD.get_by_id(db, log.project_id)
-    if project.owner_id != current_user.id and current_user.role != "admin":
+    try:
+        quality_flag = QualityFlag.parse(curve_data.get("quality_flag", "good"))
+    except (TypeError, ValueError):
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="权限不足"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="质量标志无效（应为位掩码或 good / suspect / bad / interpolated / missing）"
         )
     
     try:
@@ -269,7 +236,7 @@ def add_curve_data(
             curve_data["curve_name"],
             curve_data["depth"],
             curve_data["value"],
-            curve_data.get("quality_flag", "good"),
+            quality_flag,
             log_id
         )
         return {
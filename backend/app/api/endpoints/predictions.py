@@ -1,115 +1,145 @@
 """预测管理API端点"""
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime
 import json
 
-from app.db.session import get_db
+from app.db.session import get_async_db, get_db
+from app.api.authorization import Access, AsyncAccess, async_access
+from app.api.pagination import PageParams, page_params
+from app.api.responses import ORJSONResponse
+from app.api.conditional import (
+    IMMUTABLE, Conditional, conditional, make_etag, row_version, rows_etag
+)
 from app.schemas import (
     PredictionResponse, PredictionCreate, PredictionUpdate,
-    PredictionListResponse
+    PredictionListResponse, PredictionRunRequest
 )
-from app.crud import PredictionCRUD, WellLogCRUD, AIModelCRUD, ProjectCRUD
-from app.core.security import get_current_user, get_current_admin, SecurityUtility
+from app.crud import PredictionCRUD, AIModelCRUD, AsyncPredictionCRUD
+from app.crud.pagination import count_total_async
+from app.models import Prediction
+from app.core.security import get_current_user, get_current_user_async, get_current_admin, SecurityUtility
 from app.services import PredictionService
 
 router = APIRouter(prefix="/api/v1/predictions", tags=["predictions"])
 
 
 @router.get("", response_model=PredictionListResponse)
-def list_predictions(
-    skip: int = 0,
-    limit: int = 10,
+async def list_predictions(
+    page: PageParams = Depends(page_params),
     log_id: int = None,
     model_id: int = None,
-    current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user = Depends(get_current_user_async),
+    cond: Conditional = Depends(conditional),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """列出预测结果
     
     - **skip**: 跳过的记录数
     - **limit**: 返回的记录数
+    - **cursor**: 上一页返回的 next_cursor（可选，游标分页）
+    - **count_mode**: 总数统计方式 exact / estimate / none
     - **log_id**: 测井ID（可选）
     - **model_id**: 模型ID（可选）
     """
     if log_id:
-        predictions = PredictionCRUD.get_by_log(db, log_id, skip=skip, limit=limit)
-        total = PredictionCRUD.count_by_log(db, log_id)
+        predictions = await AsyncPredictionCRUD.get_by_log(
+            db, log_id, skip=page.skip, limit=page.limit, cursor=page.cursor
+        )
+        total = await count_total_async(
+            db, Prediction, page.count_mode,
+            lambda: AsyncPredictionCRUD.count_by_log(db, log_id), filtered=True
+        )
     elif model_id:
-        predictions = PredictionCRUD.get_by_model(db, model_id, skip=skip, limit=limit)
-        total = PredictionCRUD.count_by_model(db, model_id)
+        predictions = await AsyncPredictionCRUD.get_by_model(
+            db, model_id, skip=page.skip, limit=page.limit, cursor=page.cursor
+        )
+        total = await count_total_async(
+            db, Prediction, page.count_mode,
+            lambda: AsyncPredictionCRUD.count_by_model(db, model_id), filtered=True
+        )
     else:
-        predictions = PredictionCRUD.list_predictions(db, skip=skip, limit=limit)
-        total = PredictionCRUD.count(db)
+        predictions = await AsyncPredictionCRUD.list_predictions(
+            db, skip=page.skip, limit=page.limit, cursor=page.cursor
+        )
+        total = await count_total_async(db, Prediction, page.count_mode, lambda: AsyncPredictionCRUD.count(db))
     
-    return {
-        "data": predictions,
-        "total": total,
-        "skip": skip,
-        "limit": limit
-    }
+    not_modified = cond.check(rows_etag(predictions, total))
+    if not_modified:
+        return not_modified
+    return page.response(predictions, total)
 
 
 @router.get("/{prediction_id}", response_model=PredictionResponse)
-def get_prediction(
+async def get_prediction(
     prediction_id: int,
-    current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    access: AsyncAccess = Depends(async_access),
+    cond: Conditional = Depends(conditional)
 ):
-    """获取预测结果详情"""
-    prediction = PredictionCRUD.get_by_id(db, prediction_id)
-    
-    if not prediction:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="预测结果不存在"
-        )
-    
-    # 权限检查
-    log = WellLogCRUD.get_by_id(db, prediction.log_id)
-    project = ProjectCRUD.get_by_id(db, log.project_id)
-    
-    if project.owner_id != current_user.id and current_user.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="权限不足"
-        )
+    """获取预测结果详情（支持 If-None-Match）"""
+    # 权限检查（预测、测井、项目一次查询加载）
+    prediction, log, project = await access.prediction(prediction_id)
     
+    not_modified = cond.check(make_etag(*row_version(prediction)))
+    if not_modified:
+        return not_modified
     return prediction
 
 
 @router.post("", response_model=PredictionResponse, status_code=status.HTTP_201_CREATED)
 def create_prediction(
     prediction_data: PredictionCreate,
-    current_user = Depends(get_current_user),
+    access: Access = Depends(),
     db: Session = Depends(get_db)
 ):
     """创建新的预测任务
     
     - **log_id**: 测井数据ID
     - **model_id**: AI模型ID
-    - **results_json**: 预测结果（JSON格式）
+    - **results_json**: 预测结果，{"depths": [...], "curves": {曲线名: [...]}} 或 {曲线名: [...]}，
+      写入结果存储；格式无效时返回 400
     - **confidence**: 置信度（0-1）
     - **execution_time**: 执行时间（秒）
     """
     # 权限检查
-    log = WellLogCRUD.get_by_id(db, prediction_data.log_id)
-    if not log:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="测井数据不存在"
-        )
+    log, project = access.log(prediction_data.log_id)
+    
+    # 使用服务层创建预测
+    result = PredictionService.create_prediction(db, prediction_data, log=log)
     
-    project = ProjectCRUD.get_by_id(db, log.project_id)
-    if project.owner_id != current_user.id and current_user.role != "admin":
+    if not result.get("success"):
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="权限不足"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=result.get("message")
         )
     
-    # 使用服务层创建预测
-    result = PredictionService.create_prediction(db, prediction_data)
+    return result.get("prediction")
+
+
+@router.post("/run", response_model=PredictionResponse, status_code=status.HTTP_201_CREATED)
+def run_prediction(
+    run_request: PredictionRunRequest,
+    access: Access = Depends(),
+    db: Session = Depends(get_db)
+):
+    """在服务端对整条测井运行模型推理
+    
+    - **log_id**: 测井数据ID
+    - **model_id**: AI模型ID
+    - **parameters**: 推理参数（可选：window_size, batch_size 为正整数，overlap 为非负整数，
+      curves, output_curves 为曲线名列表；无效时返回 400）
+    - **use_cache**: 是否复用相同输入的已有结果（默认是）
+    """
+    # 权限检查
+    log, project = access.log(run_request.log_id)
+    
+    # 使用服务层执行推理
+    result = PredictionService.run_prediction(
+        db, run_request.log_id, run_request.model_id, run_request.parameters,
+        use_cache=run_request.use_cache, log=log
+    )
     
     if not result.get("success"):
         raise HTTPException(
@@ -153,39 +183,78 @@ def delete_prediction(
             detail="预测结果不存在"
         )
     
-    PredictionCRUD.delete(db, prediction_id)
+    # 使用服务层删除（同时释放不再被引用的结果文件）
+    PredictionService.delete_prediction(db, prediction_id)
     return None
 
 
-@router.post("/{prediction_id}/rerun")
-def rerun_prediction(
+@router.get("/{prediction_id}/results", response_class=ORJSONResponse)
+def get_prediction_results(
     prediction_id: int,
-    current_user = Depends(get_current_user),
+    depth_from: float = None,
+    depth_to: float = None,
+    curves: str = None,
+    access: Access = Depends(),
+    cond: Conditional = Depends(conditional),
     db: Session = Depends(get_db)
 ):
-    """重新运行预测
+    """获取预测曲线结果
     
-    这个端点会创建一个新的预测任务，基于已有预测的参数。
+    - **depth_from**: 深度起点（可选）
+    - **depth_to**: 深度终点（可选）
+    - **curves**: 逗号分隔的曲线名称（可选）
+    
+    只解码与深度窗口相交的数据块。结果存储中的结果按内容寻址、不会改变，
+    因此以 result_key 为 ETag 并允许客户端长期缓存；If-None-Match 匹配时
+    不读取结果文件，直接返回 304。
     """
-    prediction = PredictionCRUD.get_by_id(db, prediction_id)
-    if not prediction:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="预测结果不存在"
-        )
+    # 权限检查（预测、测井、项目一次查询加载）
+    prediction, log, project = access.prediction(prediction_id)
     
-    # 权限检查
-    log = WellLogCRUD.get_by_id(db, prediction.log_id)
-    project = ProjectCRUD.get_by_id(db, log.project_id)
+    curve_list = [c.strip() for c in curves.split(",") if c.strip()] if curves else None
+    if prediction.result_key:
+        not_modified = cond.check(
+            make_etag(prediction.result_key, depth_from, depth_to, curve_list), IMMUTABLE
+        )
+    else:
+        not_modified = cond.check(make_etag(*row_version(prediction), depth_from, depth_to, curve_list))
+    if not_modified:
+        return not_modified
+    result = PredictionService.get_prediction_details(
+        db, prediction_id, depth_from=depth_from, depth_to=depth_to, curves=curve_list,
+        prediction=prediction, log=log, as_arrays=True
+    )
     
-    if project.owner_id != current_user.id and current_user.role != "admin":
+    if not result.get("success"):
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="权限不足"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=result.get("message")
         )
     
+    details = result.get("prediction")
+    return ORJSONResponse({
+        "prediction_id": prediction_id,
+        "depth_from": depth_from if depth_from is not None else details["depth_from"],
+        "depth_to": depth_to if depth_to is not None else details["depth_to"],
+        "results": details["results"]
+    }, headers=cond.headers)
+
+
+@router.post("/{prediction_id}/rerun")
+def rerun_prediction(
+    prediction_id: int,
+    access: Access = Depends(),
+    db: Session = Depends(get_db)
+):
+    """重新运行预测
+    
+    这个端点会创建一个新的预测任务，基于已有预测的参数。
+    """
+    # 权限检查（预测、测井、项目一次查询加载）
+    prediction, log, project = access.prediction(prediction_id)
+    
     # 使用服务层重新运行预测
-    result = PredictionService.rerun_prediction(db, prediction_id)
+    result = PredictionService.rerun_prediction(db, prediction_id, prediction=prediction, log=log)
     
     if not result.get("success"):
         raise HTTPException(
@@ -203,29 +272,19 @@ def rerun_prediction(
 @router.get("/{prediction_id}/stats")
 def get_prediction_stats(
     prediction_id: int,
-    current_user = Depends(get_current_user),
+    access: Access = Depends(),
+    cond: Conditional = Depends(conditional),
     db: Session = Depends(get_db)
 ):
     """获取预测统计信息"""
-    prediction = PredictionCRUD.get_by_id(db, prediction_id)
-    if not prediction:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="预测结果不存在"
-        )
-    
-    # 权限检查
-    log = WellLogCRUD.get_by_id(db, prediction.log_id)
-    project = ProjectCRUD.get_by_id(db, log.project_id)
-    
-    if project.owner_id != current_user.id and current_user.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="权限不足"
-        )
+    # 权限检查（预测、测井、项目一次查询加载）
+    prediction, log, project = access.prediction(prediction_id)
     
     model = AIModelCRUD.get_by_id(db, prediction.model_id)
     
+    not_modified = cond.check(make_etag(*row_version(prediction), *row_version(model)))
+    if not_modified:
+        return not_modified
     return {
         "prediction_id": prediction_id,
         "log_id": prediction.log_id,
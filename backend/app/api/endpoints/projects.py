@@ -1,23 +1,26 @@
 """项目管理API端点"""
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 
 from app.db.session import get_db
+from app.api.pagination import PageParams
 from app.schemas import (
     ProjectCreate, ProjectResponse, ProjectUpdate, ProjectListResponse
 )
 from app.crud import ProjectCRUD
+from app.crud.pagination import count_total
+from app.models import Project
 from app.core.security import get_current_user, get_current_admin, SecurityUtility
 from app.services import ProjectService
+from app.services.log_purge_service import log_purger
 
 router = APIRouter(prefix="/api/v1/projects", tags=["projects"])
 
 
 @router.get("", response_model=ProjectListResponse)
 def list_projects(
-    skip: int = 0,
-    limit: int = 10,
+    page: PageParams = Depends(),
     status: str = None,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -26,36 +29,37 @@ def list_projects(
     
     - **skip**: 跳过的记录数
     - **limit**: 返回的记录数
+    - **cursor**: 上一页返回的 next_cursor（可选，游标分页）
+    - **count_mode**: 总数统计方式 exact / estimate / none
     - **status**: 筛选状态（可选）
     """
-    projects = ProjectCRUD.list_projects(db, skip=skip, limit=limit, status=status)
-    total = ProjectCRUD.count(db)
+    projects = ProjectCRUD.list_projects(
+        db, skip=page.skip, limit=page.limit, status=status, cursor=page.cursor
+    )
+    total = count_total(
+        db, Project, page.count_mode,
+        lambda: ProjectCRUD.count(db, status=status), filtered=bool(status)
+    )
     
-    return {
-        "data": projects,
-        "total": total,
-        "skip": skip,
-        "limit": limit
-    }
+    return page.response(projects, total)
 
 
 @router.get("/my-projects", response_model=ProjectListResponse)
 def get_my_projects(
-    skip: int = 0,
-    limit: int = 10,
+    page: PageParams = Depends(),
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """获取当前用户的项目"""
-    projects = ProjectCRUD.get_by_owner(db, current_user.id, skip=skip, limit=limit)
-    total = ProjectCRUD.count_by_owner(db, current_user.id)
+    projects = ProjectCRUD.get_by_owner(
+        db, current_user.id, skip=page.skip, limit=page.limit, cursor=page.cursor
+    )
+    total = count_total(
+        db, Project, page.count_mode,
+        lambda: ProjectCRUD.count_by_owner(db, current_user.id), filtered=True
+    )
     
-    return {
-        "data": projects,
-        "total": total,
-        "skip": skip,
-        "limit": limit
-    }
+    return page.response(projects, total)
 
 
 @router.get("/{project_id}", response_model=ProjectResponse)
@@ -150,7 +154,11 @@ def delete_project(
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """删除项目"""
+    """删除项目（连同测井、曲线、预测结果和存储文件）
+    
+    数据量较大的项目立即标记为已删除（随即不可见），曲线数据由后台
+    LogPurger 分批清除，此时返回 202（进度见 /api/v1/admin/purges）。
+    """
     project = ProjectCRUD.get_by_id(db, project_id)
     
     if not project:
@@ -166,7 +174,7 @@ def delete_project(
             detail="权限不足"
         )
     
-    # 使用服务层删除（包含级联检查）
+    # 使用服务层级联删除
     result = ProjectService.delete_project(db, project_id)
     
     if not result.get("success"):
@@ -175,6 +183,10 @@ def delete_project(
             detail=result.get("message")
         )
     
+    if result.get("scheduled"):
+        log_purger.wake()
+        return Response(status_code=status.HTTP_202_ACCEPTED)
+    
     return None
 
 
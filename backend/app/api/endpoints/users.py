@@ -5,10 +5,13 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from app.db.session import get_db
+from app.api.pagination import PageParams
 from app.schemas import (
     UserResponse, UserUpdate, UserListResponse, PaginationParams
 )
 from app.crud import UserCRUD
+from app.crud.pagination import count_total
+from app.models import User
 from app.core.security import get_current_user, get_current_admin
 from app.services import UserService
 
@@ -17,8 +20,7 @@ router = APIRouter(prefix="/api/v1/users", tags=["users"])
 
 @router.get("", response_model=UserListResponse)
 def list_users(
-    skip: int = 0,
-    limit: int = 10,
+    page: PageParams = Depends(),
     role: str = None,
     status: str = None,
     current_user = Depends(get_current_user),
@@ -28,18 +30,37 @@ def list_users(
     
     - **skip**: 跳过的记录数
     - **limit**: 返回的记录数
+    - **cursor**: 上一页返回的 next_cursor（可选，游标分页）
+    - **count_mode**: 总数统计方式 exact / estimate / none
     - **role**: 筛选角色（可选）
     - **status**: 筛选状态（可选）
     """
-    users = UserCRUD.list_users(db, skip=skip, limit=limit, role=role, status=status)
-    total = UserCRUD.count(db)
+    users = UserCRUD.list_users(
+        db, skip=page.skip, limit=page.limit, role=role, status=status, cursor=page.cursor
+    )
+    total = count_total(
+        db, User, page.count_mode,
+        lambda: UserCRUD.count(db, role=role, status=status), filtered=bool(role or status)
+    )
     
-    return {
-        "data": users,
-        "total": total,
-        "skip": skip,
-        "limit": limit
-    }
+    return page.response(users, total)
+
+
+@router.get("/me", response_model=UserResponse)
+def get_current_user_info(
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """获取当前用户信息"""
+    user = UserCRUD.get_by_id(db, current_user.id)
+    
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="用户不存在"
+        )
+    
+    return user
 
 
 @router.get("/{user_id}", response_model=UserResponse)
@@ -60,14 +81,6 @@ def get_user(
     return user
 
 
-@router.get("/me", response_model=UserResponse)
-def get_current_user_info(
-    current_user = Depends(get_current_user),
-):
-    """获取当前用户信息"""
-    return current_user
-
-
 @router.put("/{user_id}", response_model=UserResponse)
 def update_user(
     user_id: int,
@@ -0,0 +1,63 @@
+"""列表端点的分页参数"""
+
+from typing import Any, List, Optional
+
+from fastapi import HTTPException, Query, status
+
+from app.core.settings import settings
+from app.crud.pagination import COUNT_MODES, decode_cursor, next_cursor
+
+
+class PageParams:
+    """列表分页参数
+
+    - **skip**: 跳过的记录数（偏移分页，指定 cursor 时忽略）
+    - **limit**: 返回的记录数
+    - **cursor**: 上一页返回的 next_cursor（游标分页）
+    - **count_mode**: 总数统计方式 exact / estimate / none
+    """
+
+    def __init__(
+        self,
+        skip: int = Query(0, ge=0),
+        limit: int = Query(10, ge=1, le=settings.MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        count_mode: str = "exact"
+    ):
+        if count_mode not in COUNT_MODES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"count_mode 必须为 {', '.join(COUNT_MODES)} 之一"
+            )
+        if cursor:
+            try:
+                decode_cursor(cursor)
+            except ValueError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(e)
+                )
+        self.skip = skip
+        self.limit = limit
+        self.cursor = cursor
+        self.count_mode = count_mode
+
+    def response(self, items: List[Any], total: Optional[int]) -> dict:
+        """组装列表响应"""
+        return {
+            "data": items,
+            "total": total,
+            "skip": self.skip,
+            "limit": self.limit,
+            "next_cursor": next_cursor(items, self.limit)
+        }
+
+
+async def page_params(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    count_mode: str = "exact"
+) -> PageParams:
+    """PageParams 的协程依赖，供 async 端点使用（类依赖会被调度到线程池）"""
+    return PageParams(skip, limit, cursor, count_mode)
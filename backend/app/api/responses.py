@@ -0,0 +1,47 @@
+"""大响应的快速 JSON 序列化
+
+ORJSONResponse 用 orjson 直接序列化 dict / list / datetime 与 NumPy 数组，
+不经过 FastAPI 的 jsonable_encoder。端点返回该响应时须自行组装可序列化的
+内容（不能直接返回 ORM 对象）。orjson 未安装时回退到标准库 json。
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any
+
+import numpy as np
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 为可选依赖
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray):
+        # 非连续数组（如二维数组的列切片）orjson 不能直接序列化
+        return np.ascontiguousarray(obj).tolist() if orjson is None else np.ascontiguousarray(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """序列化为 JSON 字节串（NumPy 数组按原生类型输出）"""
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class ORJSONResponse(JSONResponse):
+    """orjson 序列化的 JSON 响应"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
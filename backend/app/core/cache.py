@@ -0,0 +1,329 @@
+"""
+Response cache for hot read paths
+
+Results of expensive reads (statistics, summaries) are cached under a key
+and a set of tags. Write paths in the CRUD layer call invalidate() with the
+tags of the rows they changed, e.g. "log:42" or "project:7", which drops
+every cached result derived from those rows.
+
+Backends:
+- memory: in-process LRU with TTL (default). Invalidation is per process,
+  so with WORKERS > 1 other workers would serve stale entries until they
+  expire; create_backend() then falls back to none (use redis instead).
+- redis:  shared across workers, values JSON-encoded, tags kept as sets.
+- fake:   dict-backed, encodes values like redis; used by the tests.
+- none:   caching disabled.
+"""
+import copy
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Set
+
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def encode(value: Any) -> str:
+    """JSON-encode a cached value, keeping datetimes as datetimes"""
+    def default(obj):
+        if isinstance(obj, datetime):
+            return {"__datetime__": obj.isoformat()}
+        if isinstance(obj, date):
+            return {"__date__": obj.isoformat()}
+        raise TypeError(f"Object of type {type(obj).__name__} is not cacheable")
+    return json.dumps(value, default=default, ensure_ascii=False)
+
+
+def decode(data: str) -> Any:
+    def object_hook(obj):
+        if len(obj) == 1:
+            if "__datetime__" in obj:
+                return datetime.fromisoformat(obj["__datetime__"])
+            if "__date__" in obj:
+                return date.fromisoformat(obj["__date__"])
+        return obj
+    return json.loads(data, object_hook=object_hook)
+
+
+class CacheBackend:
+    """Key/value store with TTLs and tag-based invalidation"""
+
+    def get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: int, tags: Sequence[str] = ()) -> None:
+        raise NotImplementedError
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class NullCacheBackend(CacheBackend):
+    """Caching disabled"""
+
+    def get(self, key: str) -> Any:
+        return None
+
+    def set(self, key: str, value: Any, ttl: int, tags: Sequence[str] = ()) -> None:
+        pass
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    In-process LRU with per-entry expiry and a tag → keys index
+
+    Values are deep-copied on the way in and out so callers cannot mutate
+    a cached result.
+    """
+
+    def __init__(self, max_entries: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def _store(self, value: Any) -> Any:
+        return copy.deepcopy(value)
+
+    def _load(self, stored: Any) -> Any:
+        return copy.deepcopy(stored)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, stored, _ = entry
+            if expires_at <= self._clock():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+        return self._load(stored)
+
+    def set(self, key: str, value: Any, ttl: int, tags: Sequence[str] = ()) -> None:
+        stored = self._store(value)
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (self._clock() + ttl, stored, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._pop(next(iter(self._entries)))
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+
+class FakeCacheBackend(MemoryCacheBackend):
+    """
+    Memory backend that stores values encoded like RedisCacheBackend, so
+    tests catch results that would not survive a round trip through Redis
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        super().__init__(max_entries=1_000_000, clock=clock)
+
+    def _store(self, value: Any) -> Any:
+        return encode(value)
+
+    def _load(self, stored: Any) -> Any:
+        return decode(stored)
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Redis-backed cache shared by all workers
+
+    Each tag is a set of the keys cached under it. Redis errors are logged
+    and treated as misses so an unavailable cache never fails a request.
+    """
+
+    def __init__(self, url: str, db: int = 0, prefix: str = "geologai:cache:", client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url, db=db)
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _tag(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    def get(self, key: str) -> Any:
+        try:
+            data = self.client.get(self._key(key))
+        except Exception as e:
+            logger.warning(f"Cache get failed: {e}")
+            return None
+        return None if data is None else decode(data)
+
+    def set(self, key: str, value: Any, ttl: int, tags: Sequence[str] = ()) -> None:
+        try:
+            pipe = self.client.pipeline()
+            pipe.set(self._key(key), encode(value), ex=ttl)
+            for tag in tags:
+                pipe.sadd(self._tag(tag), self._key(key))
+                pipe.expire(self._tag(tag), ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Cache set failed: {e}")
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        try:
+            for tag in tags:
+                keys = self.client.smembers(self._tag(tag))
+                self.client.delete(self._tag(tag), *keys)
+        except Exception as e:
+            logger.warning(f"Cache invalidation failed: {e}")
+
+    def clear(self) -> None:
+        try:
+            keys = list(self.client.scan_iter(match=f"{self.prefix}*"))
+            if keys:
+                self.client.delete(*keys)
+        except Exception as e:
+            logger.warning(f"Cache clear failed: {e}")
+
+
+def create_backend(name: str) -> CacheBackend:
+    """Backend for a CACHE_BACKEND setting value"""
+    if name == "memory":
+        if settings.WORKERS > 1:
+            logger.warning(
+                f"CACHE_BACKEND=memory cannot invalidate across {settings.WORKERS} workers; "
+                "response caching disabled (use CACHE_BACKEND=redis)"
+            )
+            return NullCacheBackend()
+        return MemoryCacheBackend(settings.CACHE_MAX_ENTRIES)
+    if name == "redis":
+        return RedisCacheBackend(settings.REDIS_URL, settings.REDIS_DB)
+    if name == "fake":
+        return FakeCacheBackend()
+    if name == "none":
+        return NullCacheBackend()
+    raise ValueError(f"Unknown cache backend: {name}")
+
+
+class ResponseCache:
+    """Cache front end: hit/miss counters over a swappable backend"""
+
+    def __init__(self, backend: CacheBackend, default_ttl: int):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Any:
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, tags: Sequence[str] = (), ttl: Optional[int] = None) -> None:
+        self.backend.set(key, value, ttl or self.default_ttl, tags)
+
+    def invalidate(self, *tags: str) -> None:
+        self.backend.invalidate_tags(tags)
+
+    def clear(self) -> None:
+        self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+response_cache = ResponseCache(create_backend(settings.CACHE_BACKEND), settings.CACHE_EXPIRE_SECONDS)
+
+
+def invalidate(*tags: str) -> None:
+    """Drop every cached result tagged with any of tags"""
+    response_cache.invalidate(*tags)
+
+
+def succeeded(result: Dict[str, Any]) -> bool:
+    """Service results are cached only when their success flag is set"""
+    return bool(result.get("success"))
+
+
+def cached(
+    key: str,
+    tags: Sequence[str] = (),
+    ttl: Optional[int] = None,
+    when: Callable[[Any], bool] = lambda result: True,
+):
+    """
+    Cache a function's result
+
+    key and tags are format strings over the function's arguments, e.g.
+    cached("log_summary:{log_id}", tags=["log:{log_id}"]). Results for
+    which when(result) is false (e.g. "not found") are not cached.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            arguments = signature.bind(*args, **kwargs).arguments
+            cache_key = key.format(**arguments)
+            value = response_cache.get(cache_key)
+            if value is not None:
+                return value
+            value = func(*args, **kwargs)
+            if value is not None and when(value):
+                response_cache.set(
+                    cache_key, value, [tag.format(**arguments) for tag in tags], ttl
+                )
+            return value
+        return wrapper
+    return decorator
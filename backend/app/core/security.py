@@ -1,13 +1,23 @@
 """
 Security and authentication utilities
 """
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, Dict, Optional, Tuple
 import jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer
-import os
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.db.session import get_async_db, get_db
 
 # HTTPAuthCredentials is just a named tuple, we can define it locally if needed
 try:
@@ -20,30 +30,283 @@ except ImportError:
         credentials: str
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
+
+
+class PasswordHasherBusy(RuntimeError):
+    """
+    Raised when max_pending password operations are already waiting or running
+
+    Endpoints report it as 503 with Retry-After (see app.main).
+    """
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated thread pool
+
+    A burst of logins occupies at most max_workers CPUs. Async endpoints await
+    the pool (the *_async methods) and hold no thread while bcrypt runs; sync
+    callers (user creation, sample data) wait for the result. At most
+    max_pending calls may wait or run at once; beyond that callers get
+    PasswordHasherBusy immediately.
+    """
+
+    def __init__(self, context: CryptContext, max_workers: int, max_pending: int):
+        self.context = context
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._run_seconds = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="password-hash"
+                )
+            return self._executor
+
+    def _submit(self, func: Callable, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise PasswordHasherBusy("Too many concurrent password operations")
+        submitted = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+
+        def task():
+            started = time.perf_counter()
+            with self._lock:
+                wait = started - submitted
+                self._queued -= 1
+                self._running += 1
+                self._wait_seconds += wait
+                self._max_wait_seconds = max(self._max_wait_seconds, wait)
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._run_seconds += time.perf_counter() - started
+
+        try:
+            future = self._get_executor().submit(task)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _run(self, func: Callable, *args) -> Any:
+        return self._submit(func, *args).result()
+
+    async def _run_async(self, func: Callable, *args) -> Any:
+        return await asyncio.wrap_future(self._submit(func, *args))
+
+    def hash(self, password: str) -> str:
+        return self._run(self.context.hash, password)
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return self._run(self.context.verify, password, hashed)
+
+    def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Verify, and return a new hash when the stored one uses outdated parameters"""
+        return self._run(self.context.verify_and_update, password, hashed)
+
+    async def verify_and_update_async(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Coroutine version of verify_and_update"""
+        return await self._run_async(self.context.verify_and_update, password, hashed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self._completed
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "queued": self._queued,
+                "running": self._running,
+                "completed": completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._wait_seconds / completed * 1000, 2) if completed else 0.0,
+                "max_wait_ms": round(self._max_wait_seconds * 1000, 2),
+                "avg_hash_ms": round(self._run_seconds / completed * 1000, 2) if completed else 0.0,
+            }
+
+
+password_hasher = PasswordHasher(
+    pwd_context,
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
 
 # HTTP Bearer scheme
 security = HTTPBearer()
 
+ASYMMETRIC_ALGORITHMS = (
+    "RS256", "RS384", "RS512", "PS256", "PS384", "PS512",
+    "ES256", "ES384", "ES512", "EdDSA",
+)
+
+
+def _read_key(value: str) -> bytes:
+    """Key material is given either inline (PEM) or as a file path"""
+    if value.lstrip().startswith("-----BEGIN"):
+        return value.encode("utf-8")
+    with open(value, "rb") as f:
+        return f.read()
+
+
+@dataclass(frozen=True)
+class TokenKeys:
+    """JWT algorithm with signing/verification keys prepared once at startup"""
+    algorithm: str
+    signing_key: Any
+    verification_key: Any
+    public_pem: Optional[str] = None
+
+    @classmethod
+    def load(
+        cls,
+        algorithm: str,
+        secret_key: str,
+        private_key: str = "",
+        public_key: str = ""
+    ) -> "TokenKeys":
+        if algorithm not in ASYMMETRIC_ALGORITHMS:
+            return cls(algorithm, secret_key, secret_key)
+
+        try:
+            from cryptography.hazmat.primitives import serialization
+            from jwt.algorithms import get_default_algorithms
+        except ImportError:
+            raise RuntimeError(f"{algorithm} tokens require the 'cryptography' package")
+
+        jwt_algorithm = get_default_algorithms()[algorithm]
+        signing = jwt_algorithm.prepare_key(_read_key(private_key)) if private_key else None
+        if public_key:
+            verification = jwt_algorithm.prepare_key(_read_key(public_key))
+        elif signing is not None:
+            verification = signing.public_key()
+        else:
+            raise RuntimeError(f"{algorithm} tokens require JWT_PUBLIC_KEY or JWT_PRIVATE_KEY")
+
+        public_pem = verification.public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode("ascii")
+        return cls(algorithm, signing, verification, public_pem)
+
+
+token_keys = TokenKeys.load(
+    settings.ALGORITHM,
+    settings.SECRET_KEY,
+    settings.JWT_PRIVATE_KEY,
+    settings.JWT_PUBLIC_KEY
+)
+
+
+class LRUCache:
+    """
+    Bounded in-process LRU whose entries expire at a given clock time
+    """
+
+    def __init__(self, max_entries: int, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Any) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Any, value: Any, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Any) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Verified access tokens → claims, kept until the token's exp
+token_cache = LRUCache(max_entries=settings.TOKEN_CACHE_SIZE, clock=time.time)
+
 
 class SecurityUtility:
     """Security utilities for authentication and authorization"""
     
     # JWT Configuration
-    SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
-    ALGORITHM = "HS256"
+    SECRET_KEY = settings.SECRET_KEY
+    ALGORITHM = settings.ALGORITHM
     ACCESS_TOKEN_EXPIRE_MINUTES = 30
     REFRESH_TOKEN_EXPIRE_DAYS = 7
     
     @staticmethod
     def hash_password(password: str) -> str:
         """Hash password using bcrypt"""
-        return pwd_context.hash(password)
+        return password_hasher.hash(password)
     
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """Verify password against hash"""
-        return pwd_context.verify(plain_password, hashed_password)
+        return password_hasher.verify(plain_password, hashed_password)
+    
+    @staticmethod
+    def verify_and_update_password(
+        plain_password: str,
+        hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """Verify password and return a rehash if the hash's cost parameters are outdated"""
+        return password_hasher.verify_and_update(plain_password, hashed_password)
+    
+    @staticmethod
+    async def verify_and_update_password_async(
+        plain_password: str,
+        hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """Coroutine version of verify_and_update_password (the request holds no thread meanwhile)"""
+        return await password_hasher.verify_and_update_async(plain_password, hashed_password)
+    
+    @staticmethod
+    def _encode(claims: dict) -> str:
+        if token_keys.signing_key is None:
+            raise RuntimeError("No JWT signing key configured (set JWT_PRIVATE_KEY)")
+        return jwt.encode(claims, token_keys.signing_key, algorithm=token_keys.algorithm)
     
     @staticmethod
     def create_access_token(
@@ -61,12 +324,7 @@ class SecurityUtility:
             )
         
         to_encode.update({"exp": expire, "type": "access"})
-        encoded_jwt = jwt.encode(
-            to_encode,
-            SecurityUtility.SECRET_KEY,
-            algorithm=SecurityUtility.ALGORITHM
-        )
-        return encoded_jwt
+        return SecurityUtility._encode(to_encode)
     
     @staticmethod
     def create_refresh_token(data: dict) -> str:
@@ -76,23 +334,25 @@ class SecurityUtility:
             days=SecurityUtility.REFRESH_TOKEN_EXPIRE_DAYS
         )
         to_encode.update({"exp": expire, "type": "refresh"})
-        encoded_jwt = jwt.encode(
-            to_encode,
-            SecurityUtility.SECRET_KEY,
-            algorithm=SecurityUtility.ALGORITHM
-        )
-        return encoded_jwt
+        return SecurityUtility._encode(to_encode)
     
     @staticmethod
     def verify_token(token: str, token_type: str = "access") -> dict:
-        """Verify JWT token and return payload"""
+        """
+        Verify JWT token and return payload
+
+        Tokens seen before are served from token_cache until their exp
+        without decoding or checking the signature again.
+        """
+        cached = token_cache.get(token)
+        if cached is not None:
+            return dict(cached)
         try:
             payload = jwt.decode(
                 token,
-                SecurityUtility.SECRET_KEY,
-                algorithms=[SecurityUtility.ALGORITHM]
+                token_keys.verification_key,
+                algorithms=[token_keys.algorithm]
             )
-            return payload
         except jwt.ExpiredSignatureError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -103,6 +363,9 @@ class SecurityUtility:
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token"
             )
+        if isinstance(payload.get("exp"), (int, float)):
+            token_cache.put(token, payload, payload["exp"])
+        return dict(payload)
     
     @staticmethod
     def verify_access_token(credentials: HTTPAuthCredentials) -> dict:
@@ -119,22 +382,150 @@ class SecurityUtility:
         return payload
 
 
-async def get_current_user(
-    credentials: HTTPAuthCredentials = Depends(security)
-) -> dict:
+@dataclass(frozen=True)
+class Principal:
+    """Authenticated user, as cached from the user record"""
+    id: int
+    username: str
+    role: str
+    status: str = "active"
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == "admin"
+
+
+def _enum_value(value: Any) -> Any:
+    return getattr(value, "value", value)
+
+
+class UserCache(LRUCache):
+    """
+    Short-TTL in-process LRU of user records keyed by user id
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        super().__init__(max_entries, clock)
+        self.ttl_seconds = ttl_seconds
+
+    def put(self, principal: Principal) -> None:
+        super().put(principal.id, principal, self._clock() + self.ttl_seconds)
+
+
+user_cache = UserCache(
+    max_entries=settings.AUTH_USER_CACHE_SIZE,
+    ttl_seconds=settings.AUTH_USER_CACHE_TTL_SECONDS
+)
+
+
+def _cache_user(user: Any) -> Principal:
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+    record = Principal(
+        id=user.id,
+        username=user.username,
+        role=_enum_value(user.role),
+        status=_enum_value(user.status)
+    )
+    user_cache.put(record)
+    return record
+
+
+def _claimed_user_id(payload: dict) -> Optional[int]:
+    sub = payload.get("sub")
+    user_id = payload.get("user_id")
+    if user_id is None and sub is not None and str(sub).isdigit():
+        user_id = sub
+    return int(user_id) if user_id is not None else None
+
+
+def resolve_principal(db: Session, payload: dict) -> Principal:
+    """
+    Principal for a token
+
+    The token only identifies the user. The principal is the cached user
+    record (username, role and account status), which is invalidated whenever
+    the user row changes, so a demoted or banned user loses access even while
+    older tokens are still valid. The user table is queried at most once per
+    user per AUTH_USER_CACHE_TTL_SECONDS.
+    """
+    from app.crud import UserCRUD
+
+    user_id = _claimed_user_id(payload)
+    record = user_cache.get(user_id) if user_id is not None else None
+    if record is None:
+        if user_id is not None:
+            user = UserCRUD.get_by_id(db, user_id)
+        else:
+            user = UserCRUD.get_by_username(db, payload.get("username") or payload.get("sub"))
+        record = _cache_user(user)
+    if record.status != "active":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Account disabled"
+        )
+    return record
+
+
+async def resolve_principal_async(db: AsyncSession, payload: dict) -> Principal:
+    """
+    Coroutine version of resolve_principal
+    """
+    from app.crud import AsyncUserCRUD
+
+    user_id = _claimed_user_id(payload)
+    record = user_cache.get(user_id) if user_id is not None else None
+    if record is None:
+        if user_id is not None:
+            user = await AsyncUserCRUD.get_by_id(db, user_id)
+        else:
+            user = await AsyncUserCRUD.get_by_username(db, payload.get("username") or payload.get("sub"))
+        record = _cache_user(user)
+    if record.status != "active":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Account disabled"
+        )
+    return record
+
+
+def get_current_user(
+    credentials: HTTPAuthCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> Principal:
     """
     Dependency to get current authenticated user
     """
-    return SecurityUtility.verify_access_token(credentials)
+    payload = SecurityUtility.verify_access_token(credentials)
+    return resolve_principal(db, payload)
+
+
+async def get_current_user_async(
+    credentials: HTTPAuthCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """
+    Dependency to get current authenticated user for async endpoints
+    """
+    payload = SecurityUtility.verify_access_token(credentials)
+    return await resolve_principal_async(db, payload)
 
 
-async def get_current_admin(
-    current_user: dict = Depends(get_current_user)
-) -> dict:
+def get_current_admin(
+    current_user: Principal = Depends(get_current_user)
+) -> Principal:
     """
     Dependency to ensure current user is admin
     """
-    if current_user.get("role") != "admin":
+    if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin access required"
@@ -5,6 +5,11 @@ from app.crud.project import ProjectCRUD
 from app.crud.data import WellLogCRUD, CurveDataCRUD
 from app.crud.model import AIModelCRUD
 from app.crud.prediction import PredictionCRUD
+from app.crud.prediction_cache import PredictionCacheCRUD
+from app.crud.counters import SystemCounterCRUD
+from app.crud.async_crud import (
+    AsyncUserCRUD, AsyncProjectCRUD, AsyncWellLogCRUD, AsyncCurveDataCRUD, AsyncPredictionCRUD
+)
 
 __all__ = [
     "UserCRUD",
@@ -13,4 +18,11 @@ __all__ = [
     "CurveDataCRUD",
     "AIModelCRUD",
     "PredictionCRUD",
+    "PredictionCacheCRUD",
+    "SystemCounterCRUD",
+    "AsyncUserCRUD",
+    "AsyncProjectCRUD",
+    "AsyncWellLogCRUD",
+    "AsyncCurveDataCRUD",
+    "AsyncPredictionCRUD",
 ]
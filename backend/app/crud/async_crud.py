@@ -0,0 +1,211 @@
+"""异步数据库操作层
+
+读多写少的查询（用户、项目、测井、曲线、预测）的协程版本，供 async 端点
+通过 AsyncSession 使用。查询条件、排序与分页与同步 CRUD 保持一致。
+"""
+
+from typing import Optional, List, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+
+from app.models import User, Project, WellLog, Curve, CurveData, Prediction
+from app.crud.pagination import paginate
+from app.crud.prediction import _LIST_DEFERRED
+
+
+async def _count(db: AsyncSession, model, *criteria) -> int:
+    return await db.scalar(select(func.count()).select_from(model).where(*criteria))
+
+
+class AsyncUserCRUD:
+    """用户异步数据库操作"""
+
+    @staticmethod
+    async def get_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
+        """通过ID获取用户"""
+        return await db.scalar(select(User).where(User.id == user_id))
+
+    @staticmethod
+    async def get_by_username(db: AsyncSession, username: str) -> Optional[User]:
+        """通过用户名获取用户"""
+        return await db.scalar(select(User).where(User.username == username))
+
+    @staticmethod
+    async def get_by_email(db: AsyncSession, email: str) -> Optional[User]:
+        """通过邮箱获取用户"""
+        return await db.scalar(select(User).where(User.email == email))
+
+
+class AsyncProjectCRUD:
+    """项目异步数据库操作"""
+
+    @staticmethod
+    async def get_by_id(db: AsyncSession, project_id: int) -> Optional[Project]:
+        """通过ID获取项目"""
+        return await db.scalar(select(Project).where(Project.id == project_id))
+
+
+class AsyncWellLogCRUD:
+    """测井数据异步数据库操作"""
+
+    @staticmethod
+    async def get_by_id(db: AsyncSession, log_id: int) -> Optional[WellLog]:
+        """通过ID获取测井数据"""
+        return await db.scalar(select(WellLog).where(WellLog.id == log_id))
+
+    @staticmethod
+    async def get_with_project(db: AsyncSession, log_id: int) -> Optional[Tuple[WellLog, Project]]:
+        """一次联表查询获取测井及其所属项目"""
+        result = await db.execute(
+            select(WellLog, Project).join(
+                Project, Project.id == WellLog.project_id
+            ).where(WellLog.id == log_id)
+        )
+        return result.first()
+
+    @staticmethod
+    async def get_by_project(
+        db: AsyncSession,
+        project_id: int,
+        skip: int = 0,
+        limit: int = 10,
+        cursor: Optional[str] = None
+    ) -> List[WellLog]:
+        """获取项目的所有测井数据"""
+        query = select(WellLog).options(defer(WellLog.curves_json))
+        query = query.where(WellLog.project_id == project_id)
+        return list(await db.scalars(paginate(query, WellLog, skip, limit, cursor)))
+
+    @staticmethod
+    async def list_logs(
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 10,
+        status: Optional[str] = None,
+        cursor: Optional[str] = None
+    ) -> List[WellLog]:
+        """列出测井数据（不加载 curves_json）"""
+        query = select(WellLog).options(defer(WellLog.curves_json))
+
+        if status:
+            query = query.where(WellLog.status == status)
+        return list(await db.scalars(paginate(query, WellLog, skip, limit, cursor)))
+
+    @staticmethod
+    async def count(db: AsyncSession) -> int:
+        """获取测井数据总数"""
+        return await _count(db, WellLog)
+
+    @staticmethod
+    async def count_by_project(db: AsyncSession, project_id: int) -> int:
+        """获取项目测井数据数"""
+        return await _count(db, WellLog, WellLog.project_id == project_id)
+
+
+class AsyncCurveDataCRUD:
+    """曲线数据异步数据库操作"""
+
+    @staticmethod
+    async def get_by_log_and_depth(
+        db: AsyncSession,
+        log_id: int,
+        depth_from: float,
+        depth_to: float
+    ) -> List[CurveData]:
+        """获取指定深度范围的曲线数据"""
+        return list(await db.scalars(
+            select(CurveData).where(
+                CurveData.log_id == log_id,
+                CurveData.depth >= depth_from,
+                CurveData.depth <= depth_to
+            )
+        ))
+
+    @staticmethod
+    async def get_by_curve_name(db: AsyncSession, log_id: int, curve_name: str) -> List[CurveData]:
+        """获取特定曲线的所有数据"""
+        return list(await db.scalars(
+            select(CurveData).join(Curve, Curve.id == CurveData.curve_id).where(
+                CurveData.log_id == log_id,
+                Curve.name == curve_name
+            ).order_by(CurveData.depth.asc())
+        ))
+
+
+class AsyncPredictionCRUD:
+    """预测结果异步数据库操作"""
+
+    @staticmethod
+    async def get_by_id(db: AsyncSession, prediction_id: int) -> Optional[Prediction]:
+        """通过ID获取预测结果"""
+        return await db.scalar(select(Prediction).where(Prediction.id == prediction_id))
+
+    @staticmethod
+    async def get_with_log_and_project(
+        db: AsyncSession,
+        prediction_id: int
+    ) -> Optional[Tuple[Prediction, WellLog, Project]]:
+        """一次联表查询获取预测及其测井、所属项目"""
+        result = await db.execute(
+            select(Prediction, WellLog, Project).join(
+                WellLog, WellLog.id == Prediction.log_id
+            ).join(
+                Project, Project.id == WellLog.project_id
+            ).where(Prediction.id == prediction_id)
+        )
+        return result.first()
+
+    @staticmethod
+    async def get_by_log(
+        db: AsyncSession,
+        log_id: int,
+        skip: int = 0,
+        limit: int = 10,
+        cursor: Optional[str] = None
+    ) -> List[Prediction]:
+        """获取测井的所有预测结果"""
+        query = select(Prediction).options(*_LIST_DEFERRED).where(Prediction.log_id == log_id)
+        return list(await db.scalars(paginate(query, Prediction, skip, limit, cursor)))
+
+    @staticmethod
+    async def get_by_model(
+        db: AsyncSession,
+        model_id: int,
+        skip: int = 0,
+        limit: int = 10,
+        cursor: Optional[str] = None
+    ) -> List[Prediction]:
+        """获取模型的所有预测结果"""
+        query = select(Prediction).options(*_LIST_DEFERRED).where(Prediction.model_id == model_id)
+        return list(await db.scalars(paginate(query, Prediction, skip, limit, cursor)))
+
+    @staticmethod
+    async def list_predictions(
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 10,
+        status: Optional[str] = None,
+        cursor: Optional[str] = None
+    ) -> List[Prediction]:
+        """列出预测结果"""
+        query = select(Prediction).options(*_LIST_DEFERRED)
+
+        if status:
+            query = query.where(Prediction.status == status)
+        return list(await db.scalars(paginate(query, Prediction, skip, limit, cursor)))
+
+    @staticmethod
+    async def count(db: AsyncSession) -> int:
+        """获取预测结果总数"""
+        return await _count(db, Prediction)
+
+    @staticmethod
+    async def count_by_log(db: AsyncSession, log_id: int) -> int:
+        """获取测井的预测结果数"""
+        return await _count(db, Prediction, Prediction.log_id == log_id)
+
+    @staticmethod
+    async def count_by_model(db: AsyncSession, model_id: int) -> int:
+        """获取模型的预测结果数"""
+        return await _count(db, Prediction, Prediction.model_id == model_id)
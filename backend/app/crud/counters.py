@@ -0,0 +1,160 @@
+"""系统计数器数据库操作层
+
+各表的行数与已存储字节数保存在 system_counters 中，按天的增量保存在
+daily_counters 中，由各 CRUD 的创建/删除操作在同一事务内更新（不提交），
+管理统计只需读取这几行，与表的大小无关。
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+
+from app.models import (
+    SystemCounter, DailyCounter, User, Project, WellLog, AIModel, Prediction
+)
+
+# 计数器名称
+USERS = "users"
+PROJECTS = "projects"
+LOGS = "logs"
+MODELS = "models"
+PREDICTIONS = "predictions"
+BYTES_STORED = "bytes_stored"
+
+# 按天的计数：上传数、预测数（只增不减），存储字节（上传为正、删除为负）
+DAILY_UPLOADS = "uploads"
+DAILY_PREDICTIONS = "predictions"
+DAILY_BYTES = "bytes_stored"
+
+_TABLE_COUNTERS = {
+    USERS: User,
+    PROJECTS: Project,
+    LOGS: WellLog,
+    MODELS: AIModel,
+    PREDICTIONS: Prediction,
+}
+
+
+def _upsert_add(db: Session, model, keys: Dict, delta: int) -> None:
+    """原子地 value += delta，行不存在时插入"""
+    dialect = db.get_bind(clause=update(model)).dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        statement = dialect_insert(model).values(**keys, value=delta)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(keys), set_={"value": model.value + delta}
+        )
+    elif dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        statement = dialect_insert(model).values(**keys, value=delta)
+        statement = statement.on_duplicate_key_update(value=model.value + delta)
+    else:
+        criteria = [getattr(model, k) == v for k, v in keys.items()]
+        if db.execute(update(model).where(*criteria).values(value=model.value + delta)).rowcount:
+            return
+        statement = insert(model).values(**keys, value=delta)
+    db.execute(statement)
+
+
+class SystemCounterCRUD:
+    """系统计数器数据库操作"""
+
+    @staticmethod
+    def add(db: Session, name: str, delta: int = 1) -> None:
+        """增减计数器（不提交，随调用方的事务提交）"""
+        if delta:
+            _upsert_add(db, SystemCounter, {"name": name}, delta)
+
+    @staticmethod
+    def add_daily(db: Session, name: str, delta: int = 1, day: Optional[date] = None) -> None:
+        """增减某天的计数（不提交）"""
+        if delta:
+            _upsert_add(db, DailyCounter, {"day": day or datetime.utcnow().date(), "name": name}, delta)
+
+    @staticmethod
+    def get_all(db: Session) -> Dict[str, int]:
+        """获取全部计数器"""
+        counters = {name: 0 for name in (*_TABLE_COUNTERS, BYTES_STORED)}
+        counters.update({
+            row.name: row.value for row in db.query(SystemCounter.name, SystemCounter.value)
+        })
+        return counters
+
+    @staticmethod
+    def get_daily(db: Session, since: date) -> List[DailyCounter]:
+        """获取某天以来的按天计数"""
+        return db.query(DailyCounter).filter(
+            DailyCounter.day >= since
+        ).order_by(DailyCounter.day.asc()).all()
+
+    @staticmethod
+    def is_empty(db: Session) -> bool:
+        """计数器是否尚未初始化"""
+        return db.query(SystemCounter.name).first() is None
+
+    @staticmethod
+    def rebuild(db: Session) -> Dict[str, int]:
+        """由各表重新计算全部计数器（初始化或校正时使用）"""
+        db.query(SystemCounter).delete(synchronize_session=False)
+        db.query(DailyCounter).delete(synchronize_session=False)
+
+        counters = {name: db.query(func.count()).select_from(model).scalar() or 0
+                    for name, model in _TABLE_COUNTERS.items()}
+        counters[BYTES_STORED] = db.query(func.coalesce(func.sum(WellLog.file_size), 0)).scalar()
+        db.add_all(SystemCounter(name=name, value=value) for name, value in counters.items())
+
+        daily: Dict[tuple, int] = {}
+        upload_rows = db.query(
+            func.date(WellLog.created_at), func.count(), func.coalesce(func.sum(WellLog.file_size), 0)
+        ).group_by(func.date(WellLog.created_at)).all()
+        for day, uploads, size in upload_rows:
+            daily[(day, DAILY_UPLOADS)] = uploads
+            daily[(day, DAILY_BYTES)] = size
+        prediction_rows = db.query(
+            func.date(Prediction.created_at), func.count()
+        ).group_by(func.date(Prediction.created_at)).all()
+        for day, predictions in prediction_rows:
+            daily[(day, DAILY_PREDICTIONS)] = predictions
+        db.add_all(
+            DailyCounter(
+                day=date.fromisoformat(day) if isinstance(day, str) else day,
+                name=name,
+                value=value
+            )
+            for (day, name), value in daily.items() if day is not None
+        )
+        db.commit()
+        return counters
+
+    @staticmethod
+    def growth(db: Session, days: int, today: Optional[date] = None) -> List[Dict]:
+        """最近 days 天的每日上传数、预测数及当天结束时的存储字节数"""
+        today = today or datetime.utcnow().date()
+        since = today - timedelta(days=days - 1)
+        series = {
+            since + timedelta(days=i): {DAILY_UPLOADS: 0, DAILY_PREDICTIONS: 0, DAILY_BYTES: 0}
+            for i in range(days)
+        }
+        for row in SystemCounterCRUD.get_daily(db, since):
+            if row.day in series:
+                series[row.day][row.name] = row.value
+
+        # 由当前总量倒推每天结束时的存储字节数
+        stored = SystemCounterCRUD.get_all(db)[BYTES_STORED]
+        points = []
+        for day in sorted(series, reverse=True):
+            counts = series[day]
+            points.append({
+                "date": day.isoformat(),
+                "uploads": counts[DAILY_UPLOADS],
+                "predictions": counts[DAILY_PREDICTIONS],
+                "bytes_stored": stored,
+            })
+            stored -= counts[DAILY_BYTES]
+        points.reverse()
+        return points
@@ -1,11 +1,18 @@
 """测井数据库操作层"""
 
-from typing import Optional, List
-from sqlalchemy.orm import Session
+from typing import Optional, List, Tuple, Dict, Any, Iterator
+from sqlalchemy import distinct, func, or_, text
+from sqlalchemy.orm import Session, defer
 from datetime import datetime
 
-from app.models import WellLog, CurveData
+from app.models import WellLog, Curve, CurveData, QualityFlag, Project, Prediction, PredictionCacheEntry
 from app.schemas import WellLogCreate, WellLogUpdate
+from app.crud.prediction_cache import PredictionCacheCRUD
+from app.crud.pagination import paginate
+from app.core.cache import invalidate
+from app.crud.counters import (
+    SystemCounterCRUD, LOGS, PREDICTIONS, BYTES_STORED, DAILY_UPLOADS, DAILY_BYTES
+)
 
 
 class WellLogCRUD:
@@ -26,7 +33,12 @@ class WellLogCRUD:
             status="processing"
         )
         db.add(db_log)
+        SystemCounterCRUD.add(db, LOGS)
+        SystemCounterCRUD.add(db, BYTES_STORED, well_log.file_size or 0)
+        SystemCounterCRUD.add_daily(db, DAILY_UPLOADS)
+        SystemCounterCRUD.add_daily(db, DAILY_BYTES, well_log.file_size or 0)
         db.commit()
+        invalidate(f"project:{project_id}", "stats")
         db.refresh(db_log)
         return db_log
 
@@ -36,26 +48,39 @@ class WellLogCRUD:
         return db.query(WellLog).filter(WellLog.id == log_id).first()
 
     @staticmethod
-    def get_by_project(db: Session, project_id: int, skip: int = 0, limit: int = 10) -> List[WellLog]:
+    def get_with_project(db: Session, log_id: int) -> Optional[Tuple[WellLog, Project]]:
+        """一次联表查询获取测井及其所属项目"""
+        return db.query(WellLog, Project).join(
+            Project, Project.id == WellLog.project_id
+        ).filter(WellLog.id == log_id).first()
+
+    @staticmethod
+    def get_by_project(
+        db: Session,
+        project_id: int,
+        skip: int = 0,
+        limit: int = 10,
+        cursor: Optional[str] = None
+    ) -> List[WellLog]:
         """获取项目的所有测井数据"""
-        query = db.query(WellLog).filter(WellLog.project_id == project_id)
-        query = query.order_by(WellLog.created_at.desc())
-        return query.offset(skip).limit(limit).all()
+        query = db.query(WellLog).options(defer(WellLog.curves_json))
+        query = query.filter(WellLog.project_id == project_id)
+        return paginate(query, WellLog, skip, limit, cursor).all()
 
     @staticmethod
     def list_logs(
         db: Session,
         skip: int = 0,
         limit: int = 10,
-        status: Optional[str] = None
+        status: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> List[WellLog]:
-        """列出测井数据"""
-        query = db.query(WellLog)
+        """列出测井数据（不加载 curves_json）"""
+        query = db.query(WellLog).options(defer(WellLog.curves_json))
         
         if status:
             query = query.filter(WellLog.status == status)
-        query = query.order_by(WellLog.created_at.desc())
-        return query.offset(skip).limit(limit).all()
+        return paginate(query, WellLog, skip, limit, cursor).all()
 
     @staticmethod
     def count(db: Session) -> int:
@@ -76,19 +101,157 @@ class WellLogCRUD:
         
         db_log.updated_at = datetime.utcnow()
         db.commit()
+        invalidate(f"log:{log_id}")
         db.refresh(db_log)
         return db_log
 
     @staticmethod
     def delete(db: Session, log_id: int) -> bool:
-        """删除测井数据"""
-        db_log = WellLogCRUD.get_by_id(db, log_id)
-        if not db_log:
-            return False
-        
-        db.delete(db_log)
+        """删除测井数据（连同曲线、预测结果与预测缓存）"""
+        return bool(WellLogCRUD.delete_cascade(db, WellLog.id == log_id)["log_ids"])
+
+    @staticmethod
+    def delete_cascade(db: Session, *criteria, commit: bool = True, soft: bool = False) -> Dict[str, Any]:
+        """按条件删除一组测井及其曲线、预测结果与预测缓存
+
+        每张表各执行一条 DELETE ... WHERE log_id IN (...)，不逐行加载 ORM 对象。
+        条件同样匹配已标记删除、等待后台清除的测井。
+        soft=True 时只删除预测结果与预测缓存，并将测井标记为已删除
+        （deleted_at，随即对所有查询不可见），曲线数据与测井记录由 LogPurger 分批清除。
+        commit=False 时由调用方在同一事务内提交（此时不清除响应缓存）。
+
+        Returns:
+            log_ids、project_ids、model_ids，以及事务提交后需要清理的
+            file_paths（上传文件）和 result_keys（预测结果文件）
+        """
+        logs = db.query(
+            WellLog.id, WellLog.project_id, WellLog.file_path, WellLog.file_size, WellLog.deleted_at
+        ).filter(*criteria).execution_options(include_deleted=True).all()
+        # 已标记删除的测井在标记时已从计数器中扣除
+        live = [log for log in logs if log.deleted_at is None]
+        if soft:
+            logs = live
+        deleted = {
+            "log_ids": [log.id for log in logs],
+            "project_ids": sorted({log.project_id for log in logs}),
+            "model_ids": [],
+            "file_paths": [] if soft else [log.file_path for log in logs if log.file_path],
+            "result_keys": [],
+        }
+        if not logs:
+            return deleted
+
+        log_ids = deleted["log_ids"]
+        predictions = db.query(Prediction.model_id, Prediction.result_key).filter(
+            Prediction.log_id.in_(log_ids)
+        ).all()
+        deleted["model_ids"] = sorted({p.model_id for p in predictions})
+        deleted["result_keys"] = sorted({p.result_key for p in predictions if p.result_key})
+
+        db.query(Prediction).filter(Prediction.log_id.in_(log_ids)).delete(synchronize_session=False)
+        db.query(PredictionCacheEntry).filter(
+            PredictionCacheEntry.log_id.in_(log_ids)
+        ).delete(synchronize_session=False)
+        if soft:
+            db.query(WellLog).filter(WellLog.id.in_(log_ids)).update(
+                {WellLog.deleted_at: datetime.utcnow()}, synchronize_session=False
+            )
+        else:
+            db.query(CurveData).filter(CurveData.log_id.in_(log_ids)).delete(synchronize_session=False)
+            db.query(WellLog).filter(WellLog.id.in_(log_ids)).delete(synchronize_session=False)
+
+        size = sum(log.file_size or 0 for log in live)
+        SystemCounterCRUD.add(db, LOGS, -len(live))
+        SystemCounterCRUD.add(db, PREDICTIONS, -len(predictions))
+        SystemCounterCRUD.add(db, BYTES_STORED, -size)
+        SystemCounterCRUD.add_daily(db, DAILY_BYTES, -size)
+        if commit:
+            db.commit()
+            WellLogCRUD.invalidate_deleted(deleted)
+        return deleted
+
+    @staticmethod
+    def get_deleted(db: Session) -> List[Tuple]:
+        """获取已标记删除、等待后台清除的测井及其清除进度（按标记时间）"""
+        return db.query(
+            WellLog.id, WellLog.project_id, WellLog.filename, WellLog.file_path,
+            WellLog.sample_count, WellLog.deleted_at,
+            WellLog.purge_claimed_by, WellLog.purge_heartbeat_at, WellLog.purge_started_at,
+            WellLog.purge_rows_deleted, WellLog.purge_batches
+        ).filter(
+            WellLog.deleted_at.isnot(None)
+        ).order_by(WellLog.deleted_at.asc()).execution_options(include_deleted=True).all()
+
+    @staticmethod
+    def claim_purge(db: Session, log_id: int, worker: str, stale_before: datetime) -> bool:
+        """认领一条已标记测井的后台清除并提交，返回是否认领成功
+
+        单条 UPDATE 原子地认领：测井未被认领、已由 worker 认领，或认领者自
+        stale_before 起未再提交批次（进程退出）时才会成功，
+        因此多个工作进程的清除线程不会同时清除同一条测井。
+        """
+        now = datetime.utcnow()
+        claimed = db.query(WellLog).filter(
+            WellLog.id == log_id,
+            WellLog.deleted_at.isnot(None),
+            or_(
+                WellLog.purge_claimed_by.is_(None),
+                WellLog.purge_claimed_by == worker,
+                WellLog.purge_heartbeat_at < stale_before
+            )
+        ).update({
+            WellLog.purge_claimed_by: worker,
+            WellLog.purge_heartbeat_at: now,
+            WellLog.purge_started_at: func.coalesce(WellLog.purge_started_at, now),
+        }, synchronize_session=False)
         db.commit()
-        return True
+        return claimed > 0
+
+    @staticmethod
+    def record_purge_batch(db: Session, log_id: int, worker: str, rows: int) -> bool:
+        """记录 worker 清除的一批曲线数据并提交，返回 worker 是否仍持有认领"""
+        recorded = db.query(WellLog).filter(
+            WellLog.id == log_id,
+            WellLog.purge_claimed_by == worker
+        ).update({
+            WellLog.purge_rows_deleted: func.coalesce(WellLog.purge_rows_deleted, 0) + rows,
+            WellLog.purge_batches: func.coalesce(WellLog.purge_batches, 0) + 1,
+            WellLog.purge_heartbeat_at: datetime.utcnow(),
+        }, synchronize_session=False)
+        db.commit()
+        return recorded > 0
+
+    @staticmethod
+    def release_purge(db: Session, log_id: int, worker: str) -> None:
+        """释放 worker 对测井清除的认领（进程停止时），其他进程可立即接管"""
+        db.query(WellLog).filter(
+            WellLog.id == log_id,
+            WellLog.purge_claimed_by == worker
+        ).update({WellLog.purge_claimed_by: None}, synchronize_session=False)
+        db.commit()
+
+    @staticmethod
+    def delete_purged(db: Session, log_id: int, worker: Optional[str] = None) -> bool:
+        """删除曲线数据已清除完毕的已标记测井记录（给定 worker 时仅限其认领的测井）"""
+        query = db.query(WellLog).filter(
+            WellLog.id == log_id,
+            WellLog.deleted_at.isnot(None)
+        )
+        if worker is not None:
+            query = query.filter(WellLog.purge_claimed_by == worker)
+        deleted = query.delete(synchronize_session=False)
+        db.commit()
+        return deleted > 0
+
+    @staticmethod
+    def invalidate_deleted(deleted: Dict[str, Any]) -> None:
+        """清除被删除测井相关的响应缓存"""
+        invalidate(
+            *(f"log:{log_id}" for log_id in deleted["log_ids"]),
+            *(f"project:{project_id}" for project_id in deleted["project_ids"]),
+            *(f"model:{model_id}" for model_id in deleted["model_ids"]),
+            "stats"
+        )
 
     @staticmethod
     def count_by_project(db: Session, project_id: int) -> int:
@@ -101,17 +264,20 @@ class CurveDataCRUD:
 
     @staticmethod
     def create(db: Session, curve_name: str, depth: float, value: float, 
-               quality_flag: str, log_id: int) -> CurveData:
-        """创建新的曲线数据点"""
+               quality_flag, log_id: int) -> CurveData:
+        """创建新的曲线数据点（quality_flag 为质量位掩码或名称，如 "good"）"""
         db_curve = CurveData(
             curve_name=curve_name,
             depth=depth,
             value=value,
-            quality_flag=quality_flag,
+            quality_flag=QualityFlag.parse(quality_flag),
             log_id=log_id
         )
         db.add(db_curve)
+        # 曲线数据变化后，该测井的预测缓存失效
+        PredictionCacheCRUD.delete_by_log(db, log_id, commit=False)
         db.commit()
+        invalidate(f"log:{log_id}")
         db.refresh(db_curve)
         return db_curve
 
@@ -127,19 +293,89 @@ class CurveDataCRUD:
     @staticmethod
     def get_by_curve_name(db: Session, log_id: int, curve_name: str) -> List[CurveData]:
         """获取特定曲线的所有数据"""
-        return db.query(CurveData).filter(
+        return db.query(CurveData).join(Curve, Curve.id == CurveData.curve_id).filter(
             CurveData.log_id == log_id,
-            CurveData.curve_name == curve_name
+            Curve.name == curve_name
         ).order_by(CurveData.depth.asc()).all()
 
+    @staticmethod
+    def iter_log_samples(db: Session, log_id: int, chunk_size: int) -> Iterator[List[tuple]]:
+        """按深度顺序分块获取测井的 (depth, curve_name, value) 样本
+
+        只查询所需的三列，并以 yield_per 分块读取，内存占用与测井长度无关。
+        """
+        query = db.query(
+            CurveData.depth,
+            Curve.name,
+            CurveData.value
+        ).join(Curve, Curve.id == CurveData.curve_id).filter(
+            CurveData.log_id == log_id,
+            CurveData.depth.isnot(None)
+        ).order_by(CurveData.depth.asc())
+        for rows in db.execute(query.statement.execution_options(yield_per=chunk_size)).partitions():
+            yield rows
+
+    @staticmethod
+    def count_depths(db: Session, log_id: int) -> int:
+        """获取测井的不同深度点数"""
+        return db.query(func.count(distinct(CurveData.depth))).filter(
+            CurveData.log_id == log_id
+        ).scalar() or 0
+
+    @staticmethod
+    def get_curve_names(db: Session, log_id: int) -> List[str]:
+        """获取测井包含的曲线名称"""
+        curve_ids = db.query(CurveData.curve_id).filter(CurveData.log_id == log_id).distinct()
+        return [name for name, in db.query(Curve.name).filter(
+            Curve.id.in_(curve_ids.scalar_subquery())
+        ).order_by(Curve.name.asc())]
+
     @staticmethod
     def count_by_log(db: Session, log_id: int) -> int:
         """获取测井数据点数"""
         return db.query(CurveData).filter(CurveData.log_id == log_id).count()
 
+    @staticmethod
+    def count_by_logs(db: Session, *criteria, limit: Optional[int] = None) -> int:
+        """按测井条件统计曲线数据点数（含已标记删除、等待清除的测井）
+
+        给定 limit 时至多数到 limit 行即停止，用于判断数据量是否超过阈值，
+        不必扫描大测井的全部数据。
+        """
+        log_ids = db.query(WellLog.id).filter(*criteria).scalar_subquery()
+        rows = db.query(CurveData.id).filter(
+            CurveData.log_id.in_(log_ids)
+        ).execution_options(include_deleted=True)
+        if limit is not None:
+            rows = rows.limit(limit)
+        return rows.count()
+
+    @staticmethod
+    def delete_batch(db: Session, log_id: int, limit: int) -> int:
+        """删除一条测井的至多 limit 个曲线数据点并提交，返回删除数
+
+        用于分批删除大测井的曲线数据，避免单个事务长时间持有锁。
+        不在客户端取出 ID 列表：MySQL 使用 DELETE ... LIMIT，其他数据库
+        使用 id IN (SELECT ... LIMIT n) 子查询，语句大小与 limit 无关。
+        """
+        if db.get_bind().dialect.name == "mysql":
+            deleted = db.execute(
+                text(f"DELETE FROM {CurveData.__tablename__} WHERE log_id = :log_id LIMIT :limit"),
+                {"log_id": log_id, "limit": limit}
+            ).rowcount
+        else:
+            batch = db.query(CurveData.id).filter(CurveData.log_id == log_id).limit(limit)
+            deleted = db.query(CurveData).filter(
+                CurveData.id.in_(batch.scalar_subquery())
+            ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
     @staticmethod
     def delete_by_log(db: Session, log_id: int) -> bool:
         """删除一条测井的所有曲线数据"""
         db.query(CurveData).filter(CurveData.log_id == log_id).delete()
+        PredictionCacheCRUD.delete_by_log(db, log_id, commit=False)
         db.commit()
+        invalidate(f"log:{log_id}")
         return True
@@ -6,6 +6,10 @@ from datetime import datetime
 
 from app.models import AIModel
 from app.schemas import AIModelCreate, AIModelUpdate
+from app.crud.prediction_cache import PredictionCacheCRUD
+from app.crud.pagination import paginate
+from app.core.cache import invalidate
+from app.crud.counters import SystemCounterCRUD, MODELS
 
 
 class AIModelCRUD:
@@ -24,7 +28,9 @@ class AIModelCRUD:
             status="active"
         )
         db.add(db_model)
+        SystemCounterCRUD.add(db, MODELS)
         db.commit()
+        invalidate("stats")
         db.refresh(db_model)
         return db_model
 
@@ -44,7 +50,8 @@ class AIModelCRUD:
         skip: int = 0,
         limit: int = 10,
         model_type: Optional[str] = None,
-        status: Optional[str] = None
+        status: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> List[AIModel]:
         """列出模型"""
         query = db.query(AIModel)
@@ -54,7 +61,7 @@ class AIModelCRUD:
         if status:
             query = query.filter(AIModel.status == status)
         
-        return query.offset(skip).limit(limit).order_by(AIModel.created_at.desc()).all()
+        return paginate(query, AIModel, skip, limit, cursor).all()
 
     @staticmethod
     def count(db: Session) -> int:
@@ -74,7 +81,10 @@ class AIModelCRUD:
             setattr(db_model, key, value)
         
         db_model.updated_at = datetime.utcnow()
+        # 模型变化后，其预测缓存失效
+        PredictionCacheCRUD.delete_by_model(db, model_id, commit=False)
         db.commit()
+        invalidate(f"model:{model_id}")
         db.refresh(db_model)
         return db_model
 
@@ -85,8 +95,11 @@ class AIModelCRUD:
         if not db_model:
             return False
         
+        PredictionCacheCRUD.delete_by_model(db, model_id, commit=False)
         db.delete(db_model)
+        SystemCounterCRUD.add(db, MODELS, -1)
         db.commit()
+        invalidate(f"model:{model_id}", "stats")
         return True
 
     @staticmethod
@@ -98,6 +111,9 @@ class AIModelCRUD:
         
         db_model.status = status
         db_model.updated_at = datetime.utcnow()
+        # 模型变化后，其预测缓存失效
+        PredictionCacheCRUD.delete_by_model(db, model_id, commit=False)
         db.commit()
+        invalidate(f"model:{model_id}")
         db.refresh(db_model)
         return db_model
@@ -0,0 +1,112 @@
+"""列表分页工具
+
+列表按 (created_at, id) 倒序排列，支持两种翻页方式：
+- 游标分页：cursor 为上一页最后一条记录的 (created_at, id) 编码，
+  查询直接从该位置继续，深翻页与第一页代价相同
+- 偏移分页：兼容旧的 skip/limit 参数
+
+总数可精确统计、按表统计信息估算或不统计。
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, text
+from sqlalchemy.orm import Query, Session
+
+COUNT_MODES = ("exact", "estimate", "none")
+
+
+def encode_cursor(created_at: datetime, record_id: int) -> str:
+    """将排序键编码为不透明的游标"""
+    payload = json.dumps([created_at.isoformat(), record_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """解码游标，格式无效时抛出 ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, record_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(record_id)
+    except Exception:
+        raise ValueError("无效的分页游标")
+
+
+def paginate(query: Query, model: Any, skip: int = 0, limit: int = 10, cursor: Optional[str] = None) -> Query:
+    """按 (created_at, id) 倒序分页；指定 cursor 时忽略 skip
+
+    同样适用于 select() 语句（异步 CRUD）。
+    """
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+    if cursor:
+        created_at, record_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < record_id)
+        ))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+def next_cursor(items: List[Any], limit: int) -> Optional[str]:
+    """根据本页结果生成下一页游标，不足一页时说明已到末尾"""
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(last.created_at, last.id)
+
+
+def estimate_count(db: Session, model: Any) -> Optional[int]:
+    """按数据库表统计信息估算总行数，不支持的数据库返回 None"""
+    if db.get_bind().dialect.name != "mysql":
+        return None
+    return db.execute(
+        text(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+        ),
+        {"table": model.__tablename__}
+    ).scalar()
+
+
+def count_total(
+    db: Session,
+    model: Any,
+    count_mode: str,
+    exact: Callable[[], int],
+    filtered: bool = False
+) -> Optional[int]:
+    """按 count_mode 统计总数
+
+    - exact: 精确计数
+    - estimate: 无筛选条件时使用表统计信息估算，否则精确计数
+    - none: 不统计，返回 None
+    """
+    if count_mode == "none":
+        return None
+    if count_mode == "estimate" and not filtered:
+        estimated = estimate_count(db, model)
+        if estimated is not None:
+            return estimated
+    return exact()
+
+
+async def count_total_async(
+    db: Any,
+    model: Any,
+    count_mode: str,
+    exact: Callable[[], Awaitable[int]],
+    filtered: bool = False
+) -> Optional[int]:
+    """count_total 的协程版本，db 为 AsyncSession"""
+    if count_mode == "none":
+        return None
+    if count_mode == "estimate" and not filtered:
+        estimated = await db.run_sync(lambda session: estimate_count(session, model))
+        if estimated is not None:
+            return estimated
+    return await exact()
@@ -1,29 +1,64 @@
 """预测结果数据库操作层"""
 
-from typing import Optional, List
-from sqlalchemy.orm import Session
-from datetime import datetime
+import math
+from typing import Optional, List, Sequence, Tuple, Dict, Any
+from sqlalchemy.orm import Session, defer
+from sqlalchemy import Integer, case, cast, func, literal_column, or_
+from datetime import datetime, timedelta
 
-from app.models import Prediction
+from app.models import Prediction, AIModel, PredictionStatus, WellLog, Project
 from app.schemas import PredictionCreate, PredictionUpdate
+from app.crud.pagination import paginate
+from app.core.cache import invalidate
+from app.crud.counters import SystemCounterCRUD, PREDICTIONS, DAILY_PREDICTIONS
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _epoch_seconds(db: Session, column):
+    """naive UTC 时间列相对 1970-01-01 的秒数（与会话时区无关）"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        return cast(func.strftime("%s", column), Integer)
+    if dialect == "mysql":
+        return func.timestampdiff(literal_column("SECOND"), _EPOCH, column)
+    return cast(func.extract("epoch", column), Integer)
+
+
+# 列表查询不加载的大字段，访问时按需加载；详情通过 get_by_id 获取完整记录
+_LIST_DEFERRED = (
+    defer(Prediction.results_json),
+    defer(Prediction.parameters_json),
+)
 
 
 class PredictionCRUD:
     """预测结果数据库操作"""
 
     @staticmethod
-    def create(db: Session, prediction: PredictionCreate) -> Prediction:
-        """创建新的预测结果"""
+    def create(db: Session, prediction: PredictionCreate, result_key: Optional[str] = None) -> Prediction:
+        """创建新的预测结果
+
+        result_key 引用结果存储中的预测曲线，此时 results_json 通常为空。
+        """
         db_prediction = Prediction(
             log_id=prediction.log_id,
             model_id=prediction.model_id,
             results_json=prediction.results_json,
+            result_key=result_key,
+            depth_from=prediction.depth_from,
+            depth_to=prediction.depth_to,
+            parameters_json=prediction.parameters_json,
             confidence=prediction.confidence,
             execution_time=prediction.execution_time,
             status="success"
         )
         db.add(db_prediction)
+        SystemCounterCRUD.add(db, PREDICTIONS)
+        SystemCounterCRUD.add_daily(db, DAILY_PREDICTIONS)
         db.commit()
+        invalidate(f"model:{prediction.model_id}", "stats")
         db.refresh(db_prediction)
         return db_prediction
 
@@ -33,33 +68,80 @@ class PredictionCRUD:
         return db.query(Prediction).filter(Prediction.id == prediction_id).first()
 
     @staticmethod
-    def get_by_log(db: Session, log_id: int, skip: int = 0, limit: int = 10) -> List[Prediction]:
+    def get_with_log_and_project(
+        db: Session,
+        prediction_id: int
+    ) -> Optional[Tuple[Prediction, WellLog, Project]]:
+        """一次联表查询获取预测及其测井、所属项目"""
+        return db.query(Prediction, WellLog, Project).join(
+            WellLog, WellLog.id == Prediction.log_id
+        ).join(
+            Project, Project.id == WellLog.project_id
+        ).filter(Prediction.id == prediction_id).first()
+
+    @staticmethod
+    def get_by_log(
+        db: Session,
+        log_id: int,
+        skip: int = 0,
+        limit: int = 10,
+        cursor: Optional[str] = None
+    ) -> List[Prediction]:
         """获取测井的所有预测结果"""
-        query = db.query(Prediction).filter(Prediction.log_id == log_id)
-        query = query.order_by(Prediction.created_at.desc())
-        return query.offset(skip).limit(limit).all()
+        query = db.query(Prediction).options(*_LIST_DEFERRED).filter(Prediction.log_id == log_id)
+        return paginate(query, Prediction, skip, limit, cursor).all()
+
+    @staticmethod
+    def get_latest_by_models(
+        db: Session,
+        log_id: int,
+        model_ids: Sequence[int]
+    ) -> List[Tuple[Prediction, AIModel]]:
+        """获取测井上每个模型最新的一条预测及其模型（单次窗口查询）"""
+        if not model_ids:
+            return []
+        ranked = db.query(
+            Prediction.id.label("id"),
+            func.row_number().over(
+                partition_by=Prediction.model_id,
+                order_by=(Prediction.created_at.desc(), Prediction.id.desc())
+            ).label("rank")
+        ).filter(
+            Prediction.log_id == log_id,
+            Prediction.model_id.in_(model_ids)
+        ).subquery()
+        return db.query(Prediction, AIModel).options(*_LIST_DEFERRED).join(
+            ranked, ranked.c.id == Prediction.id
+        ).join(
+            AIModel, AIModel.id == Prediction.model_id
+        ).filter(ranked.c.rank == 1).all()
 
     @staticmethod
-    def get_by_model(db: Session, model_id: int, skip: int = 0, limit: int = 10) -> List[Prediction]:
+    def get_by_model(
+        db: Session,
+        model_id: int,
+        skip: int = 0,
+        limit: int = 10,
+        cursor: Optional[str] = None
+    ) -> List[Prediction]:
         """获取模型的所有预测结果"""
-        query = db.query(Prediction).filter(Prediction.model_id == model_id)
-        query = query.order_by(Prediction.created_at.desc())
-        return query.offset(skip).limit(limit).all()
+        query = db.query(Prediction).options(*_LIST_DEFERRED).filter(Prediction.model_id == model_id)
+        return paginate(query, Prediction, skip, limit, cursor).all()
 
     @staticmethod
     def list_predictions(
         db: Session,
         skip: int = 0,
         limit: int = 10,
-        status: Optional[str] = None
+        status: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> List[Prediction]:
         """列出预测结果"""
-        query = db.query(Prediction)
+        query = db.query(Prediction).options(*_LIST_DEFERRED)
         
         if status:
             query = query.filter(Prediction.status == status)
-        query = query.order_by(Prediction.created_at.desc())
-        return query.offset(skip).limit(limit).all()
+        return paginate(query, Prediction, skip, limit, cursor).all()
 
     @staticmethod
     def count(db: Session) -> int:
@@ -81,6 +163,7 @@ class PredictionCRUD:
         db_prediction.updated_at = datetime.utcnow()
         db.commit()
         db.refresh(db_prediction)
+        invalidate(f"model:{db_prediction.model_id}")
         return db_prediction
 
     @staticmethod
@@ -90,8 +173,11 @@ class PredictionCRUD:
         if not db_prediction:
             return False
         
+        model_id = db_prediction.model_id
         db.delete(db_prediction)
+        SystemCounterCRUD.add(db, PREDICTIONS, -1)
         db.commit()
+        invalidate(f"model:{model_id}", "stats")
         return True
 
     @staticmethod
@@ -99,7 +185,124 @@ class PredictionCRUD:
         """获取测井的预测结果数"""
         return db.query(Prediction).filter(Prediction.log_id == log_id).count()
 
+    @staticmethod
+    def count_by_result_key(db: Session, result_key: str) -> int:
+        """获取引用同一结果文件的预测数"""
+        return db.query(Prediction).filter(Prediction.result_key == result_key).count()
+
+    @staticmethod
+    def get_referenced_result_keys(db: Session, result_keys: Sequence[str]) -> set:
+        """获取仍被预测引用的结果键"""
+        if not result_keys:
+            return set()
+        return {key for key, in db.query(Prediction.result_key).filter(
+            Prediction.result_key.in_(result_keys)
+        ).distinct()}
+
     @staticmethod
     def count_by_model(db: Session, model_id: int) -> int:
         """获取模型的预测数"""
         return db.query(Prediction).filter(Prediction.model_id == model_id).count()
+
+    @staticmethod
+    def get_model_aggregates(db: Session, model_id: int) -> Dict[str, Any]:
+        """在数据库中聚合模型的预测统计（只读取标量列）"""
+        row = db.query(
+            func.count(Prediction.id),
+            func.count(Prediction.execution_time),
+            func.avg(Prediction.confidence),
+            func.avg(Prediction.execution_time),
+            func.min(Prediction.execution_time),
+            func.max(Prediction.execution_time),
+            func.sum(case((Prediction.status == PredictionStatus.FAILED, 1), else_=0))
+        ).filter(Prediction.model_id == model_id).one()
+        return {
+            "total": row[0] or 0,
+            "timed": row[1] or 0,
+            "avg_confidence": row[2],
+            "avg_execution_time": row[3],
+            "min_execution_time": row[4],
+            "max_execution_time": row[5],
+            "failed": row[6] or 0
+        }
+
+    @staticmethod
+    def get_execution_time_percentiles(
+        db: Session,
+        model_id: int,
+        percentiles: Sequence[float],
+        timed_count: int
+    ) -> Dict[float, Optional[int]]:
+        """按排序位置（nearest-rank）取执行耗时百分位数，每个百分位只取一行"""
+        query = db.query(Prediction.execution_time).filter(
+            Prediction.model_id == model_id,
+            Prediction.execution_time.isnot(None)
+        ).order_by(Prediction.execution_time.asc())
+        values = {}
+        for p in percentiles:
+            if timed_count == 0:
+                values[p] = None
+                continue
+            rank = max(math.ceil(p / 100 * timed_count), 1)
+            values[p] = query.offset(rank - 1).limit(1).scalar()
+        return values
+
+    @staticmethod
+    def get_model_history(
+        db: Session,
+        model_id: int,
+        start: datetime,
+        bucket_seconds: int,
+        n_buckets: int,
+        percentiles: Sequence[int] = (50, 95)
+    ) -> Dict[int, Dict[str, Any]]:
+        """在数据库中按时间分桶统计模型的预测（每桶预测数、失败数、耗时百分位）
+
+        百分位按线性插值计算（与 numpy.percentile 默认方式一致）：每个桶只取
+        排序位置 floor((n-1)p/100) 及其后一位的两行，返回行数与预测数无关。
+
+        Returns:
+            {桶序号: {"predictions", "failed", "percentiles": {p: 值}}}，不含空桶
+        """
+        end = start + timedelta(seconds=bucket_seconds * n_buckets)
+        seconds = _epoch_seconds(db, Prediction.created_at) - int((start - _EPOCH).total_seconds())
+        bucket = (seconds // bucket_seconds).label("bucket")
+        in_range = (
+            Prediction.model_id == model_id,
+            Prediction.created_at >= start,
+            Prediction.created_at < end
+        )
+
+        history: Dict[int, Dict[str, Any]] = {}
+        counts = db.query(
+            bucket,
+            func.count(Prediction.id),
+            func.sum(case((Prediction.status == PredictionStatus.FAILED, 1), else_=0))
+        ).filter(*in_range).group_by(bucket)
+        for index, total, failed in counts:
+            history[int(index)] = {"predictions": total, "failed": failed or 0, "percentiles": {}}
+
+        ranked = db.query(
+            bucket,
+            Prediction.execution_time.label("value"),
+            func.row_number().over(partition_by=bucket, order_by=Prediction.execution_time).label("rn"),
+            func.count().over(partition_by=bucket).label("n")
+        ).filter(*in_range, Prediction.execution_time.isnot(None)).subquery()
+        positions = [(ranked.c.n - 1) * p // 100 for p in percentiles]
+        rows = db.query(ranked.c.bucket, ranked.c.rn, ranked.c.n, ranked.c.value).filter(
+            or_(*(ranked.c.rn - 1 == pos for pos in positions),
+                *(ranked.c.rn - 1 == pos + 1 for pos in positions))
+        )
+        values: Dict[int, Dict[int, float]] = {}
+        sizes: Dict[int, int] = {}
+        for index, rn, n, value in rows:
+            values.setdefault(int(index), {})[rn - 1] = value
+            sizes[int(index)] = n
+        for index, ranks in values.items():
+            n = sizes[index]
+            for p in percentiles:
+                lo, remainder = divmod((n - 1) * p, 100)
+                low = ranks[lo]
+                high = ranks.get(lo + 1, low)
+                history[index]["percentiles"][p] = low + (high - low) * remainder / 100
+        return history
@@ -0,0 +1,123 @@
+"""预测缓存数据库操作层"""
+
+from typing import Optional, List
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from datetime import datetime
+
+from app.models import PredictionCacheEntry
+
+
+class PredictionCacheCRUD:
+    """预测缓存数据库操作"""
+
+    @staticmethod
+    def get(db: Session, cache_key: str) -> Optional[PredictionCacheEntry]:
+        """通过缓存键获取缓存项"""
+        return db.query(PredictionCacheEntry).filter(
+            PredictionCacheEntry.cache_key == cache_key
+        ).first()
+
+    @staticmethod
+    def put(
+        db: Session,
+        cache_key: str,
+        log_id: int,
+        model_id: int,
+        result_key: str,
+        depth_from: Optional[float] = None,
+        depth_to: Optional[float] = None,
+        size_bytes: int = 0
+    ) -> PredictionCacheEntry:
+        """写入或覆盖缓存项"""
+        entry = PredictionCacheCRUD.get(db, cache_key)
+        if entry is None:
+            entry = PredictionCacheEntry(cache_key=cache_key, hit_count=0)
+            db.add(entry)
+        entry.log_id = log_id
+        entry.model_id = model_id
+        entry.result_key = result_key
+        entry.depth_from = depth_from
+        entry.depth_to = depth_to
+        entry.size_bytes = size_bytes
+        entry.last_used_at = datetime.utcnow()
+        db.commit()
+        db.refresh(entry)
+        return entry
+
+    @staticmethod
+    def touch(db: Session, entry: PredictionCacheEntry) -> PredictionCacheEntry:
+        """记录一次命中并更新最近使用时间"""
+        entry.hit_count = (entry.hit_count or 0) + 1
+        entry.last_used_at = datetime.utcnow()
+        db.commit()
+        return entry
+
+    @staticmethod
+    def delete(db: Session, cache_key: str) -> bool:
+        """删除缓存项"""
+        deleted = db.query(PredictionCacheEntry).filter(
+            PredictionCacheEntry.cache_key == cache_key
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted > 0
+
+    @staticmethod
+    def delete_by_log(db: Session, log_id: int, commit: bool = True) -> int:
+        """使测井的全部缓存项失效"""
+        deleted = db.query(PredictionCacheEntry).filter(
+            PredictionCacheEntry.log_id == log_id
+        ).delete(synchronize_session=False)
+        if commit:
+            db.commit()
+        return deleted
+
+    @staticmethod
+    def delete_by_model(db: Session, model_id: int, commit: bool = True) -> int:
+        """使模型的全部缓存项失效"""
+        deleted = db.query(PredictionCacheEntry).filter(
+            PredictionCacheEntry.model_id == model_id
+        ).delete(synchronize_session=False)
+        if commit:
+            db.commit()
+        return deleted
+
+    @staticmethod
+    def count(db: Session) -> int:
+        """获取缓存项总数"""
+        return db.query(PredictionCacheEntry).count()
+
+    @staticmethod
+    def total_size(db: Session) -> int:
+        """获取缓存结果总字节数"""
+        return db.query(func.coalesce(func.sum(PredictionCacheEntry.size_bytes), 0)).scalar() or 0
+
+    @staticmethod
+    def evict_lru(db: Session, max_entries: int, max_bytes: int) -> List[str]:
+        """按最近最少使用淘汰缓存项，直到数量和总大小都不超过上限
+
+        Returns:
+            被淘汰的缓存键
+        """
+        count = PredictionCacheCRUD.count(db)
+        total = PredictionCacheCRUD.total_size(db)
+        if count <= max_entries and total <= max_bytes:
+            return []
+
+        evicted = []
+        oldest_first = db.query(
+            PredictionCacheEntry.cache_key, PredictionCacheEntry.size_bytes
+        ).order_by(PredictionCacheEntry.last_used_at.asc()).all()
+        for cache_key, size_bytes in oldest_first:
+            if count <= max_entries and total <= max_bytes:
+                break
+            evicted.append(cache_key)
+            count -= 1
+            total -= size_bytes or 0
+
+        if evicted:
+            db.query(PredictionCacheEntry).filter(
+                PredictionCacheEntry.cache_key.in_(evicted)
+            ).delete(synchronize_session=False)
+            db.commit()
+        return evicted
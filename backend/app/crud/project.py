@@ -1,11 +1,15 @@
 """项目数据库操作层"""
 
 from typing import Optional, List
+from sqlalchemy import exists
 from sqlalchemy.orm import Session
 from datetime import datetime
 
-from app.models import Project, ProjectStatus
+from app.models import Project, ProjectStatus, WellLog
 from app.schemas import ProjectCreate, ProjectUpdate
+from app.crud.pagination import paginate
+from app.core.cache import invalidate
+from app.crud.counters import SystemCounterCRUD, PROJECTS
 
 
 class ProjectCRUD:
@@ -25,7 +29,9 @@ class ProjectCRUD:
             status=ProjectStatus.PLANNING
         )
         db.add(db_project)
+        SystemCounterCRUD.add(db, PROJECTS)
         db.commit()
+        invalidate("stats")
         db.refresh(db_project)
         return db_project
 
@@ -35,18 +41,24 @@ class ProjectCRUD:
         return db.query(Project).filter(Project.id == project_id).first()
 
     @staticmethod
-    def get_by_owner(db: Session, owner_id: int, skip: int = 0, limit: int = 10) -> List[Project]:
+    def get_by_owner(
+        db: Session,
+        owner_id: int,
+        skip: int = 0,
+        limit: int = 10,
+        cursor: Optional[str] = None
+    ) -> List[Project]:
         """获取用户的所有项目"""
-        return db.query(Project).filter(
-            Project.owner_id == owner_id
-        ).offset(skip).limit(limit).all()
+        query = db.query(Project).filter(Project.owner_id == owner_id)
+        return paginate(query, Project, skip, limit, cursor).all()
 
     @staticmethod
     def list_projects(
         db: Session,
         skip: int = 0,
         limit: int = 10,
-        status: Optional[str] = None
+        status: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> List[Project]:
         """列出项目"""
         query = db.query(Project)
@@ -54,12 +66,15 @@ class ProjectCRUD:
         if status:
             query = query.filter(Project.status == status)
         
-        return query.offset(skip).limit(limit).order_by(Project.created_at.desc()).all()
+        return paginate(query, Project, skip, limit, cursor).all()
 
     @staticmethod
-    def count(db: Session) -> int:
-        """获取项目总数"""
-        return db.query(Project).count()
+    def count(db: Session, status: Optional[str] = None) -> int:
+        """获取项目总数（可按状态筛选，与 list_projects 的条件一致）"""
+        query = db.query(Project)
+        if status:
+            query = query.filter(Project.status == status)
+        return query.count()
 
     @staticmethod
     def update(db: Session, project_id: int, project_update: ProjectUpdate) -> Optional[Project]:
@@ -75,6 +90,7 @@ class ProjectCRUD:
         
         db_project.updated_at = datetime.utcnow()
         db.commit()
+        invalidate(f"project:{project_id}")
         db.refresh(db_project)
         return db_project
 
@@ -86,9 +102,32 @@ class ProjectCRUD:
             return False
         
         db.delete(db_project)
+        SystemCounterCRUD.add(db, PROJECTS, -1)
         db.commit()
+        invalidate(f"project:{project_id}", "stats")
         return True
 
+    @staticmethod
+    def mark_deleted(db: Session, project_id: int) -> None:
+        """将项目标记为已删除（随即对所有查询不可见，不提交）
+
+        项目记录在其测井全部由 LogPurger 清除后删除（见 delete_purged）。
+        """
+        db.query(Project).filter(Project.id == project_id).update(
+            {Project.deleted_at: datetime.utcnow()}, synchronize_session=False
+        )
+        SystemCounterCRUD.add(db, PROJECTS, -1)
+
+    @staticmethod
+    def delete_purged(db: Session) -> int:
+        """删除测井已全部清除的已标记项目并提交，返回删除数"""
+        deleted = db.query(Project).filter(
+            Project.deleted_at.isnot(None),
+            ~exists().where(WellLog.project_id == Project.id)
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
     @staticmethod
     def change_status(db: Session, project_id: int, status: str) -> Optional[Project]:
         """改变项目状态"""
@@ -99,6 +138,7 @@ class ProjectCRUD:
         db_project.status = status
         db_project.updated_at = datetime.utcnow()
         db.commit()
+        invalidate(f"project:{project_id}")
         db.refresh(db_project)
         return db_project
 
@@ -6,7 +6,10 @@ from sqlalchemy import and_
 
 from app.models import User
 from app.schemas import UserCreate, UserUpdate
-from app.core.security import SecurityUtility
+from app.crud.pagination import paginate
+from app.core.security import SecurityUtility, user_cache
+from app.core.cache import invalidate
+from app.crud.counters import SystemCounterCRUD, USERS
 
 
 class UserCRUD:
@@ -24,7 +27,9 @@ class UserCRUD:
             status="active"
         )
         db.add(db_user)
+        SystemCounterCRUD.add(db, USERS)
         db.commit()
+        invalidate("stats")
         db.refresh(db_user)
         return db_user
 
@@ -49,7 +54,8 @@ class UserCRUD:
         skip: int = 0, 
         limit: int = 10,
         role: Optional[str] = None,
-        status: Optional[str] = None
+        status: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> List[User]:
         """列出用户"""
         query = db.query(User)
@@ -59,12 +65,17 @@ class UserCRUD:
         if status:
             query = query.filter(User.status == status)
         
-        return query.offset(skip).limit(limit).all()
+        return paginate(query, User, skip, limit, cursor).all()
 
     @staticmethod
-    def count(db: Session) -> int:
-        """获取用户总数"""
-        return db.query(User).count()
+    def count(db: Session, role: Optional[str] = None, status: Optional[str] = None) -> int:
+        """获取用户总数（可按角色、状态筛选，与 list_users 的条件一致）"""
+        query = db.query(User)
+        if role:
+            query = query.filter(User.role == role)
+        if status:
+            query = query.filter(User.status == status)
+        return query.count()
 
     @staticmethod
     def update(db: Session, user_id: int, user_update: UserUpdate) -> Optional[User]:
@@ -84,6 +95,7 @@ class UserCRUD:
         
         db.commit()
         db.refresh(db_user)
+        user_cache.invalidate(user_id)
         return db_user
 
     @staticmethod
@@ -94,7 +106,10 @@ class UserCRUD:
             return False
         
         db.delete(db_user)
+        SystemCounterCRUD.add(db, USERS, -1)
         db.commit()
+        invalidate("stats")
+        user_cache.invalidate(user_id)
         return True
 
     @staticmethod
@@ -107,4 +122,5 @@ class UserCRUD:
         db_user.status = status
         db.commit()
         db.refresh(db_user)
+        user_cache.invalidate(user_id)
         return db_user
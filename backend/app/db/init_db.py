@@ -65,6 +65,8 @@ def create_sample_data():
             )
             db.add(admin)
         
+        from app.crud.counters import SystemCounterCRUD, USERS
+        SystemCounterCRUD.add(db, USERS, len(db.new))
         db.commit()
         logger.info("✅ Demo user created successfully")
         
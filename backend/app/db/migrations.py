@@ -0,0 +1,275 @@
+"""
+Database schema migrations
+
+init_db() uses create_all, which only creates missing tables. Nullable
+columns and indexes added to existing tables in app.models are created here,
+prediction results still stored as results_json are moved to the result
+store, and the system counters are backfilled from the tables the first time
+they exist.
+
+Columns added to existing tables since the initial schema:
+- predictions.parameters_json: inference parameters of server-side runs
+- predictions.result_key: key of the results in the result store
+- well_logs.deleted_at: logs waiting for the background purge
+- projects.deleted_at: projects whose logs are waiting for the background purge
+- well_logs.purge_*: claim and progress of the background purge
+
+init_db() runs upgrade() on every start, so a database created by any
+earlier version is brought up to date before the first request.
+
+Rewriting curve_data touches every sample, so it is not part of upgrade()
+and runs as a one-off command in a maintenance window instead:
+- compact: move curve_data to the curve dictionary layout (curve_id instead
+  of per-sample curve names), backfilled in batches of rows by id range
+- partition: partition curve_data by log_id when CURVE_PARTITIONING is
+  enabled (MySQL); run it after compact
+
+Usage:
+    python -m app.db.migrations [upgrade | compact | partition]
+"""
+import logging
+from typing import List
+
+from sqlalchemy import bindparam, inspect, null, select, text
+from sqlalchemy.engine import Engine
+
+from app.db.session import Base
+from app.db.partitioning import get_partitions, partition_curve_data
+
+logger = logging.getLogger(__name__)
+
+
+def create_missing_columns(bind: Engine) -> List[str]:
+    """
+    Add nullable columns declared on the models that are missing from existing tables
+    """
+    import app.models  # noqa: F401  (register all tables on Base.metadata)
+
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=bind.dialect)
+            with bind.begin() as connection:
+                connection.execute(text(
+                    f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                ))
+            created.append(f"{table.name}.{column.name}")
+            logger.info(f"Added column {column.name} to {table.name}")
+    return created
+
+
+def create_missing_indexes(bind: Engine) -> List[str]:
+    """
+    Create indexes declared on the models that are missing from existing tables
+    """
+    import app.models  # noqa: F401  (register all tables on Base.metadata)
+
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=bind)
+                created.append(index.name)
+                logger.info(f"Created index {index.name} on {table.name}")
+    return created
+
+
+def needs_compaction(bind: Engine) -> bool:
+    """
+    Whether curve_data still stores a curve name per sample
+    """
+    inspector = inspect(bind)
+    if "curve_data" not in inspector.get_table_names():
+        return False
+    return "curve_name" in {column["name"] for column in inspector.get_columns("curve_data")}
+
+
+def compact_curve_data(bind: Engine, batch_size: int = 10000) -> bool:
+    """
+    Move curve_data from per-sample curve names to the curve dictionary
+
+    Adds curve_id (from the distinct curve names), maps quality flag names
+    stored by older code to QualityFlag bits, and drops curve_name,
+    created_at and the redundant index on the primary key. The backfill
+    commits every batch_size ids, so it holds no long-running lock and an
+    interrupted run continues where it stopped. On SQLite run VACUUM
+    afterwards to return the freed pages to the file system.
+    """
+    from app.models import QualityFlag
+
+    if not needs_compaction(bind):
+        return False
+    inspector = inspect(bind)
+    columns = {column["name"] for column in inspector.get_columns("curve_data")}
+    dialect = bind.dialect.name
+    indexes = {index["name"] for index in inspector.get_indexes("curve_data")}
+    curve_name = "COALESCE(curve_data.curve_name, 'unknown')"
+
+    with bind.begin() as connection:
+        connection.execute(text(
+            f"INSERT INTO curves (name) SELECT DISTINCT {curve_name} FROM curve_data "
+            f"WHERE {curve_name} NOT IN (SELECT name FROM curves)"
+        ))
+        if "curve_id" not in columns:
+            connection.execute(text("ALTER TABLE curve_data ADD COLUMN curve_id SMALLINT"))
+        low, high = connection.execute(text("SELECT MIN(id), MAX(id) FROM curve_data")).one()
+
+    batches = 0
+    for start in range(low or 0, (high or -1) + 1, batch_size):
+        id_range = {"start": start, "stop": start + batch_size}
+        in_range = "id >= :start AND id < :stop"
+        with bind.begin() as connection:
+            connection.execute(text(
+                f"UPDATE curve_data SET curve_id = "
+                f"(SELECT curves.id FROM curves WHERE curves.name = {curve_name}) "
+                f"WHERE {in_range} AND curve_id IS NULL"
+            ), id_range)
+            if dialect == "sqlite":
+                # SQLite kept the strings ("good", ...) written into the integer column
+                for name, flag in QualityFlag.__members__.items():
+                    connection.execute(text(
+                        f"UPDATE curve_data SET quality_flag = :bits WHERE {in_range} AND quality_flag = :name"
+                    ), {**id_range, "bits": int(flag), "name": name.lower()})
+            connection.execute(text(
+                f"UPDATE curve_data SET quality_flag = 0 WHERE {in_range} AND quality_flag IS NULL"
+            ), id_range)
+        batches += 1
+    logger.info(f"Backfilled curve_data.curve_id in {batches} batches")
+
+    with bind.begin() as connection:
+        if "ix_curve_data_id" in indexes:
+            on_table = " ON curve_data" if dialect == "mysql" else ""
+            connection.execute(text(f"DROP INDEX ix_curve_data_id{on_table}"))
+        for column in ("curve_name", "created_at"):
+            if column in columns:
+                connection.execute(text(f"ALTER TABLE curve_data DROP COLUMN {column}"))
+        if dialect == "mysql":
+            connection.execute(text(
+                "ALTER TABLE curve_data MODIFY curve_id SMALLINT NOT NULL, "
+                "MODIFY quality_flag SMALLINT NOT NULL DEFAULT 0"
+            ))
+            # Partitioned tables cannot have foreign keys
+            if not get_partitions(bind):
+                connection.execute(text(
+                    "ALTER TABLE curve_data ADD FOREIGN KEY (curve_id) REFERENCES curves (id)"
+                ))
+    logger.info("Moved curve_data to the curve dictionary layout")
+    return True
+
+
+def move_results_to_store(bind: Engine, batch_size: int = 500) -> int:
+    """
+    Move prediction results still stored as results_json blobs into the result store
+
+    Rows whose JSON cannot be converted (see curves_from_json) keep their
+    results_json and are logged. Returns the number of converted rows.
+    """
+    from app.models import Prediction
+    from app.services.prediction_service import PredictionService
+
+    table = Prediction.__table__
+    converted = skipped = 0
+    last_id = 0
+    while True:
+        with bind.connect() as connection:
+            rows = connection.execute(
+                select(table.c.id, table.c.results_json, table.c.depth_from, table.c.depth_to).where(
+                    table.c.id > last_id,
+                    table.c.result_key.is_(None),
+                    table.c.results_json.isnot(None)
+                ).order_by(table.c.id).limit(batch_size)
+            ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        updates = []
+        for row in rows:
+            try:
+                stored = PredictionService.store_results(row.results_json, row.depth_from, row.depth_to)
+            except ValueError:
+                skipped += 1
+                continue
+            if stored["result_key"] is not None:
+                updates.append({"row_id": row.id, **stored})
+        if updates:
+            with bind.begin() as connection:
+                connection.execute(
+                    table.update().where(table.c.id == bindparam("row_id")).values(
+                        result_key=bindparam("result_key"),
+                        results_json=null(),
+                        depth_from=bindparam("depth_from"),
+                        depth_to=bindparam("depth_to")
+                    ),
+                    updates
+                )
+            converted += len(updates)
+
+    if converted or skipped:
+        logger.info(f"Moved {converted} prediction results to the result store, {skipped} left as JSON")
+    return converted
+
+
+def backfill_counters(bind: Engine) -> bool:
+    """
+    Compute the system counters from the tables if they were never populated
+    """
+    from sqlalchemy.orm import Session
+    from app.crud.counters import SystemCounterCRUD
+
+    with Session(bind=bind) as db:
+        if not SystemCounterCRUD.is_empty(db):
+            return False
+        counters = SystemCounterCRUD.rebuild(db)
+    logger.info(f"Backfilled system counters: {counters}")
+    return True
+
+
+def upgrade(bind: Engine) -> None:
+    """
+    Bring an existing database up to the current schema
+    """
+    import app.models  # noqa: F401  (register all tables on Base.metadata)
+
+    Base.metadata.create_all(bind=bind)
+    create_missing_columns(bind)
+    create_missing_indexes(bind)
+    move_results_to_store(bind)
+    backfill_counters(bind)
+    if needs_compaction(bind):
+        logger.warning(
+            "curve_data still uses the per-sample curve name layout; "
+            "run python -m app.db.migrations compact"
+        )
+
+
+COMMANDS = {
+    "upgrade": upgrade,
+    "compact": compact_curve_data,
+    "partition": partition_curve_data,
+}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from app.db.session import engine
+
+    parser = argparse.ArgumentParser(prog="python -m app.db.migrations")
+    parser.add_argument("command", nargs="?", default="upgrade", choices=COMMANDS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    COMMANDS[args.command](engine)
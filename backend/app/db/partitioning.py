@@ -0,0 +1,172 @@
+"""
+Optional RANGE partitioning of curve_data by log_id (MySQL)
+
+curve_data is by far the largest table and every query on it filters on
+log_id. With CURVE_PARTITIONING enabled on MySQL the table is partitioned by
+RANGE (log_id), CURVE_PARTITION_SIZE log ids per partition, plus a pmax
+catch-all partition:
+
+- depth-range reads and whole-log deletes are pruned to a single partition
+- once no live log is left in a closed range (all of its ids are below the
+  highest log id), LogPurger drops the partition instead of deleting its rows
+
+MySQL partitioned tables cannot have foreign keys and every unique key must
+contain the partition column, so partitioning drops the log_id foreign key and
+changes the primary key to (id, log_id). Converting an existing table rewrites
+it, so run the migration in a maintenance window.
+
+SQLite has no partitioning. There the (log_id, depth) index already keeps each
+log's rows in one contiguous index range, and the functions below are no-ops.
+"""
+import logging
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+TABLE = "curve_data"
+MAXVALUE = "pmax"
+
+# (partition name, exclusive upper bound of log_id; None for pmax)
+Partition = Tuple[str, Optional[int]]
+
+
+def enabled(bind: Engine) -> bool:
+    """
+    Whether curve_data partitioning applies to this database
+    """
+    return settings.CURVE_PARTITIONING and bind.dialect.name == "mysql"
+
+
+def partition_name(upper: int) -> str:
+    return f"p{upper // settings.CURVE_PARTITION_SIZE}"
+
+
+def partition_bounds(max_log_id: int) -> List[int]:
+    """
+    Upper bounds of the ranges covering log ids up to max_log_id, plus
+    CURVE_PARTITIONS_AHEAD empty ranges for logs created later
+    """
+    size = settings.CURVE_PARTITION_SIZE
+    last = (max_log_id // size + 1 + settings.CURVE_PARTITIONS_AHEAD) * size
+    return list(range(size, last + 1, size))
+
+
+def partition_definitions(uppers: Sequence[int], with_maxvalue: bool = True) -> str:
+    parts = [f"PARTITION {partition_name(upper)} VALUES LESS THAN ({upper})" for upper in uppers]
+    if with_maxvalue:
+        parts.append(f"PARTITION {MAXVALUE} VALUES LESS THAN MAXVALUE")
+    return ", ".join(parts)
+
+
+def get_partitions(bind: Engine) -> List[Partition]:
+    """
+    Current partitions of curve_data in order; empty when not partitioned
+    """
+    if bind.dialect.name != "mysql":
+        return []
+    with bind.connect() as connection:
+        rows = connection.execute(text(
+            "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table "
+            "ORDER BY PARTITION_ORDINAL_POSITION"
+        ), {"table": TABLE}).all()
+    return [
+        (name, None if description == "MAXVALUE" else int(description))
+        for name, description in rows if name is not None
+    ]
+
+
+def _max_log_id(db: Session) -> int:
+    from app.models import WellLog
+
+    return db.query(func.max(WellLog.id)).execution_options(include_deleted=True).scalar() or 0
+
+
+def partition_curve_data(bind: Engine) -> bool:
+    """
+    Convert curve_data to a partitioned table (once)
+    """
+    if not enabled(bind) or get_partitions(bind):
+        return False
+    with Session(bind=bind) as db:
+        uppers = partition_bounds(_max_log_id(db))
+
+    with bind.begin() as connection:
+        for foreign_key in inspect(bind).get_foreign_keys(TABLE):
+            connection.execute(text(f"ALTER TABLE {TABLE} DROP FOREIGN KEY {foreign_key['name']}"))
+        connection.execute(text(f"ALTER TABLE {TABLE} DROP PRIMARY KEY, ADD PRIMARY KEY (id, log_id)"))
+        connection.execute(text(
+            f"ALTER TABLE {TABLE} PARTITION BY RANGE (log_id) ({partition_definitions(uppers)})"
+        ))
+    logger.info(f"Partitioned {TABLE} by log_id into {len(uppers) + 1} partitions")
+    return True
+
+
+def add_partitions(db: Session) -> List[str]:
+    """
+    Split pmax so that CURVE_PARTITIONS_AHEAD empty ranges stay ahead of the newest log
+    """
+    bind = db.get_bind()
+    if not enabled(bind):
+        return []
+    partitions = get_partitions(bind)
+    bounded = [upper for _, upper in partitions if upper is not None]
+    if not bounded:
+        return []
+    uppers = [upper for upper in partition_bounds(_max_log_id(db)) if upper > bounded[-1]]
+    if not uppers:
+        return []
+    with bind.begin() as connection:
+        connection.execute(text(
+            f"ALTER TABLE {TABLE} REORGANIZE PARTITION {MAXVALUE} INTO ({partition_definitions(uppers)})"
+        ))
+    names = [partition_name(upper) for upper in uppers]
+    logger.info(f"Added {TABLE} partitions {names}")
+    return names
+
+
+def droppable_partitions(db: Session, partitions: Sequence[Partition]) -> List[str]:
+    """
+    Bounded partitions whose log id range is closed and holds no live log
+    """
+    from app.models import WellLog
+
+    max_log_id = _max_log_id(db)
+    droppable = []
+    lower = 0
+    for name, upper in partitions:
+        if upper is None or upper > max_log_id:
+            break
+        # Soft-deleted logs are excluded by the deleted_at query filter
+        live = db.query(func.count(WellLog.id)).filter(
+            WellLog.id >= lower,
+            WellLog.id < upper
+        ).scalar()
+        if not live:
+            droppable.append(name)
+        lower = upper
+    return droppable
+
+
+def drop_purged_partitions(db: Session) -> List[str]:
+    """
+    Drop the partitions of closed log id ranges without live logs
+
+    The curve rows of soft-deleted logs in those ranges disappear at once;
+    LogPurger then only has to remove the log rows.
+    """
+    bind = db.get_bind()
+    if not enabled(bind):
+        return []
+    names = droppable_partitions(db, get_partitions(bind))
+    if names:
+        with bind.begin() as connection:
+            connection.execute(text(f"ALTER TABLE {TABLE} DROP PARTITION {', '.join(names)}"))
+        logger.info(f"Dropped {TABLE} partitions {names}")
+    return names
@@ -27,9 +27,14 @@ async def lifespan(app: FastAPI):
     """
     # Startup
     logger.info("🚀 Starting GeologAI WebOS Backend...")
+    from app.services.log_purge_service import log_purger
+    log_purger.start()
     yield
     # Shutdown
     logger.info("🛑 Shutting down GeologAI WebOS Backend...")
+    log_purger.stop()
+    from app.db.session import dispose_async_engines
+    await dispose_async_engines()
 
 
 def create_app():
@@ -66,6 +71,15 @@ def create_app():
         allowed_hosts=["localhost", "127.0.0.1", "testserver", "*"]
     )
     
+    # Add response compression middleware (zstd / br / gzip)
+    from app.api.compression import CompressionMiddleware
+    from app.core.settings import settings
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        encodings=[e.strip() for e in settings.COMPRESSION_ENCODINGS.split(",") if e.strip()]
+    )
+    
     # Exception handlers
     @app.exception_handler(RequestValidationError)
     async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -79,6 +93,21 @@ def create_app():
             }
         )
     
+    from app.core.security import PasswordHasherBusy
+    
+    @app.exception_handler(PasswordHasherBusy)
+    async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+        return JSONResponse(
+            status_code=503,
+            content={
+                "code": 503,
+                "message": "Service Unavailable",
+                "detail": "Too many concurrent password operations",
+                "timestamp": datetime.utcnow().isoformat()
+            },
+            headers={"Retry-After": "1"}
+        )
+    
     @app.exception_handler(Exception)
     async def general_exception_handler(request: Request, exc: Exception):
         logger.error(f"Unhandled exception: {exc}")
@@ -171,7 +200,9 @@ if __name__ == "__main__":
     
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", 8000))
-    workers = int(os.getenv("WORKERS", 1))
+    # 与连接池按进程分配预算时使用的 WORKERS 保持一致
+    from app.core.settings import settings
+    workers = settings.WORKERS
     
     uvicorn.run(
         "main:app",
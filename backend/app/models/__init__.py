@@ -2,8 +2,12 @@
 SQLAlchemy ORM Models for Database
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, Enum, ForeignKey, Text, JSON, Boolean, Index
-from sqlalchemy.orm import relationship
+from typing import Optional
+from sqlalchemy import (
+    Column, Integer, SmallInteger, BigInteger, String, Float, Date, DateTime, Enum, ForeignKey, Text, JSON,
+    Boolean, Index, event, select
+)
+from sqlalchemy.orm import Session, relationship, with_loader_criteria
 from app.db.session import Base
 import enum
 
@@ -49,6 +53,32 @@ class PredictionStatus(str, enum.Enum):
     FAILED = "failed"
 
 
+class QualityFlag(enum.IntFlag):
+    """Curve sample quality bits, stored as a small integer (0 = good)"""
+    GOOD = 0
+    SUSPECT = 1
+    BAD = 2
+    INTERPOLATED = 4
+    MISSING = 8
+
+    @classmethod
+    def parse(cls, value) -> int:
+        """
+        Bitmask from an integer or from names such as "good" or "suspect|interpolated"
+        """
+        if value is None:
+            return cls.GOOD
+        if isinstance(value, str):
+            flags = cls.GOOD
+            for name in value.replace(",", "|").split("|"):
+                name = name.strip().upper()
+                if name not in cls.__members__:
+                    raise ValueError(f"Unknown quality flag: {value}")
+                flags |= cls[name]
+            return int(flags)
+        return int(cls(int(value)))
+
+
 class User(Base):
     """User model"""
     __tablename__ = "users"
@@ -75,6 +105,7 @@ class User(Base):
     __table_args__ = (
         Index('idx_user_status', 'status'),
         Index('idx_user_role', 'role'),
+        Index('idx_user_created', 'created_at'),
     )
 
 
@@ -93,6 +124,7 @@ class Project(Base):
     status = Column(Enum(ProjectStatus), default=ProjectStatus.PLANNING)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    deleted_at = Column(DateTime)  # Set while the project's logs await background purge
     
     # Relationships
     owner = relationship("User", back_populates="projects")
@@ -101,6 +133,8 @@ class Project(Base):
     __table_args__ = (
         Index('idx_project_owner', 'owner_id'),
         Index('idx_project_status', 'status'),
+        Index('idx_project_created', 'created_at'),
+        Index('idx_project_owner_created', 'owner_id', 'created_at'),
     )
 
 
@@ -121,6 +155,13 @@ class WellLog(Base):
     status = Column(Enum(LogStatus), default=LogStatus.PROCESSING)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    deleted_at = Column(DateTime)  # Set when the log awaits background purge
+    # Background purge claim and progress, shared by the purgers of all workers
+    purge_claimed_by = Column(String(64))
+    purge_heartbeat_at = Column(DateTime)
+    purge_started_at = Column(DateTime)
+    purge_rows_deleted = Column(Integer)
+    purge_batches = Column(Integer)
     
     # Relationships
     project = relationship("Project", back_populates="logs")
@@ -131,28 +172,54 @@ class WellLog(Base):
     __table_args__ = (
         Index('idx_log_project', 'project_id'),
         Index('idx_log_status', 'status'),
+        Index('idx_log_created', 'created_at'),
+        Index('idx_log_project_created', 'project_id', 'created_at'),
     )
 
 
+class Curve(Base):
+    """Curve dictionary: each curve mnemonic is stored once"""
+    __tablename__ = "curves"
+    
+    id = Column(SmallInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    name = Column(String(50), nullable=False, unique=True)
+
+
 class CurveData(Base):
-    """Individual curve data points"""
+    """
+    Individual curve data points
+
+    Samples reference the curve dictionary by a small integer id. Constructing
+    CurveData(curve_name="GR", ...) resolves (or adds) the dictionary entry at
+    flush time.
+    """
     __tablename__ = "curve_data"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     log_id = Column(Integer, ForeignKey("well_logs.id"), nullable=False)
-    curve_name = Column(String(50))
+    curve_id = Column(SmallInteger, ForeignKey("curves.id"), nullable=False)
     depth = Column(Float)
     value = Column(Float)
-    quality_flag = Column(Integer, default=0)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    quality_flag = Column(SmallInteger, nullable=False, default=0)  # QualityFlag bits
     
     # Relationships
     log = relationship("WellLog", back_populates="curves")
+    curve = relationship("Curve", lazy="selectin")
     
     __table_args__ = (
         Index('idx_curve_log_depth', 'log_id', 'depth'),
     )
 
+    def __init__(self, curve_name: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._curve_name = curve_name
+
+    @property
+    def curve_name(self) -> Optional[str]:
+        if self.curve is not None:
+            return self.curve.name
+        return getattr(self, "_curve_name", None)
+
 
 class AIModel(Base):
     """AI Model information"""
@@ -177,6 +244,7 @@ class AIModel(Base):
     
     __table_args__ = (
         Index('idx_model_status', 'status'),
+        Index('idx_model_created', 'created_at'),
     )
 
 
@@ -189,7 +257,9 @@ class Prediction(Base):
     model_id = Column(Integer, ForeignKey("ai_models.id"), nullable=False)
     depth_from = Column(Float)
     depth_to = Column(Float)
-    results_json = Column(JSON)
+    results_json = Column(JSON)  # Legacy results; new results live in the result store
+    result_key = Column(String(64))  # Content digest in the result store
+    parameters_json = Column(JSON)  # Inference parameters (window size, overlap, curves, ...)
     confidence = Column(Float)
     execution_time = Column(Integer)  # milliseconds
     status = Column(Enum(PredictionStatus), default=PredictionStatus.SUCCESS)
@@ -205,9 +275,61 @@ class Prediction(Base):
         Index('idx_prediction_log', 'log_id'),
         Index('idx_prediction_model', 'model_id'),
         Index('idx_prediction_status', 'status'),
+        Index('idx_prediction_result_key', 'result_key'),
+        Index('idx_prediction_created', 'created_at'),
+        Index('idx_prediction_log_created', 'log_id', 'created_at'),
+        Index('idx_prediction_model_created', 'model_id', 'created_at'),
+        Index('idx_prediction_model_time', 'model_id', 'execution_time'),
+    )
+
+
+class PredictionCacheEntry(Base):
+    """Prediction result cache index
+
+    cache_key is the SHA-256 of (input curve data digest, model id/version,
+    inference parameters); a hit references the existing result store file.
+    """
+    __tablename__ = "prediction_cache"
+    
+    cache_key = Column(String(64), primary_key=True)
+    log_id = Column(Integer, ForeignKey("well_logs.id"), nullable=False)
+    model_id = Column(Integer, ForeignKey("ai_models.id"), nullable=False)
+    result_key = Column(String(64), nullable=False)
+    depth_from = Column(Float)
+    depth_to = Column(Float)
+    size_bytes = Column(Integer, default=0)
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('idx_prediction_cache_log', 'log_id'),
+        Index('idx_prediction_cache_model', 'model_id'),
+        Index('idx_prediction_cache_last_used', 'last_used_at'),
     )
 
 
+class SystemCounter(Base):
+    """System counters (row counts per table, bytes stored)
+
+    Adjusted by the CRUD create/delete paths in the same transaction, so the
+    admin statistics need no COUNT(*).
+    """
+    __tablename__ = "system_counters"
+    
+    name = Column(String(50), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+
+class DailyCounter(Base):
+    """Per-day counts (uploads, predictions, change in bytes stored)"""
+    __tablename__ = "daily_counters"
+    
+    day = Column(Date, primary_key=True)
+    name = Column(String(50), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+
 class AuditLog(Base):
     """Operation audit log"""
     __tablename__ = "audit_logs"
@@ -229,3 +351,68 @@ class AuditLog(Base):
         Index('idx_audit_user_time', 'user_id', 'created_at'),
         Index('idx_audit_resource', 'resource_type', 'resource_id'),
     )
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _hide_deleted(execute_state):
+    """
+    Hide soft-deleted well logs and projects (deleted_at set) from every ORM SELECT
+
+    Use execution_options(include_deleted=True) to see them (log purge).
+    """
+    if (
+        execute_state.is_select
+        and not execute_state.is_column_load
+        and not execute_state.is_relationship_load
+        and not execute_state.execution_options.get("include_deleted", False)
+    ):
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(WellLog, WellLog.deleted_at.is_(None), include_aliases=True),
+            with_loader_criteria(Project, Project.deleted_at.is_(None), include_aliases=True)
+        )
+
+
+@event.listens_for(Session, "before_flush")
+def _resolve_curve_names(session, flush_context, instances):
+    """
+    Point new CurveData rows built from a curve name at their dictionary entry
+    """
+    pending = [
+        obj for obj in session.new
+        if isinstance(obj, CurveData) and obj.curve is None and obj.curve_id is None
+        and getattr(obj, "_curve_name", None) is not None
+    ]
+    if not pending:
+        return
+    with session.no_autoflush:
+        curves = get_curves(session, {obj._curve_name for obj in pending})
+    for obj in pending:
+        obj.curve = curves[obj._curve_name]
+
+
+def get_curves(session: Session, names) -> dict:
+    """
+    Dictionary entries (name -> Curve) of the given curve names, adding the missing ones
+
+    Missing names are inserted with INSERT ... ON CONFLICT DO NOTHING (INSERT
+    IGNORE on MySQL), so concurrent writers adding the same name do not fail.
+    """
+    names = set(names)
+    query = select(Curve).where(Curve.name.in_(names))
+    curves = {curve.name: curve for curve in session.scalars(query)}
+    missing = names - curves.keys()
+    if missing:
+        dialect = session.get_bind(clause=Curve.__table__.insert()).dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            statement = insert(Curve.__table__).on_conflict_do_nothing(index_elements=["name"])
+        elif dialect == "mysql":
+            statement = Curve.__table__.insert().prefix_with("IGNORE")
+        else:
+            statement = Curve.__table__.insert()
+        session.execute(statement, [{"name": name} for name in sorted(missing)])
+        curves.update({curve.name: curve for curve in session.scalars(query)})
+    return curves
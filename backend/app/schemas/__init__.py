@@ -111,9 +111,10 @@ class ProjectDetailResponse(ProjectResponse):
 
 class ProjectListResponse(BaseModel):
     data: List[ProjectResponse]
-    total: int
+    total: Optional[int] = None
     skip: int
     limit: int
+    next_cursor: Optional[str] = None
 
 
 # Well Log Schemas
@@ -149,11 +150,31 @@ class WellLogResponse(WellLogBase):
         from_attributes = True
 
 
+class WellLogSummary(BaseModel):
+    """列表用的测井摘要，不含 curves_json"""
+    id: int
+    project_id: int
+    filename: str
+    file_size: int
+    file_path: Optional[str] = None
+    depth_from: Optional[float] = None
+    depth_to: Optional[float] = None
+    sample_count: Optional[int] = None
+    upload_user_id: Optional[int]
+    status: str
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
 class WellLogListResponse(BaseModel):
-    data: List[WellLogResponse]
-    total: int
+    data: List[WellLogSummary]
+    total: Optional[int] = None
     skip: int
     limit: int
+    next_cursor: Optional[str] = None
 
 
 # Curve Data Schemas
@@ -212,6 +233,9 @@ class PredictionCreate(BaseModel):
     # Allow creation with arbitrary float so service layer can validate range and return controlled errors
     confidence: float
     execution_time: Optional[float] = None
+    parameters_json: Optional[dict] = None
+    depth_from: Optional[float] = None
+    depth_to: Optional[float] = None
 
     @validator('results_json', pre=True)
     def parse_results_json(cls, v):
@@ -225,6 +249,25 @@ class PredictionCreate(BaseModel):
         return v
 
 
+class InferenceParameters(BaseModel):
+    """推理参数覆盖，未给出的参数取模型配置或全局配置"""
+    window_size: Optional[int] = Field(None, gt=0)
+    overlap: Optional[int] = Field(None, ge=0)
+    batch_size: Optional[int] = Field(None, gt=0)
+    curves: Optional[List[str]] = None
+    output_curves: Optional[List[str]] = None
+
+    class Config:
+        extra = "forbid"
+
+
+class PredictionRunRequest(BaseModel):
+    log_id: int
+    model_id: int
+    parameters: Optional[dict] = None  # 由服务层按 InferenceParameters 校验，无效时返回 400
+    use_cache: bool = True
+
+
 class PredictionUpdate(BaseModel):
     results_json: Optional[dict] = None
     confidence: Optional[float] = None
@@ -236,6 +279,29 @@ class PredictionResponse(BaseModel):
     log_id: int
     model_id: int
     results_json: Optional[dict]
+    result_key: Optional[str] = None
+    parameters_json: Optional[dict] = None
+    depth_from: Optional[float] = None
+    depth_to: Optional[float] = None
+    confidence: float
+    execution_time: Optional[float]
+    status: str
+    error_message: Optional[str]
+    created_at: datetime
+    updated_at: Optional[datetime]
+    
+    class Config:
+        from_attributes = True
+
+
+class PredictionSummary(BaseModel):
+    """列表用的预测摘要，不含 results_json 和 parameters_json"""
+    id: int
+    log_id: int
+    model_id: int
+    result_key: Optional[str] = None
+    depth_from: Optional[float] = None
+    depth_to: Optional[float] = None
     confidence: float
     execution_time: Optional[float]
     status: str
@@ -248,10 +314,11 @@ class PredictionResponse(BaseModel):
 
 
 class PredictionListResponse(BaseModel):
-    data: List[PredictionResponse]
-    total: int
+    data: List[PredictionSummary]
+    total: Optional[int] = None
     skip: int
     limit: int
+    next_cursor: Optional[str] = None
 
 
 # Pagination Schemas
@@ -269,9 +336,10 @@ class PaginatedResponse(BaseModel):
 
 class UserListResponse(BaseModel):
     data: List[UserResponse]
-    total: int
+    total: Optional[int] = None
     skip: int
     limit: int
+    next_cursor: Optional[str] = None
 
 
 # Generic Response Schema
@@ -16,6 +16,9 @@
 - DataService: 测井数据管理和分析
 - PredictionService: AI预测结果管理
 - FileParserService: 多格式文件解析
+- InferenceService: 滑动窗口模型推理
+- BatchScoringService: 项目级离线批量打分
+- LogPurger (log_purge_service): 已删除测井曲线数据的后台分批清除
 """
 
 from app.services.user_service import UserService
@@ -23,6 +26,8 @@ from app.services.project_service import ProjectService
 from app.services.data_service import DataService
 from app.services.prediction_service import PredictionService
 from app.services.file_parser_service import FileParserService
+from app.services.inference_service import InferenceService
+from app.services.batch_scoring_service import BatchScoringService
 
 __all__ = [
     "UserService",
@@ -30,6 +35,8 @@ __all__ = [
     "DataService",
     "PredictionService",
     "FileParserService",
+    "InferenceService",
+    "BatchScoringService",
 ]
 
 
@@ -60,6 +67,16 @@ class ServiceFactory:
     def get_file_parser_service():
         """获取文件解析服务"""
         return FileParserService
+    
+    @staticmethod
+    def get_inference_service():
+        """获取推理服务"""
+        return InferenceService
+    
+    @staticmethod
+    def get_batch_scoring_service():
+        """获取批量打分服务"""
+        return BatchScoringService
 
 
 # 快速访问
@@ -0,0 +1,256 @@
+"""离线批量打分业务逻辑服务
+
+对一个项目下的全部测井运行同一个 AI 模型：
+- 每条测井在独立进程中执行滑动窗口推理，充分利用多核 CPU
+- 工作进程直接将结果写入结果存储，只向主进程返回结果键
+- 主进程按批写入 Prediction 记录，并记录每条测井的推理耗时
+- 已有成功预测的测井会被跳过，中断后重新执行即可从断点继续
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.cache import invalidate
+from app.crud import AIModelCRUD, ProjectCRUD
+from app.crud.counters import SystemCounterCRUD, PREDICTIONS, DAILY_PREDICTIONS
+from app.models import Prediction, PredictionStatus, WellLog
+from app.services.inference_service import InferenceService, PredictFn
+
+logger = logging.getLogger(__name__)
+
+# 工作进程内的全局状态，由 _init_worker 初始化
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(database_url: str, model_id: int, predict_fn: Optional[PredictFn]) -> None:
+    """工作进程初始化：建立独立的数据库连接并只加载一次模型"""
+    engine = create_engine(database_url)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    _worker_state["session_factory"] = session_factory
+
+    window_size = None
+    if predict_fn is None:
+        db = session_factory()
+        try:
+            model = AIModelCRUD.get_by_id(db, model_id)
+            predict_fn, window_size = InferenceService.load_predictor(model)
+        finally:
+            db.close()
+    _worker_state["predict_fn"] = predict_fn
+    _worker_state["window_size"] = window_size
+
+
+def _score_log_in_session(
+    db: Session,
+    predict_fn: PredictFn,
+    log_id: int,
+    parameters: Dict[str, Any]
+) -> Tuple[int, Optional[Dict], int, Optional[str], Dict[str, Any]]:
+    """为单条测井打分，返回 (log_id, 结果, 耗时毫秒, 错误信息, 实际推理参数)"""
+    started = time.perf_counter()
+    try:
+        results = InferenceService.predict_log(db, log_id, predict_fn, parameters)
+        return log_id, results, int((time.perf_counter() - started) * 1000), None, parameters
+    except Exception as e:
+        return log_id, None, int((time.perf_counter() - started) * 1000), str(e), parameters
+
+
+def _score_log(
+    log_id: int,
+    parameters: Dict[str, Any],
+    window_fixed: bool
+) -> Tuple[int, Optional[Dict], int, Optional[str], Dict[str, Any]]:
+    """工作进程入口：使用进程内的连接和模型为单条测井打分"""
+    window_size = _worker_state.get("window_size")
+    if window_size and not window_fixed:
+        # 未显式指定窗口时以模型配置的 max_position_embeddings 为准
+        parameters = dict(
+            parameters,
+            window_size=window_size,
+            overlap=min(parameters["overlap"], window_size - 1)
+        )
+    db = _worker_state["session_factory"]()
+    try:
+        return _score_log_in_session(db, _worker_state["predict_fn"], log_id, parameters)
+    finally:
+        db.close()
+
+
+class BatchScoringService:
+    """离线批量打分服务"""
+
+    @staticmethod
+    def get_pending_log_ids(db: Session, project_id: int, model_id: int) -> List[int]:
+        """获取项目中尚未被该模型成功打分的测井ID"""
+        scored = db.query(Prediction.log_id).filter(
+            Prediction.model_id == model_id,
+            Prediction.status == PredictionStatus.SUCCESS
+        )
+        rows = db.query(WellLog.id).filter(
+            WellLog.project_id == project_id,
+            ~WellLog.id.in_(scored)
+        ).order_by(WellLog.id.asc()).all()
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def score_project(
+        db: Session,
+        project_id: int,
+        model_id: int,
+        workers: Optional[int] = None,
+        parameters: Optional[Dict[str, Any]] = None,
+        commit_every: int = 20,
+        predict_fn: Optional[PredictFn] = None,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> Dict[str, Any]:
+        """并行为项目下的全部测井打分
+
+        Args:
+            workers: 工作进程数，默认 CPU 核数；0 表示在当前进程中串行执行
+            parameters: 推理参数覆盖（window_size, overlap, batch_size, curves）
+            commit_every: 每累计多少条结果批量写入一次数据库
+            predict_fn: 可选的推理函数（需可被 pickle），为空时从模型文件加载
+            progress: 进度回调 (已完成数, 总数)
+        """
+        project = ProjectCRUD.get_by_id(db, project_id)
+        if not project:
+            return {
+                "success": False,
+                "error": "project_not_found",
+                "message": "项目不存在"
+            }
+
+        model = AIModelCRUD.get_by_id(db, model_id)
+        if not model:
+            return {
+                "success": False,
+                "error": "model_not_found",
+                "message": "模型不存在"
+            }
+
+        if model.status != "active":
+            return {
+                "success": False,
+                "error": "model_inactive",
+                "message": f"模型已禁用（状态: {model.status}）"
+            }
+
+        try:
+            run_params = InferenceService.resolve_parameters(model, overrides=parameters)
+        except ValueError as e:
+            return {
+                "success": False,
+                "error": "invalid_parameters",
+                "message": str(e)
+            }
+
+        total_logs = db.query(WellLog).filter(WellLog.project_id == project_id).count()
+        pending = BatchScoringService.get_pending_log_ids(db, project_id, model_id)
+        skipped = total_logs - len(pending)
+        confidence = model.accuracy if model.accuracy is not None else 0.0
+
+        scored = 0
+        failed = 0
+        buffer: List[Prediction] = []
+        started = time.perf_counter()
+
+        def collect(
+            log_id: int,
+            results: Optional[Dict],
+            elapsed_ms: int,
+            error: Optional[str],
+            used_params: Dict[str, Any]
+        ) -> None:
+            nonlocal scored, failed
+            if error is None:
+                scored += 1
+            else:
+                failed += 1
+                logger.warning(f"测井打分失败: Log={log_id} - {error}")
+            results = results or {}
+            buffer.append(Prediction(
+                log_id=log_id,
+                model_id=model_id,
+                result_key=results.get("result_key"),
+                depth_from=results.get("depth_from"),
+                depth_to=results.get("depth_to"),
+                parameters_json=used_params,
+                confidence=confidence if error is None else 0.0,
+                execution_time=elapsed_ms,
+                status=PredictionStatus.SUCCESS if error is None else PredictionStatus.FAILED,
+                error_message=error
+            ))
+            if len(buffer) >= commit_every:
+                flush()
+            if progress:
+                progress(scored + failed, len(pending))
+
+        def flush() -> None:
+            if buffer:
+                db.add_all(buffer)
+                SystemCounterCRUD.add(db, PREDICTIONS, len(buffer))
+                SystemCounterCRUD.add_daily(db, DAILY_PREDICTIONS, len(buffer))
+                db.commit()
+                invalidate(f"model:{model_id}", "stats")
+                buffer.clear()
+
+        try:
+            if workers == 0:
+                if predict_fn is None:
+                    predict_fn, window_size = InferenceService.load_predictor(model)
+                    run_params = InferenceService.resolve_parameters(model, window_size, parameters)
+                for log_id in pending:
+                    collect(*_score_log_in_session(db, predict_fn, log_id, run_params))
+            else:
+                max_workers = workers or os.cpu_count() or 1
+                database_url = db.get_bind().url.render_as_string(hide_password=False)
+                window_fixed = bool(parameters and parameters.get("window_size"))
+                with ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    initializer=_init_worker,
+                    initargs=(database_url, model_id, predict_fn)
+                ) as executor:
+                    # 限制在途任务数，主进程中待写入的结果不会无限堆积
+                    queue = list(reversed(pending))
+                    in_flight: set = set()
+                    while queue or in_flight:
+                        while queue and len(in_flight) < max_workers * 2:
+                            in_flight.add(executor.submit(
+                                _score_log, queue.pop(), run_params, window_fixed
+                            ))
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            collect(*future.result())
+            flush()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"批量打分中断: Project={project_id}, Model={model_id} - {str(e)}")
+            return {
+                "success": False,
+                "error": "batch_scoring_failed",
+                "message": "批量打分中断，重新运行将从断点继续",
+                "scored": scored,
+                "failed": failed
+            }
+
+        elapsed = round(time.perf_counter() - started, 2)
+        logger.info(
+            f"批量打分完成: Project={project.name}, Model={model.name}, "
+            f"成功={scored}, 失败={failed}, 跳过={skipped}, 耗时={elapsed}s"
+        )
+
+        return {
+            "success": True,
+            "total": total_logs,
+            "scored": scored,
+            "failed": failed,
+            "skipped": skipped,
+            "elapsed_seconds": elapsed,
+            "message": f"已完成 {scored} 条测井打分"
+        }
@@ -4,10 +4,14 @@ from typing import Optional, Dict, Any, List
 from sqlalchemy.orm import Session
 import logging
 import json
+import os
 
-from app.models import WellLog, CurveData
+from app.models import WellLog, CurveData, Project
 from app.schemas import WellLogCreate, WellLogUpdate
 from app.crud import WellLogCRUD, CurveDataCRUD, ProjectCRUD
+from app.core.cache import cached, succeeded
+from app.core.settings import settings
+from app.services.prediction_service import PredictionService
 
 logger = logging.getLogger(__name__)
 
@@ -16,10 +20,18 @@ class DataService:
     """数据管理业务逻辑服务"""
 
     @staticmethod
-    def upload_well_log(db: Session, project_id: int, log_data: WellLogCreate) -> Dict[str, Any]:
-        """上传测井数据 - 业务逻辑处理"""
+    def upload_well_log(
+        db: Session,
+        project_id: int,
+        log_data: WellLogCreate,
+        project: Optional[Project] = None
+    ) -> Dict[str, Any]:
+        """上传测井数据 - 业务逻辑处理
+
+        project 为调用方已加载的项目，传入时不再重复查询。
+        """
         # 验证项目存在
-        project = ProjectCRUD.get_by_id(db, project_id)
+        project = project or ProjectCRUD.get_by_id(db, project_id)
         if not project:
             return {
                 "success": False,
@@ -67,6 +79,7 @@ class DataService:
             }
 
     @staticmethod
+    @cached("log_summary:{log_id}", tags=["log:{log_id}"], when=succeeded)
     def get_log_summary(db: Session, log_id: int) -> Dict[str, Any]:
         """获取测井数据摘要信息"""
         log = WellLogCRUD.get_by_id(db, log_id)
@@ -110,9 +123,13 @@ class DataService:
         }
 
     @staticmethod
-    def delete_log_with_data(db: Session, log_id: int) -> Dict[str, Any]:
-        """删除测井及其所有曲线数据"""
-        log = WellLogCRUD.get_by_id(db, log_id)
+    def delete_log_with_data(db: Session, log_id: int, log: Optional[WellLog] = None) -> Dict[str, Any]:
+        """删除测井及其曲线数据、预测结果和存储文件（log 为调用方已加载的测井）
+
+        曲线数据点数（按 curve_data 实际行数计）超过 CASCADE_DELETE_INLINE_SAMPLES 的测井只标记为已删除
+        （scheduled=True），曲线数据由后台 LogPurger 分批清除。
+        """
+        log = log or WellLogCRUD.get_by_id(db, log_id)
         
         if not log:
             return {
@@ -121,20 +138,15 @@ class DataService:
                 "message": "测井数据不存在"
             }
 
+        filename = log.filename
+        scheduled = CurveDataCRUD.count_by_logs(
+            db, WellLog.id == log_id, limit=settings.CASCADE_DELETE_INLINE_SAMPLES + 1
+        ) > settings.CASCADE_DELETE_INLINE_SAMPLES
         try:
-            # 删除所有曲线数据
-            CurveDataCRUD.delete_by_log(db, log_id)
-            
-            # 删除测井记录
-            WellLogCRUD.delete(db, log_id)
-            
-            logger.info(f"测井数据已删除: {log.filename} (ID: {log_id})")
-            
-            return {
-                "success": True,
-                "message": "测井数据删除成功"
-            }
+            # 预测、预测缓存与测井记录（小测井连同曲线）在同一事务内删除
+            deleted = WellLogCRUD.delete_cascade(db, WellLog.id == log_id, soft=scheduled)
         except Exception as e:
+            db.rollback()
             logger.error(f"测井数据删除失败: {str(e)}")
             return {
                 "success": False,
@@ -142,7 +154,46 @@ class DataService:
                 "message": "删除失败"
             }
 
+        DataService.remove_deleted_files(db, deleted)
+        if scheduled:
+            logger.info(f"测井数据已标记删除，等待后台清除: {filename} (ID: {log_id})")
+            return {
+                "success": True,
+                "scheduled": True,
+                "message": "测井数据已删除，曲线数据将在后台清除"
+            }
+        logger.info(f"测井数据已删除: {filename} (ID: {log_id})")
+        
+        return {
+            "success": True,
+            "scheduled": False,
+            "message": "测井数据删除成功"
+        }
+
+    @staticmethod
+    def remove_deleted_files(db: Session, deleted: Dict[str, Any]) -> None:
+        """事务提交后清理被删除测井的上传文件和不再被引用的预测结果文件
+
+        只删除位于 UPLOAD_DIR 下的上传文件；文件删除失败不影响已提交的删除。
+        """
+        upload_dir = os.path.realpath(settings.UPLOAD_DIR)
+        for file_path in deleted["file_paths"]:
+            path = os.path.realpath(file_path)
+            if os.path.commonpath([upload_dir, path]) != upload_dir:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"上传文件删除失败: {file_path} ({str(e)})")
+        try:
+            PredictionService.release_results(db, deleted["result_keys"])
+        except OSError as e:
+            logger.warning(f"预测结果文件清理失败: {str(e)}")
+
     @staticmethod
+    @cached("log_statistics:{log_id}", tags=["log:{log_id}"], when=succeeded)
     def analyze_log_statistics(db: Session, log_id: int) -> Dict[str, Any]:
         """分析测井数据统计信息"""
         log = WellLogCRUD.get_by_id(db, log_id)
@@ -164,11 +215,7 @@ class DataService:
             ).scalar() or 0
 
             # 获取唯一曲线名称
-            curve_names = db.query(CurveData.curve_name).filter(
-                CurveData.log_id == log_id
-            ).distinct().all()
-            
-            curves_list = [name[0] for name in curve_names]
+            curves_list = CurveDataCRUD.get_curve_names(db, log_id)
 
             # 获取深度范围
             depth_stats = db.query(
@@ -0,0 +1,412 @@
+"""模型推理业务逻辑服务
+
+整口井的测井曲线往往远长于 LogTransformer 的 max_position_embeddings，
+因此推理时将整条测井切分为相互重叠的窗口，按批送入模型，
+再用锥形权重对重叠区做加权叠加 (overlap-add)，消除窗口拼接处的接缝。
+
+结果按深度顺序流式产出：每处理完一批窗口，即可确定下一个窗口起点之前的
+全部样本，峰值内存只与 batch_size * window_size 相关，而与井长无关。
+
+预测服务 (PredictionService.run_prediction) 与离线批量打分共用此模块，
+推理结果直接流式写入结果存储 (result_store)。输入曲线同样按深度分块读入
+临时文件上的 np.memmap，不在内存中构造整口井的数据。
+"""
+
+import logging
+import os
+import sys
+import tempfile
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.crud import CurveDataCRUD
+from app.models import AIModel
+from app.services.result_store import result_store
+
+logger = logging.getLogger(__name__)
+
+# 模型推理函数: (batch, window, n_curves) -> (batch, window, n_outputs)
+PredictFn = Callable[[np.ndarray], np.ndarray]
+
+# LogTransformerConfig.max_position_embeddings 的默认值
+DEFAULT_WINDOW_SIZE = 512
+DEFAULT_OVERLAP = 64
+DEFAULT_BATCH_SIZE = 16
+
+
+class InferenceService:
+    """滑动窗口推理服务"""
+
+    @staticmethod
+    def window_starts(n_samples: int, window_size: int, overlap: int) -> List[int]:
+        """计算覆盖整条测井的窗口起点
+
+        除最后一个窗口外，相邻窗口步长为 window_size - overlap；
+        最后一个窗口右对齐到井底，保证所有窗口等长便于成批推理。
+        """
+        if window_size <= 0:
+            raise ValueError("window_size 必须为正数")
+        if not 0 <= overlap < window_size:
+            raise ValueError("overlap 必须在 [0, window_size) 范围内")
+        if n_samples <= window_size:
+            return [0] if n_samples > 0 else []
+
+        step = window_size - overlap
+        starts = list(range(0, n_samples - window_size, step))
+        starts.append(n_samples - window_size)
+        return starts
+
+    @staticmethod
+    def taper_weights(window_size: int, overlap: int) -> np.ndarray:
+        """生成窗口权重：两端 overlap 长度内为升余弦斜坡，中间为 1
+
+        权重严格为正，井口/井底只有单个窗口覆盖的样本经归一化后仍为原值。
+        """
+        weights = np.ones(window_size, dtype=np.float64)
+        ramp_len = min(overlap, window_size // 2)
+        if ramp_len > 0:
+            ramp = 0.5 - 0.5 * np.cos(np.pi * (np.arange(ramp_len) + 0.5) / ramp_len)
+            weights[:ramp_len] = ramp
+            weights[window_size - ramp_len:] = ramp[::-1]
+        return weights
+
+    @staticmethod
+    def stream_predict(
+        predict_fn: PredictFn,
+        data: np.ndarray,
+        window_size: int = DEFAULT_WINDOW_SIZE,
+        overlap: int = DEFAULT_OVERLAP,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> Iterator[Tuple[int, np.ndarray]]:
+        """按深度顺序流式产出拼接后的预测结果
+
+        Args:
+            predict_fn: 模型推理函数
+            data: (n_samples, n_curves) 的输入矩阵，可以是 np.memmap
+            window_size: 窗口长度（通常取 max_position_embeddings）
+            overlap: 相邻窗口重叠的样本数
+            batch_size: 每批推理的窗口数
+
+        Yields:
+            (start_index, values): 起始样本序号与 (n, n_outputs) 的结果块
+        """
+        if data.ndim == 1:
+            data = data[:, None]
+        n_samples = data.shape[0]
+        window = min(window_size, n_samples)
+        overlap = min(overlap, max(window - 1, 0))
+        starts = InferenceService.window_starts(n_samples, window, overlap)
+        if not starts:
+            return
+
+        weights = InferenceService.taper_weights(window, overlap)[:, None]
+
+        # 缓冲区覆盖 [offset, offset + len(acc)) 的样本
+        offset = 0
+        acc: Optional[np.ndarray] = None
+        weight_sum: Optional[np.ndarray] = None
+
+        for batch_begin in range(0, len(starts), batch_size):
+            batch_starts = starts[batch_begin:batch_begin + batch_size]
+            batch = np.stack([
+                np.asarray(data[s:s + window], dtype=np.float32) for s in batch_starts
+            ])
+            outputs = np.asarray(predict_fn(batch), dtype=np.float64)
+            if outputs.ndim == 2:
+                outputs = outputs[..., None]
+            if outputs.shape[:2] != (len(batch_starts), window):
+                raise ValueError(
+                    f"模型输出形状 {outputs.shape} 与输入窗口 {batch.shape} 不匹配"
+                )
+
+            needed = batch_starts[-1] + window - offset
+            if acc is None:
+                acc = np.zeros((needed, outputs.shape[-1]))
+                weight_sum = np.zeros((needed, 1))
+            elif needed > len(acc):
+                grow = needed - len(acc)
+                acc = np.concatenate([acc, np.zeros((grow, acc.shape[1]))])
+                weight_sum = np.concatenate([weight_sum, np.zeros((grow, 1))])
+
+            for s, out in zip(batch_starts, outputs):
+                lo = s - offset
+                acc[lo:lo + window] += out * weights
+                weight_sum[lo:lo + window] += weights
+
+            # 下一个窗口起点之前的样本不会再被更新，可以输出
+            batch_end = batch_begin + batch_size
+            final_before = starts[batch_end] if batch_end < len(starts) else n_samples
+            ready = final_before - offset
+            if ready > 0:
+                yield offset, acc[:ready] / weight_sum[:ready]
+                acc = acc[ready:].copy()
+                weight_sum = weight_sum[ready:].copy()
+                offset = final_before
+
+    @staticmethod
+    def predict_full(
+        predict_fn: PredictFn,
+        data: np.ndarray,
+        window_size: int = DEFAULT_WINDOW_SIZE,
+        overlap: int = DEFAULT_OVERLAP,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> np.ndarray:
+        """对整条测井推理并返回完整的 (n_samples, n_outputs) 结果"""
+        chunks = [
+            chunk for _, chunk in InferenceService.stream_predict(
+                predict_fn, data, window_size, overlap, batch_size
+            )
+        ]
+        if not chunks:
+            return np.zeros((0, 0))
+        return np.concatenate(chunks)
+
+    @staticmethod
+    def load_log_matrix(
+        db: Session,
+        log_id: int,
+        curve_names: Optional[Sequence[str]] = None,
+        chunk_rows: Optional[int] = None,
+    ) -> Tuple[np.ndarray, List[str], np.ndarray]:
+        """将测井的曲线数据点整理为 (深度, 曲线名, 数据矩阵)
+
+        数据点按深度顺序分块读取，写入临时文件上的 np.memmap，深度与数据矩阵
+        都是它的视图，峰值内存只与 chunk_rows 相关，而与井长无关。
+        缺失样本按深度线性插值，两端外推取最近值，整条缺失的曲线取 0。
+        """
+        from app.core.settings import settings
+
+        chunk_rows = chunk_rows or settings.INFERENCE_LOAD_CHUNK_ROWS
+        n_depths = CurveDataCRUD.count_depths(db, log_id)
+        if not n_depths:
+            return np.zeros(0), [], np.zeros((0, 0), dtype=np.float32)
+
+        names = list(curve_names) if curve_names else CurveDataCRUD.get_curve_names(db, log_id)
+        name_index = {name: i + 1 for i, name in enumerate(names)}
+
+        # 第 0 列为深度，其余为各曲线；临时文件在 memmap 释放后自动删除
+        table = np.memmap(
+            tempfile.TemporaryFile(), dtype=np.float64, mode="w+", shape=(n_depths, len(names) + 1)
+        )
+        row = -1
+        last_depth = None
+        for rows in CurveDataCRUD.iter_log_samples(db, log_id, chunk_rows):
+            depth_col = np.fromiter((r[0] for r in rows), dtype=np.float64, count=len(rows))
+            col_idx = np.fromiter((name_index.get(r[1], -1) for r in rows), dtype=np.int64, count=len(rows))
+            value_col = np.fromiter(
+                (np.nan if r[2] is None else r[2] for r in rows), dtype=np.float64, count=len(rows)
+            )
+
+            new_depth = np.empty(len(rows), dtype=bool)
+            new_depth[0] = depth_col[0] != last_depth
+            new_depth[1:] = depth_col[1:] != depth_col[:-1]
+            row_idx = row + np.cumsum(new_depth)
+
+            new_rows = row_idx[new_depth]
+            table[new_rows, 0] = depth_col[new_depth]
+            table[new_rows, 1:] = np.nan
+            keep = col_idx > 0
+            table[row_idx[keep], col_idx[keep]] = value_col[keep]
+
+            row = int(row_idx[-1])
+            last_depth = depth_col[-1]
+
+        for j in range(1, table.shape[1]):
+            InferenceService._fill_gaps(table, j, chunk_rows)
+
+        return table[:, 0], names, table[:, 1:]
+
+    @staticmethod
+    def _fill_gaps(table: np.ndarray, column: int, chunk_rows: int) -> None:
+        """按块就地填补一列的缺失值（与 np.interp 对整列插值的结果一致）"""
+        n = table.shape[0]
+        last: Optional[Tuple[float, float]] = None  # 最近一个有效样本 (深度, 值)
+        gap_start = 0  # 尚未填补的缺失段起点
+
+        def fill(start: int, stop: int, fn) -> None:
+            for lo in range(start, stop, chunk_rows):
+                hi = min(lo + chunk_rows, stop)
+                table[lo:hi, column] = fn(table[lo:hi, 0])
+
+        for lo in range(0, n, chunk_rows):
+            hi = min(lo + chunk_rows, n)
+            values = np.array(table[lo:hi, column])
+            valid = np.flatnonzero(~np.isnan(values))
+            if len(valid) == 0:
+                continue
+            depths = np.array(table[lo:hi, 0])
+            first_depth, first_value = depths[valid[0]], values[valid[0]]
+
+            # 前面各块遗留的缺失段：两侧有效值之间插值，井口一段取第一个有效值
+            if gap_start < lo + valid[0]:
+                if last is None:
+                    fill(gap_start, lo + valid[0], lambda d: np.full(len(d), first_value))
+                else:
+                    xp, fp = [last[0], first_depth], [last[1], first_value]
+                    fill(gap_start, lo + valid[0], lambda d: np.interp(d, xp, fp))
+
+            # 块内有效值之间的缺失
+            missing = np.flatnonzero(np.isnan(values))
+            inner = missing[(missing > valid[0]) & (missing < valid[-1])]
+            if len(inner):
+                table[lo + inner, column] = np.interp(depths[inner], depths[valid], values[valid])
+
+            last = (depths[valid[-1]], values[valid[-1]])
+            gap_start = lo + valid[-1] + 1
+
+        if gap_start < n:
+            tail = 0.0 if last is None else last[1]
+            fill(gap_start, n, lambda d: np.full(len(d), tail))
+
+    @staticmethod
+    def get_window_size(model: AIModel, predictor: Any = None) -> int:
+        """确定模型的推理窗口长度"""
+        config = getattr(predictor, "config", None)
+        if config is not None and getattr(config, "max_position_embeddings", None):
+            return int(config.max_position_embeddings)
+
+        params = model.parameters_json or {}
+        for key in ("window_size", "max_position_embeddings"):
+            if params.get(key):
+                return int(params[key])
+        return DEFAULT_WINDOW_SIZE
+
+    @staticmethod
+    def log_transformer_class():
+        """导入 LogTransformer（模型代码位于 MODEL_SOURCE_DIR，不在后端包内）"""
+        from app.core.settings import settings
+
+        source_dir = os.path.abspath(settings.MODEL_SOURCE_DIR)
+        if source_dir not in sys.path:
+            sys.path.insert(0, source_dir)
+        try:
+            from models.log_transformer import LogTransformer
+        except ImportError as e:
+            raise RuntimeError(f"无法导入 LogTransformer（MODEL_SOURCE_DIR={source_dir}）: {e}") from e
+        return LogTransformer
+
+    @staticmethod
+    def load_predictor(model: AIModel, device: str = "cpu") -> Tuple[PredictFn, int]:
+        """加载模型文件并返回 (推理函数, 窗口长度)
+
+        支持 TorchScript 文件（*.pt / *.ts）和 LogTransformer.save_pretrained 目录。
+        """
+        try:
+            import torch
+        except ImportError as e:
+            raise RuntimeError("推理需要安装 torch") from e
+
+        model_path = model.model_path
+        if not model_path or not os.path.exists(model_path):
+            raise FileNotFoundError(f"模型文件不存在: {model_path}")
+
+        if os.path.isdir(model_path):
+            network = InferenceService.log_transformer_class().from_pretrained(model_path)
+        else:
+            network = torch.jit.load(model_path, map_location=device)
+        network.to(device)
+        network.eval()
+
+        def predict_fn(batch: np.ndarray) -> np.ndarray:
+            with torch.no_grad():
+                output = network(torch.from_numpy(batch).to(device))
+            return output.cpu().numpy()
+
+        return predict_fn, InferenceService.get_window_size(model, network)
+
+    @staticmethod
+    def resolve_parameters(
+        model: AIModel,
+        window_size: Optional[int] = None,
+        overrides: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """合并推理参数：请求覆盖 > 模型 parameters_json > 全局配置
+
+        覆盖参数按 InferenceParameters 校验，无效时抛出 ValueError。
+        """
+        from pydantic import ValidationError
+        from app.core.settings import settings
+        from app.schemas import InferenceParameters
+
+        try:
+            overrides = InferenceParameters(**(overrides or {})).model_dump(exclude_none=True)
+        except ValidationError as e:
+            fields = sorted({".".join(str(loc) for loc in error["loc"]) for error in e.errors()})
+            raise ValueError(f"推理参数无效: {', '.join(fields)}") from None
+
+        model_params = model.parameters_json or {}
+        parameters = {
+            "window_size": window_size or InferenceService.get_window_size(model),
+            "overlap": model_params.get("overlap", settings.INFERENCE_WINDOW_OVERLAP),
+            "batch_size": settings.INFERENCE_BATCH_SIZE,
+            "curves": model_params.get("input_curves"),
+            "output_curves": model_params.get("output_curves"),
+        }
+        parameters.update(overrides)
+        parameters["overlap"] = min(int(parameters["overlap"]), int(parameters["window_size"]) - 1)
+        return parameters
+
+    @staticmethod
+    def predict_log(
+        db: Session,
+        log_id: int,
+        predict_fn: PredictFn,
+        parameters: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """对一条测井执行滑动窗口推理，结果流式写入结果存储
+
+        Returns:
+            {"result_key", "curves", "n_samples", "depth_from", "depth_to"}
+        """
+        depths, names, matrix = InferenceService.load_log_matrix(
+            db, log_id, parameters.get("curves")
+        )
+        return InferenceService.predict_matrix(depths, names, matrix, predict_fn, parameters)
+
+    @staticmethod
+    def predict_matrix(
+        depths: np.ndarray,
+        names: List[str],
+        matrix: np.ndarray,
+        predict_fn: PredictFn,
+        parameters: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """对已加载的曲线矩阵推理，结果流式写入结果存储"""
+        if len(depths) == 0:
+            raise ValueError("测井没有曲线数据")
+
+        chunks = InferenceService.stream_predict(
+            predict_fn,
+            matrix,
+            window_size=parameters["window_size"],
+            overlap=parameters["overlap"],
+            batch_size=parameters["batch_size"],
+        )
+
+        writer = None
+        output_names: List[str] = []
+        try:
+            for start, chunk in chunks:
+                if writer is None:
+                    requested = parameters.get("output_curves") or names
+                    output_names = [
+                        requested[j] if j < len(requested) else f"output_{j}"
+                        for j in range(chunk.shape[1])
+                    ]
+                    writer = result_store.open_writer(output_names)
+                writer.append(depths[start:start + len(chunk)], np.nan_to_num(chunk))
+            result_key = writer.close()
+        except Exception:
+            if writer is not None:
+                writer.abort()
+            raise
+
+        return {
+            "result_key": result_key,
+            "curves": output_names,
+            "n_samples": int(len(depths)),
+            "depth_from": float(depths[0]),
+            "depth_to": float(depths[-1]),
+        }
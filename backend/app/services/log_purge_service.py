@@ -0,0 +1,180 @@
+"""已删除测井的后台清除服务
+
+曲线数据量大的测井删除时只在请求内标记 deleted_at（测井随即对所有查询
+不可见，预测结果同时删除），曲线数据由后台线程清除：
+- 每个事务最多删除 CASCADE_DELETE_BATCH_ROWS 个曲线数据点，避免长时间锁表
+  和 undo log 膨胀
+- 批次之间暂停 LOG_PURGE_PAUSE_MS 毫秒，限制对线上读写的影响
+- curve_data 按 log_id 分区时（MySQL），整段测井都已删除的分区直接删除
+- 曲线清除完毕后删除测井记录并清理上传文件
+- 待清除的测井保存在数据库中，进程重启后继续清除
+- 大项目删除时项目与其测井一同标记删除，测井全部清除后删除项目记录
+- 每个工作进程都运行清除线程：清除前先在数据库中认领测井
+  （well_logs.purge_claimed_by），一条测井同一时间只由一个进程清除；
+  认领者超过 LOG_PURGE_CLAIM_TIMEOUT_SECONDS 未提交批次时由其他进程接管
+- 清除进度记录在测井记录中，任一进程的 /admin/purges 都能看到全部进度
+"""
+
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.db import partitioning
+from app.db.session import SessionLocal, use_primary
+from app.crud import ProjectCRUD, WellLogCRUD, CurveDataCRUD
+from app.services.data_service import DataService
+
+logger = logging.getLogger(__name__)
+
+
+class LogPurger:
+    """按批清除已标记删除测井的后台线程"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        batch_rows: Optional[int] = None,
+        pause_ms: Optional[int] = None
+    ):
+        self.session_factory = session_factory
+        self.batch_rows = batch_rows
+        self.pause_ms = pause_ms
+        # 认领测井时写入的清除者标识（主机、进程，同一进程内的各实例互不相同）
+        self.worker_id = f"{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """启动后台线程，并清除上次退出时未完成的测井"""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="log-purger", daemon=True)
+        self._thread.start()
+        self.wake()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """停止后台线程（当前批次提交后退出，未完成的测井下次启动时继续）"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def wake(self) -> None:
+        """有新的测井被标记删除时唤醒后台线程"""
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"测井后台清除失败: {str(e)}")
+
+    def run_once(self) -> int:
+        """清除当前全部已标记删除、且能由本实例认领的测井，返回清除完成的测井数"""
+        db = self.session_factory()
+        purged = 0
+        try:
+            # 分区表：整个分区的测井都已删除时直接删除分区，其中的测井无需逐批删除曲线
+            try:
+                partitioning.drop_purged_partitions(db)
+            except Exception as e:
+                # 其他工作进程可能刚删除了同一分区，逐批清除照常进行
+                db.rollback()
+                logger.warning(f"删除已清除分区失败: {str(e)}")
+            for log in WellLogCRUD.get_deleted(db):
+                if self._stop.is_set():
+                    break
+                if self.purge_log(db, log):
+                    purged += 1
+            # 测井已全部清除的已删除项目（由任一进程删除，重复执行无副作用）
+            projects = ProjectCRUD.delete_purged(db)
+            if projects:
+                logger.info(f"已删除项目已在后台清除: {projects} 个")
+            partitioning.add_partitions(db)
+        finally:
+            db.close()
+        return purged
+
+    def purge_log(self, db: Session, log) -> bool:
+        """认领一条测井，按批删除其曲线数据，完成后删除测井记录和上传文件
+
+        测井已由其他进程认领（或清除期间被接管）时返回 False。
+        """
+        batch_rows = self.batch_rows or settings.CASCADE_DELETE_BATCH_ROWS
+        pause_ms = settings.LOG_PURGE_PAUSE_MS if self.pause_ms is None else self.pause_ms
+        stale_before = datetime.utcnow() - timedelta(seconds=settings.LOG_PURGE_CLAIM_TIMEOUT_SECONDS)
+        if not WellLogCRUD.claim_purge(db, log.id, self.worker_id, stale_before):
+            return False
+
+        while True:
+            if self._stop.is_set():
+                WellLogCRUD.release_purge(db, log.id, self.worker_id)
+                return False
+            rows = CurveDataCRUD.delete_batch(db, log.id, batch_rows)
+            if not rows:
+                break
+            if not WellLogCRUD.record_purge_batch(db, log.id, self.worker_id, rows):
+                logger.warning(f"测井清除已由其他进程接管: {log.filename} (ID: {log.id})")
+                return False
+            if pause_ms:
+                self._stop.wait(pause_ms / 1000)
+
+        if not WellLogCRUD.delete_purged(db, log.id, self.worker_id):
+            return False
+        DataService.remove_deleted_files(db, {
+            "file_paths": [log.file_path] if log.file_path else [],
+            "result_keys": [],
+        })
+        logger.info(f"测井已在后台清除: {log.filename} (ID: {log.id})")
+        return True
+
+    def status(self, db: Session) -> Dict[str, Any]:
+        """全部待清除测井及其清除进度（各工作进程共享，记录在测井记录中）"""
+        pending = []
+        for log in WellLogCRUD.get_deleted(db):
+            pending.append({
+                "log_id": log.id,
+                "project_id": log.project_id,
+                "filename": log.filename,
+                "sample_count": log.sample_count,
+                "deleted_at": log.deleted_at,
+                "claimed_by": log.purge_claimed_by,
+                "rows_deleted": log.purge_rows_deleted or 0,
+                "batches": log.purge_batches or 0,
+                "started_at": log.purge_started_at,
+                "last_batch_at": log.purge_heartbeat_at,
+            })
+        return {
+            "running": self.running,
+            "batch_rows": self.batch_rows or settings.CASCADE_DELETE_BATCH_ROWS,
+            "pause_ms": settings.LOG_PURGE_PAUSE_MS if self.pause_ms is None else self.pause_ms,
+            "pending": pending,
+        }
+
+
+def _session_factory() -> Session:
+    db = SessionLocal()
+    use_primary(db)
+    return db
+
+
+log_purger = LogPurger(_session_factory)
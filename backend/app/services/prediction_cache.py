@@ -0,0 +1,103 @@
+"""按内容寻址的预测缓存
+
+缓存键 = SHA-256(输入曲线数据, 模型标识与版本, 推理参数)。
+- 曲线数据或模型发生变化时缓存键随之改变，旧缓存项自然不再命中；
+  CRUD 层在写曲线、改模型时也会主动删除相关缓存项
+- 命中时直接引用结果存储中的结果文件，无需重新推理
+- 缓存项数量和引用的结果总大小超过上限时按 LRU 淘汰
+
+缓存项只是索引，不拥有结果文件：文件的生命周期由引用它的预测决定，
+文件已被清理的缓存项视为未命中。
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.crud import PredictionCacheCRUD
+from app.models import AIModel, PredictionCacheEntry
+from app.services.result_store import result_store
+
+logger = logging.getLogger(__name__)
+
+# 影响推理结果的参数；batch_size 只影响吞吐，不参与缓存键
+_RESULT_PARAMETERS = ("window_size", "overlap", "curves", "output_curves")
+
+# 计算缓存键时每次读取的样本数
+_HASH_CHUNK_ROWS = 65536
+
+
+class PredictionCache:
+    """预测缓存服务"""
+
+    @staticmethod
+    def compute_key(
+        depths: np.ndarray,
+        names: List[str],
+        matrix: np.ndarray,
+        model: AIModel,
+        parameters: Dict[str, Any],
+    ) -> str:
+        """计算缓存键（按块读取 depths/matrix，二者可以是 np.memmap）"""
+        digest = hashlib.sha256()
+        for lo in range(0, len(depths), _HASH_CHUNK_ROWS):
+            digest.update(np.ascontiguousarray(depths[lo:lo + _HASH_CHUNK_ROWS], dtype=np.float64).tobytes())
+        for lo in range(0, len(matrix), _HASH_CHUNK_ROWS):
+            digest.update(np.ascontiguousarray(matrix[lo:lo + _HASH_CHUNK_ROWS], dtype=np.float32).tobytes())
+        digest.update(json.dumps({
+            "curves": names,
+            "model": {
+                "id": model.id,
+                "version": model.version,
+                "path": model.model_path,
+                "updated_at": model.updated_at.isoformat() if model.updated_at else None,
+            },
+            "parameters": {k: parameters.get(k) for k in _RESULT_PARAMETERS},
+        }, sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def lookup(db: Session, cache_key: str) -> Optional[PredictionCacheEntry]:
+        """查找缓存项，命中时更新 LRU 信息"""
+        entry = PredictionCacheCRUD.get(db, cache_key)
+        if entry is None:
+            return None
+        if not result_store.exists(entry.result_key):
+            PredictionCacheCRUD.delete(db, cache_key)
+            return None
+        return PredictionCacheCRUD.touch(db, entry)
+
+    @staticmethod
+    def store(
+        db: Session,
+        cache_key: str,
+        log_id: int,
+        model_id: int,
+        results: Dict[str, Any],
+    ) -> PredictionCacheEntry:
+        """写入缓存项并按上限淘汰"""
+        path = result_store.path_for(results["result_key"])
+        entry = PredictionCacheCRUD.put(
+            db,
+            cache_key,
+            log_id=log_id,
+            model_id=model_id,
+            result_key=results["result_key"],
+            depth_from=results.get("depth_from"),
+            depth_to=results.get("depth_to"),
+            size_bytes=os.path.getsize(path) if os.path.exists(path) else 0,
+        )
+        evicted = PredictionCacheCRUD.evict_lru(
+            db,
+            max_entries=settings.PREDICTION_CACHE_MAX_ENTRIES,
+            max_bytes=settings.PREDICTION_CACHE_MAX_BYTES,
+        )
+        if evicted:
+            logger.info(f"预测缓存淘汰 {len(evicted)} 项")
+        return entry
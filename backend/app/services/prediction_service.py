@@ -1,26 +1,40 @@
 """预测管理业务逻辑服务"""
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from sqlalchemy.orm import Session
 import logging
-import json
-from datetime import datetime
+import math
+import time
+from datetime import datetime, timedelta
 
-from app.models import Prediction, WellLog, AIModel
+import numpy as np
+
+from app.models import Prediction, WellLog, AIModel, PredictionStatus
 from app.schemas import PredictionCreate, PredictionUpdate
 from app.crud import PredictionCRUD, WellLogCRUD, AIModelCRUD
+from app.services.inference_service import InferenceService, PredictFn
+from app.services.prediction_cache import PredictionCache
+from app.services.result_store import curves_from_json, result_store
+from app.core.cache import cached, succeeded
 
 logger = logging.getLogger(__name__)
 
+# 模型历史统计的最大分桶数
+MAX_HISTORY_BUCKETS = 720
+
 
 class PredictionService:
     """预测管理业务逻辑服务"""
 
     @staticmethod
-    def create_prediction(db: Session, prediction_data: PredictionCreate) -> Dict[str, Any]:
-        """创建预测任务 - 业务逻辑处理"""
+    def create_prediction(
+        db: Session,
+        prediction_data: PredictionCreate,
+        log: Optional[WellLog] = None
+    ) -> Dict[str, Any]:
+        """创建预测任务 - 业务逻辑处理（log 为调用方已加载的测井）"""
         # 验证测井数据存在
-        log = WellLogCRUD.get_by_id(db, prediction_data.log_id)
+        log = log or WellLogCRUD.get_by_id(db, prediction_data.log_id)
         if not log:
             return {
                 "success": False,
@@ -53,23 +67,25 @@ class PredictionService:
                 "message": "置信度必须在0-1之间"
             }
 
+        # 客户端提交的结果同样写入结果存储，不再以 JSON 保存在 results_json 中
         try:
-            # 兼容 tests 中将 results_json 作为字符串传入的情况，尝试解析为 dict
-            if getattr(prediction_data, 'results_json', None) and isinstance(prediction_data.results_json, str):
-                try:
-                    parsed = json.loads(prediction_data.results_json)
-                except Exception:
-                    parsed = prediction_data.results_json
-
-                prediction_data = PredictionCreate(
-                    log_id=prediction_data.log_id,
-                    model_id=prediction_data.model_id,
-                    results_json=parsed,
-                    confidence=prediction_data.confidence,
-                    execution_time=prediction_data.execution_time
-                )
+            stored = PredictionService.store_results(
+                prediction_data.results_json, prediction_data.depth_from, prediction_data.depth_to
+            )
+        except ValueError as e:
+            return {
+                "success": False,
+                "error": "invalid_results",
+                "message": f"预测结果格式无效: {str(e)}"
+            }
 
-            new_prediction = PredictionCRUD.create(db, prediction_data)
+        try:
+            prediction_data = prediction_data.model_copy(update={
+                "results_json": None,
+                "depth_from": stored["depth_from"],
+                "depth_to": stored["depth_to"],
+            })
+            new_prediction = PredictionCRUD.create(db, prediction_data, result_key=stored["result_key"])
             logger.info(f"预测任务已创建: ID={new_prediction.id}, Log={log.filename}, Model={model.name}")
             
             return {
@@ -86,9 +102,171 @@ class PredictionService:
             }
 
     @staticmethod
-    def get_prediction_details(db: Session, prediction_id: int) -> Dict[str, Any]:
-        """获取预测详细信息"""
-        prediction = PredictionCRUD.get_by_id(db, prediction_id)
+    def store_results(
+        results: Any,
+        depth_from: Optional[float] = None,
+        depth_to: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """将客户端提交的 JSON 预测结果写入结果存储
+
+        格式见 result_store.curves_from_json，无法转换时抛出 ValueError。
+
+        Returns:
+            {"result_key", "depth_from", "depth_to"}；结果为空时 result_key 为 None
+        """
+        converted = curves_from_json(results, depth_from, depth_to)
+        if converted is None:
+            return {"result_key": None, "depth_from": depth_from, "depth_to": depth_to}
+        depths, curves = converted
+        return {
+            "result_key": result_store.write(depths, curves),
+            "depth_from": float(np.nanmin(depths)) if depth_from is None else depth_from,
+            "depth_to": float(np.nanmax(depths)) if depth_to is None else depth_to,
+        }
+
+    @staticmethod
+    def run_prediction(
+        db: Session,
+        log_id: int,
+        model_id: int,
+        parameters: Optional[Dict[str, Any]] = None,
+        predict_fn: Optional[PredictFn] = None,
+        use_cache: bool = True,
+        log: Optional[WellLog] = None
+    ) -> Dict[str, Any]:
+        """在服务端对整条测井执行模型推理并保存结果
+
+        推理使用滑动窗口 + 重叠加权拼接，可处理长于模型最大序列长度的测井。
+        predict_fn 为空时从 AIModel.model_path 加载模型；命中预测缓存时
+        不加载模型也不推理。log 为调用方已加载的测井。
+        """
+        log = log or WellLogCRUD.get_by_id(db, log_id)
+        if not log:
+            return {
+                "success": False,
+                "error": "log_not_found",
+                "message": "测井数据不存在"
+            }
+
+        model = AIModelCRUD.get_by_id(db, model_id)
+        if not model:
+            return {
+                "success": False,
+                "error": "model_not_found",
+                "message": "模型不存在"
+            }
+
+        if model.status != "active":
+            return {
+                "success": False,
+                "error": "model_inactive",
+                "message": f"模型已禁用（状态: {model.status}）"
+            }
+
+        try:
+            run_params = InferenceService.resolve_parameters(model, overrides=parameters)
+        except ValueError as e:
+            return {
+                "success": False,
+                "error": "invalid_parameters",
+                "message": str(e)
+            }
+        started = time.perf_counter()
+        depths, names, matrix = InferenceService.load_log_matrix(db, log_id, run_params.get("curves"))
+        if len(depths) == 0:
+            return {
+                "success": False,
+                "error": "no_curve_data",
+                "message": "测井没有曲线数据"
+            }
+
+        # 相同的曲线数据、模型版本和推理参数直接复用已有结果
+        cache_key = None
+        cached = None
+        if use_cache:
+            cache_key = PredictionCache.compute_key(depths, names, matrix, model, run_params)
+            cached = PredictionCache.lookup(db, cache_key)
+
+        if cached is not None:
+            results = {
+                "result_key": cached.result_key,
+                "depth_from": cached.depth_from,
+                "depth_to": cached.depth_to
+            }
+        else:
+            if predict_fn is None:
+                try:
+                    predict_fn, window_size = InferenceService.load_predictor(model)
+                except Exception as e:
+                    logger.error(f"模型加载失败: {model.name} - {str(e)}")
+                    return {
+                        "success": False,
+                        "error": "model_load_failed",
+                        "message": "模型加载失败"
+                    }
+                if window_size:
+                    run_params = InferenceService.resolve_parameters(model, window_size, parameters)
+
+            try:
+                results = InferenceService.predict_matrix(depths, names, matrix, predict_fn, run_params)
+            except Exception as e:
+                logger.error(f"模型推理失败: Log={log_id}, Model={model_id} - {str(e)}")
+                return {
+                    "success": False,
+                    "error": "inference_failed",
+                    "message": "模型推理失败"
+                }
+
+            if use_cache:
+                PredictionCache.store(db, cache_key, log_id, model_id, results)
+                # 模型配置修正了窗口参数时，以实际参数再登记一次，按记录参数重跑也能命中
+                actual_key = PredictionCache.compute_key(depths, names, matrix, model, run_params)
+                if actual_key != cache_key:
+                    PredictionCache.store(db, actual_key, log_id, model_id, results)
+
+        execution_time = int((time.perf_counter() - started) * 1000)
+
+        prediction_data = PredictionCreate(
+            log_id=log_id,
+            model_id=model_id,
+            # 模型未输出置信度时，以模型精度作为预测置信度
+            confidence=model.accuracy if model.accuracy is not None else 0.0,
+            execution_time=execution_time,
+            parameters_json=run_params,
+            depth_from=results["depth_from"],
+            depth_to=results["depth_to"]
+        )
+        new_prediction = PredictionCRUD.create(db, prediction_data, result_key=results["result_key"])
+        logger.info(
+            f"预测已完成: ID={new_prediction.id}, Log={log.filename}, "
+            f"Model={model.name}, 耗时={execution_time}ms, 缓存命中={cached is not None}"
+        )
+
+        return {
+            "success": True,
+            "prediction": new_prediction,
+            "cache_hit": cached is not None,
+            "message": "预测完成"
+        }
+
+    @staticmethod
+    def get_prediction_details(
+        db: Session,
+        prediction_id: int,
+        depth_from: Optional[float] = None,
+        depth_to: Optional[float] = None,
+        curves: Optional[list] = None,
+        prediction: Optional[Prediction] = None,
+        log: Optional[WellLog] = None,
+        as_arrays: bool = False
+    ) -> Dict[str, Any]:
+        """获取预测详细信息
+
+        结果存于结果存储时，可通过 depth_from/depth_to/curves 只读取部分结果，
+        as_arrays 为真时结果曲线为 NumPy 数组。
+        prediction/log 为调用方已加载的对象，传入时不再重复查询。
+        """
+        prediction = prediction or PredictionCRUD.get_by_id(db, prediction_id)
         
         if not prediction:
             return {
@@ -98,16 +276,21 @@ class PredictionService:
             }
 
         # 获取关联信息
-        log = WellLogCRUD.get_by_id(db, prediction.log_id)
+        log = log or WellLogCRUD.get_by_id(db, prediction.log_id)
         model = AIModelCRUD.get_by_id(db, prediction.model_id)
 
         # 解析结果
         results = None
-        if prediction.results_json:
+        if prediction.result_key:
             try:
-                results = json.loads(prediction.results_json) if isinstance(prediction.results_json, str) else prediction.results_json
-            except:
-                results = prediction.results_json
+                results = result_store.read(
+                    prediction.result_key, depth_from, depth_to, curves, as_arrays=as_arrays
+                )
+            except FileNotFoundError:
+                logger.error(f"预测结果文件缺失: ID={prediction_id}, Key={prediction.result_key}")
+        elif prediction.results_json:
+            # 无法转换到结果存储的旧记录，按原样返回
+            results = prediction.results_json
 
         return {
             "success": True,
@@ -123,6 +306,8 @@ class PredictionService:
                     "version": model.version
                 } if model else None,
                 "results": results,
+                "depth_from": prediction.depth_from,
+                "depth_to": prediction.depth_to,
                 "confidence": prediction.confidence,
                 "execution_time": prediction.execution_time,
                 "status": prediction.status,
@@ -133,9 +318,14 @@ class PredictionService:
         }
 
     @staticmethod
-    def rerun_prediction(db: Session, prediction_id: int) -> Dict[str, Any]:
-        """重新运行预测"""
-        prediction = PredictionCRUD.get_by_id(db, prediction_id)
+    def rerun_prediction(
+        db: Session,
+        prediction_id: int,
+        prediction: Optional[Prediction] = None,
+        log: Optional[WellLog] = None
+    ) -> Dict[str, Any]:
+        """重新运行预测（prediction/log 为调用方已加载的对象）"""
+        prediction = prediction or PredictionCRUD.get_by_id(db, prediction_id)
         
         if not prediction:
             return {
@@ -145,7 +335,7 @@ class PredictionService:
             }
 
         # 验证原始资源仍然存在
-        log = WellLogCRUD.get_by_id(db, prediction.log_id)
+        log = log or WellLogCRUD.get_by_id(db, prediction.log_id)
         model = AIModelCRUD.get_by_id(db, prediction.model_id)
 
         if not log or not model:
@@ -155,17 +345,49 @@ class PredictionService:
                 "message": "关联的资源已被删除"
             }
 
+        # 服务端推理产生的预测按原参数重新推理，输入未变时命中预测缓存
+        if prediction.parameters_json is not None and prediction.result_key:
+            result = PredictionService.run_prediction(
+                db, prediction.log_id, prediction.model_id,
+                parameters=prediction.parameters_json, log=log
+            )
+            if not result["success"]:
+                return result
+            logger.info(f"预测已重新运行: 原始ID={prediction_id}, 新ID={result['prediction'].id}")
+            return {
+                "success": True,
+                "new_prediction": result["prediction"],
+                "original_prediction_id": prediction_id,
+                "cache_hit": result["cache_hit"],
+                "message": "预测已重新运行"
+            }
+
         try:
+            result_key = prediction.result_key
+            results_json = None
+            depth_from, depth_to = prediction.depth_from, prediction.depth_to
+            if result_key is None and prediction.results_json:
+                # 尚未迁移的旧记录：结果先写入结果存储；无法转换的结果才按原样复制
+                try:
+                    stored = PredictionService.store_results(prediction.results_json, depth_from, depth_to)
+                    result_key, depth_from, depth_to = stored["result_key"], stored["depth_from"], stored["depth_to"]
+                except ValueError:
+                    results_json = prediction.results_json
+
             # 创建新预测任务
             new_prediction_data = PredictionCreate(
                 log_id=prediction.log_id,
                 model_id=prediction.model_id,
-                results_json=prediction.results_json,
+                results_json=results_json,
                 confidence=prediction.confidence,
-                execution_time=prediction.execution_time
+                execution_time=prediction.execution_time,
+                parameters_json=prediction.parameters_json,
+                depth_from=depth_from,
+                depth_to=depth_to
             )
             
-            new_prediction = PredictionCRUD.create(db, new_prediction_data)
+            # 结果文件按内容寻址，新记录直接引用同一文件而不复制数据
+            new_prediction = PredictionCRUD.create(db, new_prediction_data, result_key=result_key)
             logger.info(f"预测已重新运行: 原始ID={prediction_id}, 新ID={new_prediction.id}")
             
             return {
@@ -212,6 +434,7 @@ class PredictionService:
             }
 
     @staticmethod
+    @cached("model_statistics:{model_id}", tags=["model:{model_id}"], when=succeeded)
     def get_model_statistics(db: Session, model_id: int) -> Dict[str, Any]:
         """获取模型预测统计"""
         model = AIModelCRUD.get_by_id(db, model_id)
@@ -224,16 +447,12 @@ class PredictionService:
             }
 
         try:
-            predictions = PredictionCRUD.get_by_model(db, model_id, skip=0, limit=1000)
-            total_predictions = PredictionCRUD.count_by_model(db, model_id)
-
-            # 计算统计信息
-            avg_confidence = 0
-            avg_execution_time = 0
-            
-            if predictions:
-                avg_confidence = sum(p.confidence for p in predictions) / len(predictions)
-                avg_execution_time = sum(p.execution_time or 0 for p in predictions) / len(predictions)
+            # 聚合和百分位都在数据库中计算，不加载预测记录及其结果数据
+            aggregates = PredictionCRUD.get_model_aggregates(db, model_id)
+            percentiles = PredictionCRUD.get_execution_time_percentiles(
+                db, model_id, (50, 95, 99), aggregates["timed"]
+            )
+            total_predictions = aggregates["total"]
 
             return {
                 "success": True,
@@ -242,8 +461,15 @@ class PredictionService:
                     "model_name": model.name,
                     "model_version": model.version,
                     "total_predictions": total_predictions,
-                    "avg_confidence": round(avg_confidence, 4),
-                    "avg_execution_time": round(avg_execution_time, 2),
+                    "failed_predictions": aggregates["failed"],
+                    "failure_rate": round(aggregates["failed"] / total_predictions, 4) if total_predictions else 0,
+                    "avg_confidence": round(aggregates["avg_confidence"] or 0, 4),
+                    "avg_execution_time": round(aggregates["avg_execution_time"] or 0, 2),
+                    "min_execution_time": aggregates["min_execution_time"],
+                    "max_execution_time": aggregates["max_execution_time"],
+                    "p50_execution_time": percentiles[50],
+                    "p95_execution_time": percentiles[95],
+                    "p99_execution_time": percentiles[99],
                     "model_accuracy": model.accuracy,
                     "status": model.status
                 },
@@ -258,8 +484,90 @@ class PredictionService:
             }
 
     @staticmethod
-    def compare_predictions(db: Session, log_id: int, model_ids: list) -> Dict[str, Any]:
-        """比较不同模型的预测结果"""
+    def get_model_history(
+        db: Session,
+        model_id: int,
+        hours: int = 24,
+        bucket_minutes: int = 60,
+        now: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """获取模型按时间分桶的预测历史（每桶预测数、失败数、p50/p95 耗时）"""
+        model = AIModelCRUD.get_by_id(db, model_id)
+        
+        if not model:
+            return {
+                "success": False,
+                "error": "model_not_found",
+                "message": "模型不存在"
+            }
+
+        if hours <= 0 or bucket_minutes <= 0:
+            return {
+                "success": False,
+                "error": "invalid_range",
+                "message": "时间范围和分桶间隔必须大于0"
+            }
+
+        # created_at 为 UTC 的 naive 时间，按相对纪元的秒数分桶
+        epoch = datetime(1970, 1, 1)
+        bucket_seconds = bucket_minutes * 60
+        now = now or datetime.utcnow()
+        end = (int((now - epoch).total_seconds()) // bucket_seconds + 1) * bucket_seconds
+        n_buckets = math.ceil(hours * 3600 / bucket_seconds)
+        if n_buckets > MAX_HISTORY_BUCKETS:
+            return {
+                "success": False,
+                "error": "too_many_buckets",
+                "message": f"分桶数不能超过 {MAX_HISTORY_BUCKETS}，请增大分桶间隔"
+            }
+        start = end - n_buckets * bucket_seconds
+
+        try:
+            # 计数、失败数和百分位都在数据库中按桶聚合，不加载预测记录
+            stats = PredictionCRUD.get_model_history(
+                db, model_id, epoch + timedelta(seconds=start), bucket_seconds, n_buckets, (50, 95)
+            )
+
+            history = []
+            for i in range(n_buckets):
+                bucket = stats.get(i, {"predictions": 0, "failed": 0, "percentiles": {}})
+                p50 = bucket["percentiles"].get(50)
+                p95 = bucket["percentiles"].get(95)
+                history.append({
+                    "bucket_start": epoch + timedelta(seconds=start + i * bucket_seconds),
+                    "predictions": int(bucket["predictions"]),
+                    "failed": int(bucket["failed"]),
+                    "p50_execution_time": None if p50 is None else round(float(p50), 2),
+                    "p95_execution_time": None if p95 is None else round(float(p95), 2)
+                })
+
+            return {
+                "success": True,
+                "history": history,
+                "bucket_minutes": bucket_minutes,
+                "message": "获取历史成功"
+            }
+        except Exception as e:
+            logger.error(f"历史统计失败: {str(e)}")
+            return {
+                "success": False,
+                "error": "calculation_failed",
+                "message": "统计失败"
+            }
+
+    @staticmethod
+    def compare_predictions(
+        db: Session,
+        log_id: int,
+        model_ids: list,
+        depth_from: Optional[float] = None,
+        depth_to: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """比较不同模型在同一测井上的最新预测结果
+
+        每个模型最新的预测通过一次窗口查询获取；对保存在结果存储中的预测曲线，
+        以第一个模型的深度为基准对齐后计算 RMSE、相关系数和差值曲线。
+        """
         log = WellLogCRUD.get_by_id(db, log_id)
         
         if not log:
@@ -270,36 +578,36 @@ class PredictionService:
             }
 
         try:
+            latest = {
+                prediction.model_id: (prediction, model)
+                for prediction, model in PredictionCRUD.get_latest_by_models(db, log_id, model_ids)
+            }
+
             comparison = []
-            
+            curve_results = []
             for model_id in model_ids:
-                model = AIModelCRUD.get_by_id(db, model_id)
-                if not model:
+                if model_id not in latest:
                     continue
-                    
-                # 获取最新的预测结果
-                predictions = PredictionCRUD.get_by_log(db, log_id, skip=0, limit=1)
-                
-                if predictions:
-                    latest_pred = None
-                    for p in predictions:
-                        if p.model_id == model_id:
-                            latest_pred = p
-                            break
-                    
-                    if latest_pred:
-                        comparison.append({
-                            "model_id": model_id,
-                            "model_name": model.name,
-                            "confidence": latest_pred.confidence,
-                            "execution_time": latest_pred.execution_time,
-                            "status": latest_pred.status,
-                            "created_at": latest_pred.created_at
-                        })
+                latest_pred, model = latest[model_id]
+                comparison.append({
+                    "model_id": model_id,
+                    "model_name": model.name,
+                    "prediction_id": latest_pred.id,
+                    "confidence": latest_pred.confidence,
+                    "execution_time": latest_pred.execution_time,
+                    "status": latest_pred.status,
+                    "created_at": latest_pred.created_at
+                })
+                if latest_pred.result_key and result_store.exists(latest_pred.result_key):
+                    curve_results.append((
+                        model_id,
+                        result_store.read(latest_pred.result_key, depth_from, depth_to)
+                    ))
 
             return {
                 "success": True,
                 "comparison": comparison,
+                "metrics": PredictionService.compute_comparison_metrics(curve_results),
                 "message": "比较完成"
             }
         except Exception as e:
@@ -310,6 +618,64 @@ class PredictionService:
                 "message": "比较失败"
             }
 
+    @staticmethod
+    def compute_comparison_metrics(curve_results: list) -> Optional[Dict[str, Any]]:
+        """计算多个模型预测曲线之间的比较指标
+
+        Args:
+            curve_results: [(model_id, {"depths": [...], "curves": {name: [...]}}), ...]，
+                第一个为基准模型
+
+        Returns:
+            各曲线的两两 RMSE 矩阵、相关系数矩阵及相对基准模型的差值曲线；
+            少于两个模型或没有共同曲线时为 None
+        """
+        if len(curve_results) < 2:
+            return None
+
+        model_ids = [model_id for model_id, _ in curve_results]
+        reference = np.asarray(curve_results[0][1]["depths"], dtype=np.float64)
+        common = [
+            name for name in curve_results[0][1]["curves"]
+            if all(name in results["curves"] for _, results in curve_results[1:])
+        ]
+        if len(reference) == 0 or not common:
+            return None
+
+        def as_list(matrix: np.ndarray) -> list:
+            return [[None if np.isnan(v) else float(v) for v in row] for row in matrix]
+
+        curves = {}
+        for name in common:
+            # (模型数, 样本数)：其余模型插值到基准深度上
+            stacked = np.vstack([
+                np.interp(
+                    reference,
+                    np.asarray(results["depths"], dtype=np.float64),
+                    np.asarray(results["curves"][name], dtype=np.float64)
+                )
+                for _, results in curve_results
+            ])
+            pairwise = stacked[:, None, :] - stacked[None, :, :]
+            rmse = np.sqrt(np.mean(pairwise ** 2, axis=2))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                correlation = np.corrcoef(stacked)
+            difference = stacked[1:] - stacked[0]
+            curves[name] = {
+                "rmse": as_list(rmse),
+                "correlation": as_list(np.atleast_2d(correlation)),
+                "difference": {
+                    model_id: difference[i].tolist() for i, model_id in enumerate(model_ids[1:])
+                }
+            }
+
+        return {
+            "reference_model_id": model_ids[0],
+            "model_ids": model_ids,
+            "depths": reference.tolist(),
+            "curves": curves
+        }
+
     @staticmethod
     def delete_prediction(db: Session, prediction_id: int) -> Dict[str, Any]:
         """删除预测结果"""
@@ -323,7 +689,9 @@ class PredictionService:
             }
 
         try:
+            result_key = prediction.result_key
             PredictionCRUD.delete(db, prediction_id)
+            PredictionService.release_result(db, result_key)
             logger.info(f"预测结果已删除: ID={prediction_id}")
             
             return {
@@ -337,3 +705,16 @@ class PredictionService:
                 "error": "deletion_failed",
                 "message": "删除失败"
             }
+
+    @staticmethod
+    def release_result(db: Session, result_key: Optional[str]) -> bool:
+        """当没有预测再引用结果文件时将其删除"""
+        if not result_key or PredictionCRUD.count_by_result_key(db, result_key) > 0:
+            return False
+        return result_store.delete(result_key)
+
+    @staticmethod
+    def release_results(db: Session, result_keys: List[str]) -> int:
+        """批量删除不再被任何预测引用的结果文件，返回删除的文件数"""
+        referenced = PredictionCRUD.get_referenced_result_keys(db, result_keys)
+        return sum(result_store.delete(key) for key in result_keys if key not in referenced)
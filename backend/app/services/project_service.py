@@ -5,10 +5,13 @@ from sqlalchemy.orm import Session
 from datetime import datetime
 import logging
 
-from app.models import Project
+from app.models import Project, WellLog
 from app.schemas import ProjectCreate, ProjectUpdate
-from app.crud import ProjectCRUD, UserCRUD, WellLogCRUD
+from app.crud import ProjectCRUD, UserCRUD, WellLogCRUD, CurveDataCRUD
 from app.core.security import SecurityUtility
+from app.core.cache import cached, invalidate, succeeded
+from app.core.settings import settings
+from app.services.data_service import DataService
 
 logger = logging.getLogger(__name__)
 
@@ -134,7 +137,14 @@ class ProjectService:
 
     @staticmethod
     def delete_project(db: Session, project_id: int) -> Dict[str, Any]:
-        """删除项目"""
+        """删除项目及其测井、曲线、预测结果和存储文件
+
+        项目曲线数据点数（按 curve_data 实际行数计，不依赖客户端上报的 sample_count）
+        不超过 CASCADE_DELETE_INLINE_SAMPLES 时在一个事务内删除。
+        否则在一个事务内将项目及其测井标记为已删除（随即对所有查询不可见，
+        预测结果同时删除）并返回 scheduled=True：曲线数据由 LogPurger 分批清除，
+        测井全部清除后项目记录随之删除，进程重启后继续。
+        """
         project = ProjectCRUD.get_by_id(db, project_id)
         
         if not project:
@@ -144,25 +154,24 @@ class ProjectService:
                 "message": "项目不存在"
             }
 
-        # 检查是否有关联的测井数据
-        logs_count = WellLogCRUD.count_by_project(db, project_id)
-        if logs_count > 0:
-            return {
-                "success": False,
-                "error": "project_has_data",
-                "message": f"项目包含 {logs_count} 条测井数据，请先删除数据",
-                "logs_count": logs_count
-            }
-
+        name = project.name
+        samples = CurveDataCRUD.count_by_logs(
+            db, WellLog.project_id == project_id, limit=settings.CASCADE_DELETE_INLINE_SAMPLES + 1
+        )
+        scheduled = samples > settings.CASCADE_DELETE_INLINE_SAMPLES
         try:
-            ProjectCRUD.delete(db, project_id)
-            logger.info(f"项目已删除: {project.name} (ID: {project_id})")
-            
-            return {
-                "success": True,
-                "message": "项目删除成功"
-            }
+            # 测井、曲线（或删除标记）、预测与项目记录在同一事务内处理
+            deleted = WellLogCRUD.delete_cascade(
+                db, WellLog.project_id == project_id, commit=False, soft=scheduled
+            )
+            if scheduled:
+                ProjectCRUD.mark_deleted(db, project_id)
+                db.commit()
+                invalidate(f"project:{project_id}", "stats")
+            else:
+                ProjectCRUD.delete(db, project_id)
         except Exception as e:
+            db.rollback()
             logger.error(f"项目删除失败: {str(e)}")
             return {
                 "success": False,
@@ -170,7 +179,25 @@ class ProjectService:
                 "message": "项目删除失败"
             }
 
+        WellLogCRUD.invalidate_deleted(deleted)
+        DataService.remove_deleted_files(db, deleted)
+        if scheduled:
+            logger.info(f"项目已标记删除，等待后台清除: {name} (ID: {project_id}, 样本数: {samples})")
+            return {
+                "success": True,
+                "scheduled": True,
+                "message": "项目已删除，曲线数据将在后台清除"
+            }
+        logger.info(f"项目已删除: {name} (ID: {project_id}, 测井: {len(deleted['log_ids'])})")
+        
+        return {
+            "success": True,
+            "scheduled": False,
+            "message": "项目删除成功"
+        }
+
     @staticmethod
+    @cached("project_statistics:{project_id}", tags=["project:{project_id}"], when=succeeded)
     def get_project_statistics(db: Session, project_id: int) -> Dict[str, Any]:
         """获取项目统计信息"""
         project = ProjectCRUD.get_by_id(db, project_id)
@@ -0,0 +1,283 @@
+"""预测结果二进制存储
+
+预测曲线不再以 JSON 保存在 Prediction.results_json 中，而是写入按内容寻址的
+二进制文件，Prediction.result_key 保存文件的 SHA-256 摘要。
+
+文件格式（小端）:
+    MAGIC | chunk_0 | chunk_1 | ... | footer(JSON) | uint32 footer_len | MAGIC
+
+每个 chunk 是 zlib 压缩后的 float32 矩阵 (rows, 1 + n_curves)，第一列为深度。
+footer 记录曲线名和每个 chunk 的偏移、长度及深度范围，读取深度窗口时
+只解压与窗口相交的 chunk，无需解码整个预测结果。
+
+相同内容只存储一份，重新运行预测时新记录直接引用已有文件。
+"""
+
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.settings import settings
+
+MAGIC = b"GLRS1\n"
+_FOOTER_LEN = struct.Struct("<I")
+
+
+class ResultWriter:
+    """流式写入一个预测结果，按追加顺序写入数据块
+
+    每个数据块记录其中深度的最小值和最大值，深度无序时按深度窗口读取仍然正确。
+    """
+
+    def __init__(self, store: "ResultStore", curve_names: Sequence[str], chunk_size: int):
+        self._store = store
+        self._curve_names = list(curve_names)
+        self._chunk_size = chunk_size
+        self._pending: List[np.ndarray] = []
+        self._pending_rows = 0
+        self._chunks: List[Dict[str, Any]] = []
+        self._n_samples = 0
+        self._hash = hashlib.sha256()
+
+        os.makedirs(store.base_dir, exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(dir=store.base_dir, suffix=".tmp")
+        self._file = os.fdopen(fd, "wb")
+        self._write(MAGIC)
+
+    def _write(self, data: bytes) -> None:
+        self._file.write(data)
+        self._hash.update(data)
+
+    def append(self, depths: np.ndarray, values: np.ndarray) -> None:
+        """追加一段结果：depths 为 (n,)，values 为 (n, n_curves)"""
+        values = np.asarray(values, dtype=np.float32)
+        if values.ndim == 1:
+            values = values[:, None]
+        block = np.column_stack([np.asarray(depths, dtype=np.float32), values])
+        self._pending.append(block)
+        self._pending_rows += len(block)
+        while self._pending_rows >= self._chunk_size:
+            self._flush_chunk(self._chunk_size)
+
+    def _flush_chunk(self, rows: int) -> None:
+        merged = np.concatenate(self._pending) if len(self._pending) > 1 else self._pending[0]
+        chunk, rest = merged[:rows], merged[rows:]
+        self._pending = [rest] if len(rest) else []
+        self._pending_rows = len(rest)
+
+        payload = zlib.compress(np.ascontiguousarray(chunk).tobytes(), 6)
+        self._chunks.append({
+            "offset": self._file.tell(),
+            "length": len(payload),
+            "rows": len(chunk),
+            "depth_min": float(chunk[:, 0].min()),
+            "depth_max": float(chunk[:, 0].max()),
+        })
+        self._n_samples += len(chunk)
+        self._write(payload)
+
+    def close(self) -> str:
+        """完成写入并返回结果键"""
+        if self._pending_rows:
+            self._flush_chunk(self._pending_rows)
+        footer = json.dumps({
+            "curves": self._curve_names,
+            "n_samples": self._n_samples,
+            "dtype": "float32",
+            "depth_min": min(c["depth_min"] for c in self._chunks) if self._chunks else None,
+            "depth_max": max(c["depth_max"] for c in self._chunks) if self._chunks else None,
+            "chunks": self._chunks,
+        }).encode("utf-8")
+        self._write(footer)
+        self._write(_FOOTER_LEN.pack(len(footer)))
+        self._write(MAGIC)
+        self._file.close()
+
+        key = self._hash.hexdigest()
+        path = self._store.path_for(key)
+        if os.path.exists(path):
+            os.remove(self._tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(self._tmp_path, path)
+        return key
+
+    def abort(self) -> None:
+        """放弃写入并删除临时文件"""
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+def curves_from_json(
+    results: Any,
+    depth_from: Optional[float] = None,
+    depth_to: Optional[float] = None,
+) -> Optional[Tuple[np.ndarray, Dict[str, np.ndarray]]]:
+    """将客户端提交的 JSON 预测结果转换为 (深度, {曲线名: 数值})
+
+    支持两种格式：
+    - {"depths": [...], "curves": {name: [...]}}，即 ResultStore.read 的返回格式
+    - {name: [...], ...}，各曲线等长；"depth"/"depths" 列作为深度
+    未给出深度时在 [depth_from, depth_to] 上等距分布，二者缺失时取样本序号。
+    样本按深度升序返回（客户端可能按降序或乱序提交）。
+    results 为空（或各曲线没有样本）时返回 None，无法转换时抛出 ValueError。
+    """
+    if isinstance(results, str):
+        results = json.loads(results)
+    if not results:
+        return None
+    if not isinstance(results, dict):
+        raise ValueError("预测结果必须是 JSON 对象")
+
+    if isinstance(results.get("curves"), dict):
+        columns = dict(results["curves"])
+        depths = results.get("depths")
+    else:
+        columns = dict(results)
+        depths = columns.pop("depths", None)
+        if depths is None:
+            depths = columns.pop("depth", None)
+
+    try:
+        curves = {str(name): np.asarray(values, dtype=np.float64) for name, values in columns.items()}
+        depths = None if depths is None else np.asarray(depths, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError("预测结果的曲线必须是数值数组") from None
+    lengths = {len(values) if values.ndim == 1 else -1 for values in curves.values()}
+    if depths is not None:
+        lengths.add(len(depths) if depths.ndim == 1 else -1)
+    if not curves or len(lengths) != 1 or -1 in lengths:
+        raise ValueError("预测结果的各曲线必须是等长的一维数组")
+
+    n_samples = lengths.pop()
+    if n_samples == 0:
+        return None
+    if depths is None:
+        if depth_from is not None and depth_to is not None:
+            depths = np.linspace(depth_from, depth_to, n_samples)
+        else:
+            depths = np.arange(n_samples, dtype=np.float64)
+    order = np.argsort(depths, kind="stable")
+    if np.any(order != np.arange(n_samples)):
+        depths = depths[order]
+        curves = {name: values[order] for name, values in curves.items()}
+    return depths, curves
+
+
+class ResultStore:
+    """按内容寻址的预测结果存储"""
+
+    def __init__(self, base_dir: str, chunk_size: int = 4096):
+        self.base_dir = base_dir
+        self.chunk_size = chunk_size
+
+    def path_for(self, key: str) -> str:
+        """结果键对应的文件路径（按前两位分目录）"""
+        return os.path.join(self.base_dir, key[:2], f"{key}.glr")
+
+    def open_writer(self, curve_names: Sequence[str]) -> ResultWriter:
+        """打开一个流式写入器"""
+        return ResultWriter(self, curve_names, self.chunk_size)
+
+    def write(self, depths: np.ndarray, curves: Dict[str, Sequence[float]]) -> str:
+        """一次性写入完整结果并返回结果键"""
+        names = list(curves.keys())
+        writer = self.open_writer(names)
+        try:
+            values = np.column_stack([np.asarray(curves[n], dtype=np.float32) for n in names])
+            writer.append(np.asarray(depths), values)
+            return writer.close()
+        except Exception:
+            writer.abort()
+            raise
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path_for(key))
+
+    def info(self, key: str) -> Dict[str, Any]:
+        """读取结果的元数据（曲线、样本数、深度范围、数据块索引）"""
+        with open(self.path_for(key), "rb") as f:
+            return self._read_footer(f)
+
+    @staticmethod
+    def _read_footer(f) -> Dict[str, Any]:
+        tail = len(MAGIC) + _FOOTER_LEN.size
+        f.seek(-tail, os.SEEK_END)
+        trailer = f.read(tail)
+        if trailer[_FOOTER_LEN.size:] != MAGIC:
+            raise ValueError("无效的结果文件")
+        (footer_len,) = _FOOTER_LEN.unpack(trailer[:_FOOTER_LEN.size])
+        f.seek(-(tail + footer_len), os.SEEK_END)
+        return json.loads(f.read(footer_len).decode("utf-8"))
+
+    def read(
+        self,
+        key: str,
+        depth_from: Optional[float] = None,
+        depth_to: Optional[float] = None,
+        curves: Optional[Sequence[str]] = None,
+        as_arrays: bool = False,
+    ) -> Dict[str, Any]:
+        """读取结果，可只取一个深度窗口和部分曲线
+
+        as_arrays 为真时各列以 float64 NumPy 数组返回（供 ORJSONResponse
+        直接序列化），否则为列表。
+
+        Returns:
+            {"depths": [...], "curves": {name: [...]}}
+        """
+        with open(self.path_for(key), "rb") as f:
+            footer = self._read_footer(f)
+            names = footer["curves"]
+            selected = [n for n in names if curves is None or n in curves]
+            columns = [0] + [names.index(n) + 1 for n in selected]
+
+            blocks = []
+            for chunk in footer["chunks"]:
+                if depth_from is not None and chunk["depth_max"] < depth_from:
+                    continue
+                if depth_to is not None and chunk["depth_min"] > depth_to:
+                    continue
+                f.seek(chunk["offset"])
+                raw = zlib.decompress(f.read(chunk["length"]))
+                block = np.frombuffer(raw, dtype=np.float32).reshape(chunk["rows"], len(names) + 1)
+                blocks.append(block[:, columns])
+
+        if blocks:
+            data = np.concatenate(blocks)
+            mask = np.ones(len(data), dtype=bool)
+            if depth_from is not None:
+                mask &= data[:, 0] >= depth_from
+            if depth_to is not None:
+                mask &= data[:, 0] <= depth_to
+            data = data[mask]
+        else:
+            data = np.zeros((0, len(columns)), dtype=np.float32)
+
+        def column(i: int):
+            if as_arrays:
+                return np.ascontiguousarray(data[:, i], dtype=np.float64)
+            return data[:, i].astype(float).tolist()
+
+        return {
+            "depths": column(0),
+            "curves": {name: column(i + 1) for i, name in enumerate(selected)},
+        }
+
+    def delete(self, key: str) -> bool:
+        """删除结果文件"""
+        path = self.path_for(key)
+        if os.path.exists(path):
+            os.remove(path)
+            return True
+        return False
+
+
+result_store = ResultStore(settings.RESULT_STORE_DIR, settings.RESULT_CHUNK_SIZE)
@@ -1,13 +1,14 @@
 """用户业务逻辑服务"""
 
 from typing import Optional, Dict, Any
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 import logging
 
 from app.models import User
 from app.schemas import UserCreate, UserUpdate, UserResponse
-from app.crud import UserCRUD
+from app.crud import AsyncUserCRUD, UserCRUD
 from app.core.security import SecurityUtility
 
 logger = logging.getLogger(__name__)
@@ -57,13 +58,17 @@ class UserService:
             }
 
     @staticmethod
-    def authenticate_user(db: Session, username: str, password: str) -> Dict[str, Any]:
-        """用户认证 - 业务逻辑处理"""
+    async def authenticate_user(db: AsyncSession, username: str, password: str) -> Dict[str, Any]:
+        """用户认证 - 业务逻辑处理
+
+        bcrypt 在密码哈希线程池中执行，等待期间不占用线程；
+        等待中的密码操作过多时抛出 PasswordHasherBusy。
+        """
         # 查询用户
-        user = UserCRUD.get_by_username(db, username)
+        user = await AsyncUserCRUD.get_by_username(db, username)
         if not user:
             # 尝试按邮箱查询
-            user = UserCRUD.get_by_email(db, username)
+            user = await AsyncUserCRUD.get_by_email(db, username)
 
         if not user:
             logger.warning(f"登录失败 - 用户不存在: {username}")
@@ -74,7 +79,8 @@ class UserService:
             }
 
         # 验证密码
-        if not SecurityUtility.verify_password(password, user.password_hash):
+        valid, new_hash = await SecurityUtility.verify_and_update_password_async(password, user.password_hash)
+        if not valid:
             logger.warning(f"登录失败 - 密码错误: {username}")
             return {
                 "success": False,
@@ -91,10 +97,12 @@ class UserService:
                 "message": "账户已被禁用"
             }
 
-        # 更新最后登录时间
+        # 更新最后登录时间，哈希参数已过时则按当前参数重新哈希
         try:
             user.last_login = datetime.utcnow()
-            db.commit()
+            if new_hash:
+                user.password_hash = new_hash
+            await db.commit()
         except Exception as e:
             logger.error(f"更新最后登录时间失败: {str(e)}")
 
@@ -102,6 +110,7 @@ class UserService:
 
         # 生成访问 token 并返回
         payload = {
+            "sub": str(user.id),
             "user_id": user.id,
             "username": user.username,
             "role": user.role.value if hasattr(user.role, 'value') else user.role
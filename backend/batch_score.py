@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+离线批量打分命令行工具
+
+对项目下的全部测井运行指定的 AI 模型，并将结果写入 Prediction 表。
+中断后重新执行同一命令，会跳过已成功打分的测井。
+
+用法:
+    python batch_score.py --project-id 1 --model-id 2 --workers 8
+"""
+import argparse
+import logging
+import os
+import sys
+from pathlib import Path
+
+# Setup path
+backend_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(backend_dir))
+
+# Load .env
+env_file = backend_dir / '.env'
+if env_file.exists():
+    for line in env_file.read_text().splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if '=' in line:
+            k, v = line.split('=', 1)
+            os.environ.setdefault(k.strip(), v.strip())
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="GeologAI 离线批量打分")
+    parser.add_argument("--project-id", type=int, required=True, help="项目ID")
+    parser.add_argument("--model-id", type=int, required=True, help="AI模型ID")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="工作进程数（默认CPU核数，0表示单进程）")
+    parser.add_argument("--window-size", type=int, default=None,
+                        help="推理窗口长度（默认取模型 max_position_embeddings）")
+    parser.add_argument("--overlap", type=int, default=None, help="相邻窗口重叠样本数")
+    parser.add_argument("--batch-size", type=int, default=None, help="每批推理的窗口数")
+    parser.add_argument("--commit-every", type=int, default=20,
+                        help="每累计多少条结果写入一次数据库")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    from app.db.session import SessionLocal, use_primary
+    from app.services.batch_scoring_service import BatchScoringService
+
+    def report(done: int, total: int) -> None:
+        print(f"\r▶️  {done}/{total} 条测井已完成", end="", flush=True)
+
+    db = SessionLocal()
+    # 断点续跑依据已写入的结果判断，读取不能落后于主库
+    use_primary(db)
+    try:
+        result = BatchScoringService.score_project(
+            db,
+            project_id=args.project_id,
+            model_id=args.model_id,
+            workers=args.workers,
+            parameters={
+                "window_size": args.window_size,
+                "overlap": args.overlap,
+                "batch_size": args.batch_size,
+            },
+            commit_every=args.commit_every,
+            progress=report,
+        )
+    finally:
+        db.close()
+
+    print()
+    if not result.get("success"):
+        print(f"❌ {result.get('message')}")
+        return 1
+
+    print(
+        f"✅ {result['message']}: 成功 {result['scored']}, 失败 {result['failed']}, "
+        f"跳过 {result['skipped']}, 耗时 {result['elapsed_seconds']}s"
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+认证开销微基准
+
+测量每个请求在 get_current_user 中的认证耗时：
+- cold: 每次清空令牌缓存，完整解码并校验签名
+- warm: 重复令牌命中令牌缓存
+
+用户记录预先放入用户缓存，因此结果不包含数据库查询。
+
+用法:
+    python bench_auth.py --iterations 20000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Setup path
+backend_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(backend_dir))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="GeologAI 认证开销微基准")
+    parser.add_argument("--iterations", type=int, default=20000, help="每种场景的请求数")
+    return parser.parse_args(argv)
+
+
+def measure(iterations: int, run) -> float:
+    """返回单次调用的平均耗时（微秒）"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        run()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    from app.core.security import (
+        HTTPAuthCredentials, Principal, SecurityUtility, resolve_principal,
+        token_cache, token_keys, user_cache
+    )
+
+    user_cache.put(Principal(id=1, username="bench", role="user"))
+    token = SecurityUtility.create_access_token(
+        {"sub": "1", "username": "bench", "role": "user"}
+    )
+    credentials = HTTPAuthCredentials(scheme="Bearer", credentials=token)
+
+    def authenticate():
+        payload = SecurityUtility.verify_access_token(credentials)
+        return resolve_principal(None, payload)
+
+    def cold():
+        token_cache.clear()
+        authenticate()
+
+    print(f"算法: {token_keys.algorithm}，请求数: {args.iterations}")
+    print(f"cold (解码+验签): {measure(args.iterations, cold):8.2f} µs/请求")
+    authenticate()
+    print(f"warm (缓存命中):  {measure(args.iterations, authenticate):8.2f} µs/请求")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
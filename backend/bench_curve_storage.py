@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+"""
+曲线数据存储体积基准
+
+以一条 10 条曲线 × N 个深度点的测井为例，在临时 SQLite 数据库中对比 curve_data
+的两种表结构占用的空间：
+- 旧结构: 每个数据点保存曲线名（String(50)）、质量标记（"good"）和 created_at，
+          主键上另有一个冗余索引
+- 新结构: 曲线名保存在 curves 字典表中，数据点只保存 SmallInteger 的 curve_id，
+          质量标记为 QualityFlag 位掩码，不保存逐点时间戳
+
+表和索引的字节数由 dbstat 虚拟表统计（SQLite 未编译 dbstat 时只输出 VACUUM 后的文件大小）。
+
+用法:
+    python bench_curve_storage.py --depths 20000
+"""
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Setup path
+backend_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(backend_dir))
+
+CURVES = ["GR", "SP", "CAL", "RT", "RXO", "DEN", "CNL", "AC", "PE", "SW"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="GeologAI 曲线数据存储体积基准")
+    parser.add_argument("--depths", type=int, default=20000, help="每条曲线的深度点数")
+    return parser.parse_args(argv)
+
+
+def legacy_table(metadata):
+    """旧的 curve_data 表结构"""
+    from sqlalchemy import Column, DateTime, Float, Index, Integer, String, Table
+
+    return Table(
+        "curve_data", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("log_id", Integer, nullable=False),
+        Column("curve_name", String(50)),
+        Column("depth", Float),
+        Column("value", Float),
+        Column("quality_flag", Integer),  # API 默认写入 "good"，SQLite 按文本保存
+        Column("created_at", DateTime),
+        Index("idx_curve_log_depth", "log_id", "depth"),
+    )
+
+
+def samples(depths: int):
+    for i in range(depths):
+        depth = 1000.0 + i * 0.125
+        for j, name in enumerate(CURVES):
+            yield name, depth, depth * 0.01 + j
+
+
+def load_legacy(path: str, depths: int) -> None:
+    from sqlalchemy import MetaData, create_engine
+
+    engine = create_engine(f"sqlite:///{path}")
+    table = legacy_table(MetaData())
+    table.metadata.create_all(engine)
+    now = datetime.utcnow()
+    rows = [
+        {"log_id": 1, "curve_name": name, "depth": depth, "value": value,
+         "quality_flag": "good", "created_at": now}
+        for name, depth, value in samples(depths)
+    ]
+    with engine.begin() as connection:
+        connection.execute(table.insert(), rows)
+    engine.dispose()
+
+
+def load_compact(path: str, depths: int) -> None:
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    from app.models import Curve, CurveData, get_curves
+
+    engine = create_engine(f"sqlite:///{path}")
+    Curve.__table__.create(engine)
+    CurveData.__table__.create(engine)
+    with Session(engine) as db:
+        curve_ids = {name: curve.id for name, curve in get_curves(db, CURVES).items()}
+        rows = [
+            {"log_id": 1, "curve_id": curve_ids[name], "depth": depth, "value": value, "quality_flag": 0}
+            for name, depth, value in samples(depths)
+        ]
+        db.execute(CurveData.__table__.insert(), rows)
+        db.commit()
+    engine.dispose()
+
+
+def measure(path: str) -> dict:
+    """VACUUM 后各表/索引的字节数及文件大小"""
+    connection = sqlite3.connect(path)
+    try:
+        connection.execute("VACUUM")
+        try:
+            sizes = dict(connection.execute(
+                "SELECT name, SUM(pgsize) FROM dbstat GROUP BY name ORDER BY name"
+            ).fetchall())
+        except sqlite3.OperationalError:
+            sizes = {}
+    finally:
+        connection.close()
+    sizes["(file)"] = Path(path).stat().st_size
+    return sizes
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    rows = args.depths * len(CURVES)
+    print(f"曲线数: {len(CURVES)}，深度点: {args.depths}，数据点: {rows:,d}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for label, load in (("legacy", load_legacy), ("compact", load_compact)):
+            path = str(Path(tmp) / f"{label}.db")
+            started = time.perf_counter()
+            load(path, args.depths)
+            elapsed = time.perf_counter() - started
+            results[label] = measure(path)
+            print(f"{label}（写入 {elapsed:.1f} s）:")
+            for name, size in results[label].items():
+                if name.startswith("sqlite_"):
+                    continue
+                print(f"  {name:24s} {size:>12,d} B")
+
+        legacy, compact = results["legacy"]["(file)"], results["compact"]["(file)"]
+        print(f"文件大小: {legacy:,d} B -> {compact:,d} B "
+              f"({compact / legacy:.1%}，每个数据点 {legacy / rows:.1f} B -> {compact / rows:.1f} B)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+大响应序列化与压缩基准
+
+以一条 100k 样本的预测曲线（/predictions/{id}/results 的响应体）为例：
+- 序列化: FastAPI 默认路径（列表 + jsonable_encoder + json.dumps）
+          对比 ORJSONResponse（NumPy 数组直接序列化）
+- 压缩:   identity / gzip / br / zstd 的传输字节数与压缩耗时
+          （brotli、zstandard 未安装时跳过对应编码）
+
+用法:
+    python bench_responses.py --samples 100000 --repeat 5
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Setup path
+backend_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(backend_dir))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="GeologAI 大响应序列化与压缩基准")
+    parser.add_argument("--samples", type=int, default=100000, help="曲线样本数")
+    parser.add_argument("--repeat", type=int, default=5, help="每项重复次数（取中位数）")
+    return parser.parse_args(argv)
+
+
+def median_ms(repeat: int, run) -> tuple:
+    """返回 (耗时中位数 ms, 最后一次结果)"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], result
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    import numpy as np
+    from fastapi.encoders import jsonable_encoder
+    from app.api.compression import available_encoders
+    from app.api.responses import dumps
+    from app.services.result_store import ResultStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultStore(tmp)
+        depths = np.linspace(1000.0, 3000.0, args.samples)
+        key = store.write(depths, {"PRED": np.sin(depths / 50.0) * 40 + 80})
+
+        def body(results):
+            return {"prediction_id": 1, "depth_from": 1000.0, "depth_to": 3000.0, "results": results}
+
+        def default_path():
+            content = jsonable_encoder(body(store.read(key)))
+            return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+        def orjson_path():
+            return dumps(body(store.read(key, as_arrays=True)))
+
+        print(f"样本数: {args.samples}，重复: {args.repeat}")
+        print("序列化（含读取结果文件）:")
+        default_ms, default_bytes = median_ms(args.repeat, default_path)
+        orjson_ms, payload = median_ms(args.repeat, orjson_path)
+        print(f"  default  {default_ms:8.1f} ms  {len(default_bytes):>10,d} B")
+        print(f"  orjson   {orjson_ms:8.1f} ms  {len(payload):>10,d} B  ({default_ms / orjson_ms:.1f}x)")
+        assert json.loads(payload) == json.loads(default_bytes)
+
+        print("压缩（orjson 响应体）:")
+        print(f"  identity {0.0:8.1f} ms  {len(payload):>10,d} B")
+        for name, factory in available_encoders().items():
+            def compress():
+                compressor = factory()
+                return compressor.compress(payload) + compressor.flush()
+            elapsed, compressed = median_ms(args.repeat, compress)
+            print(f"  {name:8s} {elapsed:8.1f} ms  {len(compressed):>10,d} B  "
+                  f"({len(compressed) / len(payload):.1%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
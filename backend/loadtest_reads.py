@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+"""
+读接口并发压测
+
+在固定的线程池大小下，对比同步端点与 async 端点的吞吐量和延迟：
+- sync:  GET /api/v1/projects/{id}     （同步会话，占用线程池线程）
+- async: GET /api/v1/data/logs/{id}    （AsyncSession，不占用线程池）
+
+两者每个请求各执行一次主键查询。默认在进程内运行应用，使用临时 SQLite 库，
+并通过 --db-latency-ms 为每条 SQL 模拟数据库往返延迟（在执行该 SQL 的线程中
+等待，与真实网络 I/O 一致）。
+
+用法:
+    python loadtest_reads.py --threads 4 --concurrency 64 --requests 2000 --db-latency-ms 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Setup path
+backend_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(backend_dir))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="GeologAI 读接口并发压测")
+    parser.add_argument("--threads", type=int, default=4, help="线程池大小（固定的工作线程数）")
+    parser.add_argument("--concurrency", type=int, default=64, help="并发请求数")
+    parser.add_argument("--requests", type=int, default=2000, help="每个端点的请求总数")
+    parser.add_argument("--db-latency-ms", type=float, default=20.0, help="每条 SQL 的模拟往返延迟")
+    return parser.parse_args(argv)
+
+
+def setup_database(db_path: str, latency: float, pool_size: int):
+    """创建临时库、测试数据，返回同步会话工厂与异步引擎"""
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+    from app.core.security import SecurityUtility
+    from app.models import Base, Project, User, WellLog
+
+    def delay(statement):
+        time.sleep(latency)
+
+    # 连接池不小于并发数，使两种端点都只受线程池限制
+    engine = create_engine(
+        f"sqlite:///{db_path}",
+        connect_args={"check_same_thread": False},
+        pool_size=pool_size,
+        max_overflow=0
+    )
+    Base.metadata.create_all(bind=engine)
+    event.listen(engine, "connect", lambda conn, record: conn.set_trace_callback(delay))
+
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{db_path}",
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=pool_size,
+        max_overflow=0
+    )
+    event.listen(
+        async_engine.sync_engine, "connect",
+        lambda conn, record: conn.run_async(lambda driver: driver.set_trace_callback(delay))
+    )
+
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = session_factory()
+    user = User(username="loadtest", email="loadtest@example.com", password_hash="x",
+                role="user", status="active")
+    db.add(user)
+    db.flush()
+    project = Project(name="loadtest", owner_id=user.id)
+    db.add(project)
+    db.flush()
+    log = WellLog(project_id=project.id, filename="loadtest.las", file_size=0)
+    db.add(log)
+    db.commit()
+    ids = (user.id, project.id, log.id)
+    db.close()
+
+    token = SecurityUtility.create_access_token(
+        {"sub": str(ids[0]), "username": "loadtest", "role": "user"}
+    )
+    return session_factory, async_engine, ids, token
+
+
+async def run_load(client, path: str, headers: dict, total: int, concurrency: int):
+    """并发请求同一路径，返回 (吞吐量, 各请求延迟)"""
+    latencies = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} 返回 {response.status_code}: {response.text}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return total / (time.perf_counter() - started), latencies
+
+
+def report(name: str, throughput: float, latencies: list) -> None:
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1000
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+    print(f"{name:6s} {throughput:9.1f} req/s   p50 {p50:7.1f} ms   p95 {p95:7.1f} ms")
+
+
+async def main_async(args, app, async_engine, headers, project_id, log_id):
+    import anyio
+    import httpx
+
+    anyio.to_thread.current_default_thread_limiter().total_tokens = args.threads
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+        for name, path in (
+            ("sync", f"/api/v1/projects/{project_id}"),
+            ("async", f"/api/v1/data/logs/{log_id}"),
+        ):
+            await run_load(client, path, headers, args.concurrency, args.concurrency)
+            report(name, *await run_load(client, path, headers, args.requests, args.concurrency))
+    await async_engine.dispose()
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from app.main import app
+    from app.db.session import get_async_db, get_db
+
+    with tempfile.TemporaryDirectory() as tmp:
+        session_factory, async_engine, ids, token = setup_database(
+            os.path.join(tmp, "loadtest.db"), args.db_latency_ms / 1000, args.concurrency
+        )
+
+        def override_get_db():
+            db = session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        async_session_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+
+        async def override_get_async_db():
+            async with async_session_factory() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_async_db] = override_get_async_db
+
+        print(f"线程池: {args.threads}，并发: {args.concurrency}，"
+              f"请求数: {args.requests}，SQL 延迟: {args.db_latency_ms} ms")
+        headers = {"Authorization": f"Bearer {token}"}
+        asyncio.run(main_async(args, app, async_engine, headers, ids[1], ids[2]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,14 +6,19 @@
 
 import pytest
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import NullPool
 from fastapi.testclient import TestClient
 import os
 from datetime import datetime, timedelta
 
+# 应用启动时会初始化 DATABASE_URL 指向的数据库；测试不应改动 .env 中的开发库
+os.environ["DATABASE_URL"] = "sqlite://"
+
 # 导入应用和模型
 from app.main import app
-from app.db.session import get_db
+from app.db.session import get_async_db, get_db
 from app.models import Base
 from app.models import User, Project, WellLog, CurveData, AIModel, Prediction, AuditLog
 from app.core.security import SecurityUtility
@@ -22,15 +27,18 @@ from app.schemas import UserCreate, ProjectCreate, WellLogCreate, PredictionCrea
 
 # ==================== 数据库配置 ====================
 
-# 测试数据库 URL (使用 SQLite 内存数据库，速度快)
-TEST_DATABASE_URL = "sqlite:///:memory:"
+@pytest.fixture(scope="function")
+def test_db_path(tmp_path):
+    """测试数据库文件（SQLite 文件库，同步与异步引擎共享同一数据）"""
+    return tmp_path / "test.db"
+
 
 @pytest.fixture(scope="function")
-def test_db():
+def test_db(test_db_path):
     """创建测试数据库并返回会话"""
     # 创建引擎
     engine = create_engine(
-        TEST_DATABASE_URL,
+        f"sqlite:///{test_db_path}",
         connect_args={"check_same_thread": False},  # SQLite 需要
         echo=False  # 设置为 True 可看到 SQL 语句
     )
@@ -55,15 +63,61 @@ def test_db():
     Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(autouse=True)
+def result_store_dir(tmp_path, monkeypatch):
+    """将预测结果存储重定向到临时目录"""
+    from app.services.result_store import result_store
+    store_dir = tmp_path / "results"
+    monkeypatch.setattr(result_store, "base_dir", str(store_dir))
+    return store_dir
+
+
+@pytest.fixture(autouse=True)
+def clear_auth_caches():
+    """每个测试使用独立的认证缓存（各测试库的用户ID会重复）"""
+    from app.core.security import token_cache, user_cache
+    user_cache.clear()
+    token_cache.clear()
+    yield
+    user_cache.clear()
+    token_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def fake_response_cache():
+    """每个测试使用独立的响应缓存（FakeCacheBackend 按 Redis 的方式序列化）"""
+    from app.core.cache import FakeCacheBackend, response_cache
+    backend = response_cache.backend
+    response_cache.backend = FakeCacheBackend()
+    response_cache.clear()
+    yield response_cache
+    response_cache.backend = backend
+
+
 # ==================== FastAPI 客户端 ====================
 
 @pytest.fixture(scope="function")
-def client(test_db):
+def async_session_factory(test_db, test_db_path):
+    """绑定到测试数据库的异步会话工厂"""
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{test_db_path}",
+        poolclass=NullPool
+    )
+    return async_sessionmaker(async_engine, expire_on_commit=False)
+
+
+@pytest.fixture(scope="function")
+def client(test_db, async_session_factory):
     """创建 FastAPI 测试客户端"""
     def override_get_db():
         return test_db
     
+    async def override_get_async_db():
+        async with async_session_factory() as db:
+            yield db
+    
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     
     client = TestClient(app)
     
@@ -11,6 +11,17 @@ API 端点集成测试
 
 import pytest
 import json
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.api.authorization import Access
+from app.core.security import (
+    LRUCache, PasswordHasher, PasswordHasherBusy, Principal, SecurityUtility, TokenKeys, UserCache,
+    pwd_context, resolve_principal, token_cache, user_cache
+)
+from app.crud import UserCRUD
+from app.models import CurveData, Project, User
 
 
 class TestAuthEndpoints:
@@ -68,6 +79,20 @@ class TestAuthEndpoints:
         assert response.status_code == 200
         data = response.json()
         assert "access_token" in data
+    
+    def test_login_busy_hasher_returns_503(self, client, test_user, test_user_data, monkeypatch):
+        """测试：密码哈希线程池繁忙时登录返回 503"""
+        async def busy(*args):
+            raise PasswordHasherBusy("Too many concurrent password operations")
+        monkeypatch.setattr(SecurityUtility, "verify_and_update_password_async", busy)
+        
+        response = client.post(
+            "/api/v1/auth/login",
+            json={"username": test_user.username, "password": test_user_data["password"]}
+        )
+        
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
 
 
 class TestUserEndpoints:
@@ -81,6 +106,15 @@ class TestUserEndpoints:
         data = response.json()
         assert data["username"] == "testuser"
     
+    def test_list_users_filtered_total(self, client, auth_headers, admin_user):
+        """测试：按角色筛选时 total 只统计符合条件的用户"""
+        response = client.get("/api/v1/users?role=admin", headers=auth_headers)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert [u["id"] for u in data["data"]] == [admin_user.id]
+        assert data["total"] == 1
+    
     def test_list_users_endpoint(self, client, auth_headers):
         """测试：列出用户"""
         response = client.get("/api/v1/users", headers=auth_headers)
@@ -147,6 +181,18 @@ class TestProjectEndpoints:
         assert "data" in data
         assert "total" in data
     
+    def test_list_projects_filtered_total(self, client, auth_headers, test_db, test_project):
+        """测试：按状态筛选时 total 只统计符合条件的项目"""
+        test_db.add(Project(name="Other Project", owner_id=test_project.owner_id, status="completed"))
+        test_db.commit()
+        
+        response = client.get("/api/v1/projects?status=planning&count_mode=estimate", headers=auth_headers)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert [p["id"] for p in data["data"]] == [test_project.id]
+        assert data["total"] == 1
+    
     def test_get_project_endpoint(self, client, auth_headers, test_project):
         """测试：获取项目详情"""
         response = client.get(
@@ -170,6 +216,27 @@ class TestProjectEndpoints:
         data = response.json()
         assert data["description"] == "Updated via API"
     
+    def test_delete_project_with_data_endpoint(self, client, auth_headers, test_project, test_curve_data,
+                                               test_prediction, test_db):
+        """测试：删除包含测井与预测的项目"""
+        response = client.delete(f"/api/v1/projects/{test_project.id}", headers=auth_headers)
+        
+        assert response.status_code == 204
+        assert client.get(f"/api/v1/projects/{test_project.id}", headers=auth_headers).status_code == 404
+    
+    def test_delete_large_project_in_background(self, client, auth_headers, test_project, test_well_log,
+                                                test_curve_data, test_db, monkeypatch):
+        """测试：大项目返回 202，项目立即不可见，曲线数据留待后台清除"""
+        from app.core.settings import settings
+        monkeypatch.setattr(settings, "CASCADE_DELETE_INLINE_SAMPLES", 0)
+        
+        response = client.delete(f"/api/v1/projects/{test_project.id}", headers=auth_headers)
+        
+        assert response.status_code == 202
+        assert client.get(f"/api/v1/projects/{test_project.id}", headers=auth_headers).status_code == 404
+        assert client.delete(f"/api/v1/projects/{test_project.id}", headers=auth_headers).status_code == 404
+        assert test_db.query(CurveData).count() == len(test_curve_data)
+    
     def test_get_project_stats_endpoint(self, client, auth_headers, test_project):
         """测试：获取项目统计"""
         response = client.get(
@@ -225,6 +292,21 @@ class TestDataEndpoints:
         assert data["filename"] == "api_test.las"
 
 
+    def test_delete_large_log_is_purged_in_background(self, client, auth_headers, admin_headers,
+                                                      admin_user, test_well_log, test_curve_data, monkeypatch):
+        """测试：大测井删除返回 202，立即不可见，清除进度可由管理端点查看"""
+        from app.core.settings import settings
+        monkeypatch.setattr(settings, "CASCADE_DELETE_INLINE_SAMPLES", 0)
+        
+        response = client.delete(f"/api/v1/data/logs/{test_well_log.id}", headers=auth_headers)
+        
+        assert response.status_code == 202
+        assert client.get(f"/api/v1/data/logs/{test_well_log.id}", headers=auth_headers).status_code == 404
+        purges = client.get("/api/v1/admin/purges", headers=admin_headers).json()
+        assert [item["log_id"] for item in purges["pending"]] == [test_well_log.id]
+        assert purges["pending"][0]["rows_deleted"] == 0
+
+
 class TestPredictionEndpoints:
     """测试预测相关端点"""
     
@@ -266,6 +348,24 @@ class TestPredictionEndpoints:
         data = response.json()
         assert data["confidence"] == 0.95
     
+    @pytest.mark.parametrize("parameters", [
+        {"window_size": "abc"},
+        {"window_size": 0},
+        {"batch_size": 0},
+        {"overlap": -1},
+        {"unknown": 1},
+    ])
+    def test_run_prediction_invalid_parameters(self, client, auth_headers, test_well_log, test_ai_model, parameters):
+        """测试：无效的推理参数返回 400，不加载模型"""
+        response = client.post(
+            "/api/v1/predictions/run",
+            json={"log_id": test_well_log.id, "model_id": test_ai_model.id, "parameters": parameters},
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 400
+        assert "推理参数无效" in response.json()["detail"]
+    
     def test_rerun_prediction_endpoint(self, client, auth_headers, test_prediction):
         """测试：重新运行预测"""
         response = client.post(
@@ -276,6 +376,128 @@ class TestPredictionEndpoints:
         assert response.status_code == 200
 
 
+class TestConditionalRequests:
+    """测试 ETag / If-None-Match 条件请求"""
+    
+    def test_log_not_modified_until_update(self, client, auth_headers, test_well_log):
+        """测试：ETag 未变时返回 304，更新测井后返回新内容"""
+        url = f"/api/v1/data/logs/{test_well_log.id}"
+        response = client.get(url, headers=auth_headers)
+        etag = response.headers["ETag"]
+        assert response.headers["Cache-Control"] == "private, no-cache"
+        
+        response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+        
+        client.put(url, json={"status": "completed"}, headers=auth_headers)
+        response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+    
+    def test_curves_etag_follows_content(self, client, auth_headers, test_well_log, test_curve_data):
+        """测试：曲线数据 ETag 由内容决定，新增数据点后失效"""
+        url = f"/api/v1/data/logs/{test_well_log.id}/curves?curve_name=GR"
+        etag = client.get(url, headers=auth_headers).headers["ETag"].removeprefix("W/")
+        assert client.get(url, headers={**auth_headers, "If-None-Match": f"W/{etag}"}).status_code == 304
+        
+        client.post(
+            f"/api/v1/data/logs/{test_well_log.id}/curves",
+            json={"curve_name": "GR", "depth": 500.0, "value": 60.0},
+            headers=auth_headers
+        )
+        response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["curve_count"] == len(test_curve_data) + 1
+
+    def test_add_curve_data_unknown_quality_flag(self, client, auth_headers, test_well_log):
+        """测试：未知质量标志返回 400 而不是 500"""
+        url = f"/api/v1/data/logs/{test_well_log.id}/curves"
+        response = client.post(
+            url,
+            json={"curve_name": "GR", "depth": 500.0, "value": 60.0, "quality_flag": "excellent"},
+            headers=auth_headers
+        )
+        assert response.status_code == 400
+
+        response = client.post(
+            url,
+            json={"curve_name": "GR", "depth": 500.0, "value": 60.0, "quality_flag": "suspect"},
+            headers=auth_headers
+        )
+        assert response.status_code == 200
+
+    def test_stored_results_are_immutable(self, client, auth_headers, test_db, test_prediction):
+        """测试：结果存储中的预测结果可长期缓存，304 时不读取结果文件"""
+        from unittest.mock import patch
+        from app.services.result_store import result_store
+        test_prediction.result_key = result_store.write(
+            np.array([1.0, 2.0]), {"PRED": [0.1, 0.2]}
+        )
+        test_db.commit()
+        url = f"/api/v1/predictions/{test_prediction.id}/results"
+        
+        response = client.get(url, headers=auth_headers)
+        assert response.status_code == 200
+        assert "immutable" in response.headers["Cache-Control"]
+        
+        with patch.object(result_store, "read", side_effect=AssertionError("read")):
+            response = client.get(url, headers={**auth_headers, "If-None-Match": response.headers["ETag"]})
+        assert response.status_code == 304
+
+
+class TestResponseCompression:
+    """测试响应压缩与 orjson 序列化"""
+    
+    def test_negotiate_encoding(self):
+        """测试：按 q 值与服务端偏好协商编码"""
+        from app.api.compression import negotiate
+        preference = ["zstd", "br", "gzip"]
+        
+        assert negotiate("gzip, br", preference) == "br"
+        assert negotiate("br;q=0.5, gzip", preference) == "gzip"
+        assert negotiate("*", preference) == "zstd"
+        assert negotiate("gzip;q=0, identity", preference) is None
+        assert negotiate("", preference) is None
+    
+    def test_large_curve_response_is_compressed(self, client, auth_headers, test_well_log, test_db):
+        """测试：大响应按 gzip 压缩，ETag 降为弱 ETag，小响应不压缩"""
+        test_db.add_all([
+            CurveData(log_id=test_well_log.id, curve_name="GR", depth=float(d), value=50.0 + d)
+            for d in range(200)
+        ])
+        test_db.commit()
+        url = f"/api/v1/data/logs/{test_well_log.id}/curves?curve_name=GR"
+        
+        response = client.get(url, headers={**auth_headers, "Accept-Encoding": "gzip"})
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert response.headers["ETag"].startswith("W/")
+        assert response.json()["curve_count"] == 200
+        assert response.json()["curves"][0]["curve_name"] == "GR"
+        
+        response = client.get(url, headers={**auth_headers, "If-None-Match": response.headers["ETag"]})
+        assert response.status_code == 304
+        
+        response = client.get("/health", headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in response.headers
+    
+    def test_results_serialized_from_arrays(self, client, auth_headers, test_db, test_prediction):
+        """测试：预测结果以 NumPy 数组经 orjson 序列化，数值与列表形式一致"""
+        from app.services.result_store import result_store
+        depths = np.linspace(0.0, 10.0, 50)
+        values = np.sin(depths)
+        test_prediction.result_key = result_store.write(depths, {"PRED": values})
+        test_db.commit()
+        
+        response = client.get(f"/api/v1/predictions/{test_prediction.id}/results", headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert response.headers["ETag"]
+        assert response.json()["results"] == result_store.read(test_prediction.result_key)
+
+
 class TestAuthorizationAndPermissions:
     """测试授权和权限检查"""
     
@@ -303,6 +525,303 @@ class TestAuthorizationAndPermissions:
         assert response.status_code in [403, 400]
 
 
+class TestAccessContext:
+    """测试请求级授权上下文"""
+    
+    def _access(self, db, user):
+        from starlette.requests import Request
+        request = Request({"type": "http", "headers": []})
+        principal = Principal(id=user.id, username=user.username, role=user.role)
+        return Access(request, current_user=principal, db=db)
+    
+    def _count_selects(self, db, run):
+        statements = []
+        
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(db.get_bind(), "before_cursor_execute", capture)
+        try:
+            run()
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", capture)
+        return len(statements)
+    
+    def test_prediction_log_project_resolved_once(self, test_db, test_user, test_prediction):
+        """测试：预测 → 测井 → 项目一次查询加载，请求内重复校验不再查询"""
+        access = self._access(test_db, test_user)
+        
+        def run():
+            prediction, log, project = access.prediction(test_prediction.id)
+            assert project.owner_id == test_user.id
+            access.log(log.id)
+            access.project(project.id)
+            access.prediction(test_prediction.id)
+        
+        assert self._count_selects(test_db, run) == 1
+    
+    def test_other_user_forbidden(self, test_db, admin_user, test_user, test_well_log):
+        """测试：非所有者访问返回 403，管理员可访问"""
+        other = User(username="other", email="other@example.com", password_hash="x", role="user")
+        test_db.add(other)
+        test_db.commit()
+        
+        with pytest.raises(HTTPException) as exc:
+            self._access(test_db, other).log(test_well_log.id)
+        assert exc.value.status_code == 403
+        
+        log, _ = self._access(test_db, admin_user).log(test_well_log.id)
+        assert log.id == test_well_log.id
+    
+    def test_missing_log_not_found(self, test_db, test_user):
+        """测试：测井不存在返回 404"""
+        with pytest.raises(HTTPException) as exc:
+            self._access(test_db, test_user).log(99999)
+        assert exc.value.status_code == 404
+
+
+class TestPrincipalResolution:
+    """测试由令牌声明构建当前用户"""
+    
+    def _count_selects(self, db, run):
+        statements = []
+        
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(db.get_bind(), "before_cursor_execute", capture)
+        try:
+            run()
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", capture)
+        return len(statements)
+    
+    def test_claims_build_typed_principal(self, test_db, test_user):
+        """测试：声明中的ID和角色直接成为属性"""
+        payload = {"sub": str(test_user.id), "username": test_user.username, "role": "user"}
+        principal = resolve_principal(test_db, payload)
+        
+        assert principal.id == test_user.id
+        assert principal.username == test_user.username
+        assert principal.role == "user"
+        assert not principal.is_admin
+    
+    def test_user_lookup_cached(self, test_db, test_user):
+        """测试：同一用户的后续请求不再查询用户表"""
+        payload = {"sub": str(test_user.id), "role": "user"}
+        
+        assert self._count_selects(test_db, lambda: resolve_principal(test_db, payload)) == 1
+        assert self._count_selects(test_db, lambda: resolve_principal(test_db, payload)) == 0
+        assert resolve_principal(test_db, payload) is user_cache.get(test_user.id)
+    
+    def test_username_only_token(self, test_db, admin_user):
+        """测试：仅含用户名的令牌按用户名加载用户"""
+        principal = resolve_principal(test_db, {"sub": admin_user.username})
+        
+        assert principal.id == admin_user.id
+        assert principal.is_admin
+    
+    def test_banned_user_rejected(self, test_db, test_user):
+        """测试：封禁用户返回 403，状态变更会使缓存失效"""
+        payload = {"sub": str(test_user.id), "role": "user"}
+        resolve_principal(test_db, payload)
+        
+        UserCRUD.change_status(test_db, test_user.id, "banned")
+        
+        with pytest.raises(HTTPException) as exc:
+            resolve_principal(test_db, payload)
+        assert exc.value.status_code == 403
+    
+    def test_role_from_user_record(self, test_db, test_user, admin_user):
+        """测试：角色取自用户记录，不信任令牌声明；降级后旧令牌失去管理员权限"""
+        principal = resolve_principal(test_db, {"sub": str(test_user.id), "role": "admin"})
+        assert principal.role == "user"
+        assert not principal.is_admin
+        
+        payload = {"sub": str(admin_user.id), "role": "admin"}
+        assert resolve_principal(test_db, payload).is_admin
+        
+        admin_user.role = "user"
+        test_db.commit()
+        user_cache.invalidate(admin_user.id)
+        
+        assert not resolve_principal(test_db, payload).is_admin
+    
+    def test_unknown_user_rejected(self, test_db):
+        """测试：用户不存在返回 401"""
+        with pytest.raises(HTTPException) as exc:
+            resolve_principal(test_db, {"sub": "99999", "role": "user"})
+        assert exc.value.status_code == 401
+    
+    def test_cache_ttl_and_lru(self):
+        """测试：缓存条目过期及按最近使用淘汰"""
+        now = [0.0]
+        cache = UserCache(max_entries=2, ttl_seconds=30, clock=lambda: now[0])
+        for user_id in (1, 2):
+            cache.put(Principal(id=user_id, username=f"u{user_id}", role="user"))
+        
+        cache.get(1)
+        cache.put(Principal(id=3, username="u3", role="user"))
+        assert cache.get(2) is None
+        assert cache.get(1) is not None
+        
+        now[0] = 31.0
+        assert cache.get(1) is None
+        assert cache.get(3) is None
+
+
+class TestTokenVerification:
+    """测试令牌验证缓存与非对称密钥"""
+    
+    def test_repeated_token_skips_decode(self, monkeypatch):
+        """测试：同一令牌第二次验证直接命中缓存"""
+        import jwt
+        calls = []
+        decode = jwt.decode
+        monkeypatch.setattr(jwt, "decode", lambda *a, **kw: calls.append(1) or decode(*a, **kw))
+        token = SecurityUtility.create_access_token({"sub": "1", "role": "user"})
+        
+        first = SecurityUtility.verify_token(token)
+        second = SecurityUtility.verify_token(token)
+        
+        assert first == second
+        assert first["sub"] == "1"
+        assert len(calls) == 1
+    
+    def test_invalid_token_not_cached(self):
+        """测试：无效令牌返回 401 且不进入缓存"""
+        with pytest.raises(HTTPException) as exc:
+            SecurityUtility.verify_token("not-a-token")
+        assert exc.value.status_code == 401
+        assert len(token_cache) == 0
+    
+    def test_cache_entries_expire_and_are_bounded(self):
+        """测试：缓存条目在到期时间后失效，超过容量淘汰最久未用的"""
+        now = [100.0]
+        cache = LRUCache(max_entries=2, clock=lambda: now[0])
+        cache.put("a", {"sub": "1"}, expires_at=150)
+        cache.put("b", {"sub": "2"}, expires_at=200)
+        cache.put("c", {"sub": "3"}, expires_at=200)
+        
+        assert cache.get("a") is None
+        now[0] = 160.0
+        assert cache.get("b") == {"sub": "2"}
+        now[0] = 200.0
+        assert cache.get("b") is None
+    
+    def test_rs256_verify_with_public_key_only(self):
+        """测试：RS256 私钥签名，仅持有公钥的服务可离线验证"""
+        import jwt
+        pytest.importorskip("cryptography")
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        private_pem = private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()
+        ).decode("ascii")
+        issuer = TokenKeys.load("RS256", "", private_key=private_pem)
+        verifier = TokenKeys.load("RS256", "", public_key=issuer.public_pem)
+        
+        token = jwt.encode({"sub": "1"}, issuer.signing_key, algorithm="RS256")
+        
+        assert verifier.signing_key is None
+        assert jwt.decode(token, verifier.verification_key, algorithms=["RS256"])["sub"] == "1"
+
+
+class TestPasswordHasher:
+    """测试密码哈希专用线程池"""
+    
+    def test_hash_and_verify_on_pool(self):
+        """测试：哈希与验证在线程池中执行并记录统计"""
+        hasher = PasswordHasher(pwd_context, max_workers=1, max_pending=2)
+        hashed = hasher.hash("Secret123")
+        
+        assert hasher.verify("Secret123", hashed)
+        assert not hasher.verify("wrong", hashed)
+        stats = hasher.stats()
+        assert stats["completed"] == 3
+        assert stats["queued"] == 0 and stats["running"] == 0
+    
+    def test_verify_awaits_pool(self):
+        """测试：协程版本在线程池中验证，完成后释放名额"""
+        import asyncio
+        hasher = PasswordHasher(pwd_context, max_workers=1, max_pending=1)
+        hashed = pwd_context.hash("Secret123")
+        
+        assert asyncio.run(hasher.verify_and_update_async("Secret123", hashed)) == (True, None)
+        assert asyncio.run(hasher.verify_and_update_async("wrong", hashed)) == (False, None)
+        assert hasher.stats()["completed"] == 2
+    
+    def test_rejects_when_pending_limit_reached(self):
+        """测试：等待中的操作达到上限时立即拒绝"""
+        import threading
+        hasher = PasswordHasher(pwd_context, max_workers=1, max_pending=1)
+        started, release = threading.Event(), threading.Event()
+        
+        def blocked():
+            started.set()
+            release.wait(5)
+        
+        worker = threading.Thread(target=hasher._run, args=(blocked,))
+        worker.start()
+        started.wait(5)
+        try:
+            with pytest.raises(PasswordHasherBusy):
+                hasher.verify("Secret123", "hash")
+        finally:
+            release.set()
+            worker.join()
+        
+        assert hasher.stats()["rejected"] == 1
+
+
+class TestAdminEndpoints:
+    """测试管理后台端点"""
+    
+    def test_db_pool_status(self, client, admin_headers, admin_user, auth_headers, test_user):
+        """测试：管理员可查看连接池状态，普通用户不可"""
+        response = client.get("/api/v1/admin/db/pool", headers=admin_headers)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["pools"][0]["name"] == "primary"
+        assert "saturation" in data
+        
+        response = client.get("/api/v1/admin/db/pool", headers=auth_headers)
+        assert response.status_code == 403
+    
+    def test_system_stats_cached_until_write(self, client, admin_headers, admin_user, auth_headers):
+        """测试：系统统计被缓存，创建项目后失效"""
+        projects = client.get("/api/v1/admin/stats", headers=admin_headers).json()["projects"]
+        
+        response = client.post(
+            "/api/v1/projects", json={"name": "Cached Stats"}, headers=auth_headers
+        )
+        assert response.status_code in (200, 201)
+        
+        assert client.get("/api/v1/admin/stats", headers=admin_headers).json()["projects"] == projects + 1
+        assert client.get("/api/v1/admin/stats", headers=auth_headers).status_code == 403
+    
+    def test_system_stats_without_table_scans(self, client, admin_headers, admin_user, test_db):
+        """测试：系统统计只读取计数器，不对各表执行 COUNT"""
+        statements = []
+        listener = lambda *args: statements.append(args[2].lower())
+        event.listen(test_db.get_bind(), "before_cursor_execute", listener)
+        try:
+            response = client.get("/api/v1/admin/stats?days=7", headers=admin_headers)
+        finally:
+            event.remove(test_db.get_bind(), "before_cursor_execute", listener)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["growth"]) == 7
+        assert "bytes_stored" in data
+        assert not any("count(" in statement for statement in statements)
+
+
 class TestErrorHandlingInAPI:
     """测试 API 错误处理"""
     
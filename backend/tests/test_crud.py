@@ -6,14 +6,33 @@ CRUD 操作单元测试
 - ProjectCRUD: 项目的生命周期管理
 - WellLogCRUD: 测井数据管理
 - PredictionCRUD: 预测结果管理
+- Async*CRUD: 异步读取操作
 """
 
+import os
+import shutil
+import subprocess
+import sys
 import pytest
+import asyncio
 from datetime import datetime, timedelta
+from pathlib import Path
+from sqlalchemy import event, inspect
 
-from app.crud import UserCRUD, ProjectCRUD, WellLogCRUD, CurveDataCRUD, PredictionCRUD
+from app.crud import UserCRUD, ProjectCRUD, WellLogCRUD, CurveDataCRUD, PredictionCRUD, AIModelCRUD, SystemCounterCRUD
+from app.crud import AsyncWellLogCRUD, AsyncCurveDataCRUD, AsyncPredictionCRUD
 from app.schemas import UserCreate, UserUpdate, ProjectCreate, ProjectUpdate, WellLogCreate, WellLogUpdate, PredictionCreate
 from app.core.security import SecurityUtility
+from app.models import AIModel, Base, Curve, Prediction, QualityFlag, User, WellLog
+from app.crud.pagination import decode_cursor, encode_cursor, next_cursor
+from app.db import partitioning
+from app.db.migrations import (
+    compact_curve_data, create_missing_columns, create_missing_indexes, needs_compaction
+)
+from app.db.session import (
+    ENGINES_PER_DATABASE, RoutingSession, _create_engine, get_db, pool_options, use_primary
+)
+from app.db.pool import InstrumentedQueuePool, pool_status
 
 
 class TestUserCRUD:
@@ -233,6 +252,48 @@ class TestCurveDataCRUD:
         
         count = CurveDataCRUD.count_by_log(test_db, test_well_log.id)
         assert count == 0
+    
+    def test_delete_batch_without_id_list(self, test_db, test_well_log, test_curve_data):
+        """测试：分批删除不向数据库传送 ID 列表，参数个数与批大小无关"""
+        parameters = []
+        
+        def capture(conn, cursor, statement, params, context, executemany):
+            if statement.lstrip().upper().startswith("DELETE"):
+                parameters.append(params)
+        
+        event.listen(test_db.get_bind(), "before_cursor_execute", capture)
+        try:
+            assert CurveDataCRUD.delete_batch(test_db, test_well_log.id, 4) == 4
+            assert CurveDataCRUD.delete_batch(test_db, test_well_log.id, 50000) == len(test_curve_data) - 4
+            assert CurveDataCRUD.delete_batch(test_db, test_well_log.id, 50000) == 0
+        finally:
+            event.remove(test_db.get_bind(), "before_cursor_execute", capture)
+        
+        # log_id 与 LIMIT/OFFSET
+        assert [len(params) for params in parameters] == [3, 3, 3]
+    
+    def test_curve_names_stored_once(self, test_db, test_well_log, test_curve_data):
+        """测试：曲线名只在曲线字典中保存一次，数据点引用整数 ID"""
+        other = WellLog(project_id=test_well_log.project_id, filename="other.las")
+        test_db.add(other)
+        test_db.commit()
+        point = CurveDataCRUD.create(test_db, "GR", 1000.0, 80.0, "suspect|interpolated", other.id)
+        
+        assert test_db.query(Curve).filter(Curve.name == "GR").count() == 1
+        assert isinstance(point.curve_id, int)
+        assert point.curve_id == test_curve_data[0].curve_id
+        assert point.quality_flag == QualityFlag.SUSPECT | QualityFlag.INTERPOLATED
+        assert CurveDataCRUD.get_curve_names(test_db, other.id) == ["GR"]
+    
+    def test_quality_flag_parse(self):
+        """测试：质量标记兼容旧的名称写法"""
+        assert QualityFlag.parse(None) == 0
+        assert QualityFlag.parse("good") == 0
+        assert QualityFlag.parse("BAD") == QualityFlag.BAD
+        assert QualityFlag.parse("suspect|missing") == 9
+        assert QualityFlag.parse(4) == QualityFlag.INTERPOLATED
+        with pytest.raises(ValueError):
+            QualityFlag.parse("excellent")
 
 
 class TestPredictionCRUD:
@@ -267,6 +328,62 @@ class TestPredictionCRUD:
         assert len(predictions) >= 1
         assert any(p.id == test_prediction.id for p in predictions)
     
+    def test_get_latest_by_models(self, test_db, test_well_log, test_ai_model):
+        """测试：一次查询获取每个模型最新的预测"""
+        other_model = AIModel(name="Other Model", model_type="regression", status="active")
+        test_db.add(other_model)
+        test_db.commit()
+        
+        created = {}
+        for model_id in (test_ai_model.id, test_ai_model.id, other_model.id, test_ai_model.id):
+            created[model_id] = PredictionCRUD.create(
+                test_db,
+                PredictionCreate(log_id=test_well_log.id, model_id=model_id, confidence=0.9)
+            )
+        
+        latest = PredictionCRUD.get_latest_by_models(
+            test_db, test_well_log.id, [test_ai_model.id, other_model.id]
+        )
+        
+        assert len(latest) == 2
+        assert {p.id for p, _ in latest} == {created[test_ai_model.id].id, created[other_model.id].id}
+        assert all(p.model_id == m.id for p, m in latest)
+    
+    def test_list_predictions_defers_large_columns(self, test_db, test_prediction):
+        """测试：列表查询不加载 results_json，访问时按需加载"""
+        test_db.expunge_all()
+        predictions = PredictionCRUD.list_predictions(test_db)
+        
+        assert "results_json" in inspect(predictions[0]).unloaded
+        assert predictions[0].results_json == {"prediction": [1, 2, 3]}
+    
+    def test_cursor_pagination_walks_all_predictions(self, test_db, test_well_log, test_ai_model):
+        """测试：游标分页按 (created_at, id) 倒序遍历全部记录且不重复"""
+        same_time = datetime(2024, 1, 1)
+        for i in range(7):
+            test_db.add(Prediction(
+                log_id=test_well_log.id, model_id=test_ai_model.id, confidence=0.5,
+                created_at=same_time if i < 4 else same_time + timedelta(minutes=i)
+            ))
+        test_db.commit()
+        
+        seen, cursor = [], None
+        while True:
+            page = PredictionCRUD.get_by_log(test_db, test_well_log.id, limit=3, cursor=cursor)
+            seen.extend(p.id for p in page)
+            cursor = next_cursor(page, 3)
+            if cursor is None:
+                break
+        
+        expected = [p.id for p in PredictionCRUD.get_by_log(test_db, test_well_log.id, limit=100)]
+        assert seen == expected
+        assert len(set(seen)) == 7
+    
+    def test_invalid_cursor_rejected(self):
+        """测试：无效游标"""
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+    
     def test_count_predictions_by_log(self, test_db, test_well_log, test_prediction):
         """测试：按测井计数预测"""
         count = PredictionCRUD.count_by_log(test_db, test_well_log.id)
@@ -280,3 +397,505 @@ class TestPredictionCRUD:
         
         deleted_pred = PredictionCRUD.get_by_id(test_db, pred_id)
         assert deleted_pred is None
+
+
+class TestAsyncCRUD:
+    """测试异步 CRUD 与同步 CRUD 结果一致"""
+    
+    def _run(self, async_session_factory, query):
+        async def run():
+            async with async_session_factory() as db:
+                return await query(db)
+        return asyncio.run(run())
+    
+    def test_list_logs_matches_sync(self, test_db, async_session_factory, test_project):
+        """测试：测井列表与游标分页和同步版本一致"""
+        for i in range(5):
+            WellLogCRUD.create(test_db, WellLogCreate(filename=f"async_{i}.las", file_size=1024), test_project.id)
+        first = WellLogCRUD.get_by_project(test_db, test_project.id, limit=3)
+        cursor = next_cursor(first, 3)
+        
+        async def query(db):
+            page = await AsyncWellLogCRUD.get_by_project(db, test_project.id, limit=3)
+            rest = await AsyncWellLogCRUD.get_by_project(db, test_project.id, limit=3, cursor=cursor)
+            total = await AsyncWellLogCRUD.count_by_project(db, test_project.id)
+            return [log.id for log in page], [log.id for log in rest], total
+        
+        page_ids, rest_ids, total = self._run(async_session_factory, query)
+        
+        assert page_ids == [log.id for log in first]
+        assert rest_ids == [log.id for log in WellLogCRUD.get_by_project(test_db, test_project.id, skip=3, limit=3)]
+        assert total == 5
+    
+    def test_get_with_project(self, async_session_factory, test_well_log, test_project):
+        """测试：一次查询获取测井及项目"""
+        async def query(db):
+            log, project = await AsyncWellLogCRUD.get_with_project(db, test_well_log.id)
+            return log.id, project.id
+        
+        assert self._run(async_session_factory, query) == (test_well_log.id, test_project.id)
+    
+    def test_curves_and_predictions(self, async_session_factory, test_well_log, test_curve_data, test_prediction):
+        """测试：曲线与预测读取"""
+        async def query(db):
+            curves = await AsyncCurveDataCRUD.get_by_curve_name(db, test_well_log.id, "GR")
+            predictions = await AsyncPredictionCRUD.get_by_log(db, test_well_log.id)
+            row = await AsyncPredictionCRUD.get_with_log_and_project(db, test_prediction.id)
+            return curves, predictions, row
+        
+        curves, predictions, row = self._run(async_session_factory, query)
+        
+        assert curves and all(c.curve_name == "GR" for c in curves)
+        assert [c.depth for c in curves] == sorted(c.depth for c in curves)
+        assert [p.id for p in predictions] == [test_prediction.id]
+        assert row[0].id == test_prediction.id and row[1].id == test_well_log.id
+
+
+class TestListQueryPlans:
+    """测试列表查询的执行计划（排序走索引，不使用临时排序）"""
+    
+    def _plan(self, db, run):
+        """执行 CRUD 列表查询并返回其 SELECT 语句的查询计划"""
+        engine = db.get_bind()
+        captured = []
+        
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                captured.append((statement, parameters))
+        
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            run()
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+        
+        statement, parameters = captured[-1]
+        rows = db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+        return " | ".join(row[-1] for row in rows)
+    
+    @pytest.mark.parametrize("run, index", [
+        (lambda db: UserCRUD.list_users(db), "idx_user_created"),
+        (lambda db: ProjectCRUD.list_projects(db), "idx_project_created"),
+        (lambda db: ProjectCRUD.get_by_owner(db, 1), "idx_project_owner_created"),
+        (lambda db: WellLogCRUD.list_logs(db), "idx_log_created"),
+        (lambda db: WellLogCRUD.get_by_project(db, 1), "idx_log_project_created"),
+        (lambda db: AIModelCRUD.list_models(db), "idx_model_created"),
+        (lambda db: PredictionCRUD.list_predictions(db), "idx_prediction_created"),
+        (lambda db: PredictionCRUD.get_by_log(db, 1), "idx_prediction_log_created"),
+        (lambda db: PredictionCRUD.get_by_model(db, 1), "idx_prediction_model_created"),
+        (lambda db: PredictionCRUD.get_by_log(db, 1, cursor=encode_cursor(datetime(2024, 1, 1), 5)),
+         "idx_prediction_log_created"),
+    ])
+    def test_list_query_uses_index(self, test_db, run, index):
+        """测试：列表查询使用 (筛选列, created_at) 索引"""
+        plan = self._plan(test_db, lambda: run(test_db))
+        
+        assert index in plan
+        assert "TEMP B-TREE" not in plan
+    
+    def test_migration_creates_missing_indexes(self, test_db):
+        """测试：迁移为已有表补建缺失的索引"""
+        engine = test_db.get_bind()
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DROP INDEX idx_prediction_log_created")
+        
+        created = create_missing_indexes(engine)
+        
+        assert created == ["idx_prediction_log_created"]
+        assert create_missing_indexes(engine) == []
+    
+    def test_migration_adds_missing_columns(self, test_db):
+        """测试：迁移为已有表补建新增的可空列"""
+        engine = test_db.get_bind()
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ALTER TABLE well_logs DROP COLUMN deleted_at")
+        
+        created = create_missing_columns(engine)
+        
+        assert created == ["well_logs.deleted_at"]
+        assert create_missing_columns(engine) == []
+    
+    def test_upgrade_baseline_database(self, tmp_path):
+        """测试：python -m app.db.migrations 可升级初始版本的数据库（新进程，未预先导入模型）"""
+        from sqlalchemy import create_engine
+        backend_dir = Path(__file__).resolve().parent.parent
+        database = tmp_path / "baseline.db"
+        shutil.copy(backend_dir / "geologai_test.db", database)
+        
+        def migrate(*command):
+            completed = subprocess.run(
+                [sys.executable, "-m", "app.db.migrations", *command],
+                cwd=backend_dir, capture_output=True, text=True, timeout=120,
+                env={**os.environ, "DATABASE_URL": f"sqlite:///{database}"}
+            )
+            assert completed.returncode == 0, completed.stderr
+            return completed
+        
+        completed = migrate()
+        engine = create_engine(f"sqlite:///{database}")
+        tables = set(inspect(engine).get_table_names())
+        assert {"curves", "system_counters", "daily_counters", "prediction_cache"} <= tables
+        # 升级不改写 curve_data，只提示运行一次性的 compact 命令
+        assert needs_compaction(engine)
+        assert "app.db.migrations compact" in completed.stderr
+        
+        migrate("compact")
+        assert not needs_compaction(engine)
+        engine.dispose()
+    
+    def test_upgrade_adds_prediction_columns(self, tmp_path):
+        """测试：已有预测记录的初始版本数据库升级后可按新模型查询预测"""
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import Session
+        from app.db.migrations import upgrade
+        database = tmp_path / "baseline.db"
+        shutil.copy(Path(__file__).resolve().parent.parent / "geologai_test.db", database)
+        engine = create_engine(f"sqlite:///{database}")
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                "INSERT INTO predictions (log_id, model_id, confidence, status, created_at) "
+                "VALUES (1, 1, 0.9, 'SUCCESS', '2024-01-01 00:00:00')"
+            )
+        
+        upgrade(engine)
+        
+        columns = {c["name"] for c in inspect(engine).get_columns("predictions")}
+        assert {"parameters_json", "result_key"} <= columns
+        with Session(engine) as db:
+            predictions = PredictionCRUD.list_predictions(db)
+            assert len(predictions) == 1
+            assert predictions[0].parameters_json is None
+        engine.dispose()
+    
+    def test_migration_compacts_curve_data(self, tmp_path):
+        """测试：compact 命令按 id 区间分批把旧的逐点曲线名转换为曲线字典引用"""
+        from sqlalchemy import create_engine
+        engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                "CREATE TABLE curve_data (id INTEGER PRIMARY KEY, log_id INTEGER NOT NULL, "
+                "curve_name VARCHAR(50), depth FLOAT, value FLOAT, quality_flag INTEGER, created_at DATETIME)"
+            )
+            conn.exec_driver_sql("CREATE INDEX ix_curve_data_id ON curve_data (id)")
+            conn.exec_driver_sql(
+                "INSERT INTO curve_data (log_id, curve_name, depth, value, quality_flag) VALUES "
+                "(1, 'GR', 1000.0, 80.0, 'good'), (1, 'SP', 1000.0, -20.0, 'bad'), "
+                "(2, 'GR', 1000.0, 75.0, 0), (2, NULL, 1000.0, 1.0, NULL)"
+            )
+        
+        Base.metadata.create_all(bind=engine)
+        assert compact_curve_data(engine, batch_size=3) is True
+        assert compact_curve_data(engine, batch_size=3) is False
+        
+        inspector = inspect(engine)
+        columns = {c["name"] for c in inspector.get_columns("curve_data")}
+        assert "curve_name" not in columns and "created_at" not in columns
+        assert "ix_curve_data_id" not in {i["name"] for i in inspector.get_indexes("curve_data")}
+        with engine.connect() as conn:
+            rows = conn.exec_driver_sql(
+                "SELECT curves.name, curve_data.quality_flag FROM curve_data "
+                "JOIN curves ON curves.id = curve_data.curve_id ORDER BY curve_data.id"
+            ).all()
+        assert [tuple(row) for row in rows] == [("GR", 0), ("SP", 2), ("GR", 0), ("unknown", 0)]
+        engine.dispose()
+
+
+class TestReadReplicaRouting:
+    """测试读写分离路由（两个 SQLite 文件分别模拟主库和只读副本）"""
+    
+    @pytest.fixture
+    def engines(self, tmp_path):
+        from sqlalchemy import create_engine
+        primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+        replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+        for engine in (primary, replica):
+            Base.metadata.create_all(bind=engine)
+        with replica.begin() as conn:
+            conn.execute(User.__table__.insert().values(
+                username="replica_only", email="replica@example.com", password_hash="x"
+            ))
+        yield primary, replica
+        primary.dispose()
+        replica.dispose()
+    
+    def test_reads_go_to_replica(self, engines):
+        """测试：SELECT 发往副本"""
+        primary, replica = engines
+        db = RoutingSession(bind=primary, replicas=[replica])
+        
+        assert UserCRUD.get_by_username(db, "replica_only") is not None
+        assert UserCRUD.count(db) == 1
+        db.close()
+    
+    def test_write_pins_session_to_primary(self, engines):
+        """测试：写入发往主库，之后的读取也走主库（读己之写）"""
+        primary, replica = engines
+        db = RoutingSession(bind=primary, replicas=[replica])
+        
+        user = UserCRUD.create(db, UserCreate(
+            username="written", email="written@example.com", password="TestPass123!"
+        ))
+        
+        assert UserCRUD.get_by_id(db, user.id).username == "written"
+        assert UserCRUD.get_by_username(db, "replica_only") is None
+        with replica.connect() as conn:
+            assert conn.execute(User.__table__.select()).all()[0].username == "replica_only"
+        db.close()
+    
+    def test_use_primary_override(self, engines):
+        """测试：use_primary 使整个会话读取主库"""
+        primary, replica = engines
+        db = RoutingSession(bind=primary, replicas=[replica])
+        use_primary(db)
+        
+        assert UserCRUD.get_by_username(db, "replica_only") is None
+        db.close()
+    
+    def test_read_primary_header(self):
+        """测试：请求头 X-Read-Primary 使该请求的会话读取主库"""
+        from starlette.requests import Request
+        request = Request({"type": "http", "headers": [(b"x-read-primary", b"1")]})
+        
+        dependency = get_db(request)
+        db = next(dependency)
+        assert db.info.get("use_primary") is True
+        dependency.close()
+
+
+class TestPoolTelemetry:
+    """测试连接池配置与监控"""
+    
+    def test_pool_budget_split_across_workers(self, monkeypatch):
+        """测试：连接预算按工作进程数及每个进程的同步、异步引擎平分"""
+        from app.core.settings import settings
+        monkeypatch.setattr(settings, "WORKERS", 4)
+        monkeypatch.setattr(settings, "DB_POOL_SIZE", 20)
+        monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 20)
+        
+        options = pool_options()
+        
+        assert options["pool_size"] == 2
+        assert options["max_overflow"] == 2
+        per_server = 4 * ENGINES_PER_DATABASE * (options["pool_size"] + options["max_overflow"])
+        assert per_server <= 20 + 20
+    
+    def test_checkout_metrics_and_saturation(self, tmp_path):
+        """测试：记录获取连接次数、超时和饱和度"""
+        from sqlalchemy import create_engine, exc
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}",
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.05
+        )
+        conn = engine.connect()
+        
+        status = pool_status(engine)
+        assert status["checked_out"] == 1
+        assert status["saturation"] == 1.0
+        assert status["checkouts"] == 1
+        
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+        assert pool_status(engine)["timeouts"] == 1
+        assert pool_status(engine)["max_checkout_ms"] >= 50
+        
+        conn.close()
+        assert pool_status(engine)["saturation"] == 0.0
+        engine.dispose()
+
+
+class TestCurvePartitioning:
+    """测试 curve_data 按 log_id 分区的规划（DDL 仅在 MySQL 上执行）"""
+    
+    @pytest.fixture(autouse=True)
+    def partition_settings(self, monkeypatch):
+        from app.core.settings import settings
+        monkeypatch.setattr(settings, "CURVE_PARTITIONING", True)
+        monkeypatch.setattr(settings, "CURVE_PARTITION_SIZE", 10)
+        monkeypatch.setattr(settings, "CURVE_PARTITIONS_AHEAD", 2)
+    
+    def test_partition_definitions(self):
+        """测试：分区覆盖已有测井ID并预留空分区"""
+        uppers = partitioning.partition_bounds(25)
+        
+        assert uppers == [10, 20, 30, 40, 50]
+        assert partitioning.partition_definitions(uppers[:2]) == (
+            "PARTITION p1 VALUES LESS THAN (10), PARTITION p2 VALUES LESS THAN (20), "
+            "PARTITION pmax VALUES LESS THAN MAXVALUE"
+        )
+    
+    def test_droppable_partitions(self, test_db, test_project):
+        """测试：只有已封闭且不含未删除测井的分区可以直接删除"""
+        for log_id in (3, 12, 15, 25):
+            test_db.add(WellLog(id=log_id, filename=f"{log_id}.las", project_id=test_project.id))
+        test_db.commit()
+        WellLogCRUD.delete_cascade(test_db, WellLog.id.in_([3, 12]), soft=True)
+        partitions = [("p1", 10), ("p2", 20), ("p3", 30), ("pmax", None)]
+        
+        assert partitioning.droppable_partitions(test_db, partitions) == ["p1"]
+        
+        WellLogCRUD.delete_cascade(test_db, WellLog.id == 15, soft=True)
+        assert partitioning.droppable_partitions(test_db, partitions) == ["p1", "p2"]
+    
+    def test_noop_on_sqlite(self, test_db):
+        """测试：SQLite 不分区"""
+        engine = test_db.get_bind()
+        
+        assert not partitioning.enabled(engine)
+        assert partitioning.partition_curve_data(engine) is False
+        assert partitioning.drop_purged_partitions(test_db) == []
+        assert partitioning.add_partitions(test_db) == []
+
+
+class TestTunedSQLite:
+    """测试 SQLite 调优模式（WAL、单写连接、只读连接池）"""
+    
+    @pytest.fixture
+    def engines(self, tmp_path):
+        url = f"sqlite:///{tmp_path / 'tuned.db'}"
+        writer = _create_engine(url)
+        Base.metadata.create_all(bind=writer)
+        reader = _create_engine(url, read_only=True)
+        yield writer, reader
+        reader.dispose()
+        writer.dispose()
+    
+    def test_pragmas_on_connect(self, engines):
+        """测试：连接时启用 WAL 与各项 PRAGMA"""
+        from sqlalchemy import text
+        from app.core.settings import settings
+        writer, reader = engines
+        
+        with writer.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == settings.SQLITE_BUSY_TIMEOUT_MS
+            assert conn.execute(text("PRAGMA cache_size")).scalar() == -settings.SQLITE_CACHE_SIZE_KB
+        with reader.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        
+        assert pool_status(writer)["pool_size"] == 1
+        assert pool_status(writer)["max_overflow"] == 0
+    
+    def test_disabled_with_multiple_workers(self, tmp_path, monkeypatch):
+        """测试：多个工作进程时不启用单写连接调优"""
+        from sqlalchemy import text
+        from app.core.settings import settings
+        monkeypatch.setattr(settings, "WORKERS", 4)
+        engine = _create_engine(f"sqlite:///{tmp_path / 'multi.db'}")
+        try:
+            with engine.connect() as conn:
+                assert conn.execute(text("PRAGMA journal_mode")).scalar() != "wal"
+            assert not isinstance(engine.pool, InstrumentedQueuePool)
+        finally:
+            engine.dispose()
+    
+    def test_reader_pool_is_read_only(self, engines):
+        """测试：只读连接无法写入"""
+        from sqlalchemy import exc
+        writer, reader = engines
+        
+        with pytest.raises(exc.OperationalError, match="readonly"):
+            with reader.begin() as conn:
+                conn.execute(User.__table__.insert().values(
+                    username="ro", email="ro@example.com", password_hash="x"
+                ))
+    
+    def test_reads_use_reader_pool(self, engines):
+        """测试：会话读取走只读连接池，写入后读己之写"""
+        writer, reader = engines
+        with writer.begin() as conn:
+            conn.execute(User.__table__.insert().values(
+                username="existing", email="existing@example.com", password_hash="x"
+            ))
+        db = RoutingSession(bind=writer, replicas=[reader])
+        
+        assert UserCRUD.get_by_username(db, "existing") is not None
+        assert pool_status(reader)["checkouts"] == 1
+        assert pool_status(writer)["checked_out"] == 0
+        
+        user = UserCRUD.create(db, UserCreate(
+            username="written", email="written@example.com", password="TestPass123!"
+        ))
+        assert UserCRUD.get_by_id(db, user.id).username == "written"
+        db.close()
+    
+    def test_concurrent_writes_are_serialized(self, engines):
+        """测试：多线程并发写入经单写连接排队，不出现 database is locked"""
+        from concurrent.futures import ThreadPoolExecutor
+        writer, reader = engines
+        
+        def write(i):
+            db = RoutingSession(bind=writer, replicas=[reader])
+            try:
+                db.add(User(username=f"writer{i}", email=f"writer{i}@example.com", password_hash="x"))
+                db.commit()
+                return UserCRUD.count(db)
+            finally:
+                db.close()
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(write, range(40)))
+        
+        with reader.connect() as conn:
+            assert len(conn.execute(User.__table__.select()).all()) == 40
+
+
+class TestSystemCounters:
+    """测试系统计数器（由 CRUD 创建/删除维护）"""
+    
+    def test_counters_follow_create_and_delete(self, test_db, test_user):
+        """测试：创建/删除时计数器与存储字节数同步增减"""
+        project = ProjectCRUD.create(test_db, ProjectCreate(name="Counted"), test_user.id)
+        log = WellLogCRUD.create(test_db, WellLogCreate(
+            filename="a.las", file_path="/a.las", file_size=1000
+        ), project.id)
+        WellLogCRUD.create(test_db, WellLogCreate(
+            filename="b.las", file_path="/b.las", file_size=500
+        ), project.id)
+        
+        counters = SystemCounterCRUD.get_all(test_db)
+        assert counters["projects"] == 1
+        assert counters["logs"] == 2
+        assert counters["bytes_stored"] == 1500
+        
+        WellLogCRUD.delete(test_db, log.id)
+        
+        counters = SystemCounterCRUD.get_all(test_db)
+        assert counters["logs"] == 1
+        assert counters["bytes_stored"] == 500
+    
+    def test_rebuild_matches_tables(self, test_db, test_well_log, test_prediction):
+        """测试：由各表重建计数器（fixtures 直接写表，不经过 CRUD）"""
+        counters = SystemCounterCRUD.rebuild(test_db)
+        
+        assert counters["users"] == 1
+        assert counters["logs"] == 1
+        assert counters["predictions"] == 1
+        assert counters["bytes_stored"] == test_well_log.file_size
+        today = datetime.utcnow().date()
+        growth = SystemCounterCRUD.growth(test_db, 1, today=today)
+        assert growth == [{
+            "date": today.isoformat(),
+            "uploads": 1,
+            "predictions": 1,
+            "bytes_stored": test_well_log.file_size
+        }]
+    
+    def test_growth_reconstructs_bytes_per_day(self, test_db):
+        """测试：每天结束时的存储字节数由当前总量与按天增量倒推"""
+        from app.crud.counters import BYTES_STORED, DAILY_BYTES, DAILY_UPLOADS
+        today = datetime.utcnow().date()
+        yesterday = today - timedelta(days=1)
+        SystemCounterCRUD.add(test_db, BYTES_STORED, 300)
+        SystemCounterCRUD.add_daily(test_db, DAILY_UPLOADS, 2, day=yesterday)
+        SystemCounterCRUD.add_daily(test_db, DAILY_BYTES, 200, day=yesterday)
+        SystemCounterCRUD.add_daily(test_db, DAILY_BYTES, 100, day=today)
+        test_db.commit()
+        
+        growth = SystemCounterCRUD.growth(test_db, 3, today=today)
+        
+        assert [p["bytes_stored"] for p in growth] == [0, 200, 300]
+        assert [p["uploads"] for p in growth] == [0, 2, 0]
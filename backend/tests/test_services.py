@@ -8,8 +8,24 @@ Service 层业务逻辑单元测试
 - PredictionService: 预测管理、模型验证
 """
 
+import asyncio
+import os
 import pytest
-from app.services import UserService, ProjectService, DataService, PredictionService
+import zlib
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.services import (
+    UserService, ProjectService, DataService, PredictionService,
+    InferenceService, BatchScoringService
+)
+from app.services.result_store import ResultStore, curves_from_json, result_store
+from app.core.settings import settings
+from app.crud import PredictionCRUD, CurveDataCRUD, PredictionCacheCRUD, ProjectCRUD, WellLogCRUD
+from app.services.log_purge_service import LogPurger
+from app.models import Base, User, Project, WellLog, CurveData, AIModel, Prediction
 from app.schemas import UserCreate, UserUpdate, ProjectCreate, WellLogCreate, PredictionCreate
 
 
@@ -43,28 +59,38 @@ class TestUserService:
         assert result.get("success") == False
         assert result.get("error") == "user_exists"
     
-    def test_authenticate_user_success(self, test_db, test_user, test_user_data):
+    def _authenticate(self, async_session_factory, username, password):
+        async def run():
+            async with async_session_factory() as db:
+                return await UserService.authenticate_user(db=db, username=username, password=password)
+        return asyncio.run(run())
+    
+    def test_authenticate_user_success(self, async_session_factory, test_user, test_user_data):
         """测试：成功认证用户"""
-        result = UserService.authenticate_user(
-            db=test_db,
-            username=test_user.username,
-            password=test_user_data["password"]
-        )
+        result = self._authenticate(async_session_factory, test_user.username, test_user_data["password"])
         
         assert result.get("success") == True
         assert result.get("token") is not None
     
-    def test_authenticate_user_wrong_password(self, test_db, test_user):
+    def test_authenticate_user_wrong_password(self, async_session_factory, test_user):
         """测试：密码错误时认证失败"""
-        result = UserService.authenticate_user(
-            db=test_db,
-            username=test_user.username,
-            password="WrongPassword"
-        )
+        result = self._authenticate(async_session_factory, test_user.username, "WrongPassword")
         
         assert result.get("success") == False
         assert result.get("error") == "invalid_password"
     
+    def test_authenticate_user_rehashes_outdated_hash(self, test_db, async_session_factory, test_user, test_user_data):
+        """测试：旧参数的密码哈希在登录时按当前参数重新哈希"""
+        from passlib.hash import bcrypt
+        test_user.password_hash = bcrypt.using(rounds=4).hash(test_user_data["password"])
+        test_db.commit()
+        
+        result = self._authenticate(async_session_factory, test_user.username, test_user_data["password"])
+        
+        assert result.get("success") == True
+        test_db.refresh(test_user)
+        assert test_user.password_hash.startswith(f"$2b${settings.BCRYPT_ROUNDS:02d}$")
+    
     def test_get_user_profile(self, test_db, test_user):
         """测试：获取用户资料"""
         result = UserService.get_user_profile(db=test_db, user_id=test_user.id)
@@ -170,6 +196,73 @@ class TestProjectService:
         result = ProjectService.archive_project(db=test_db, project_id=test_project.id)
         
         assert result.get("success") == True
+    
+    def test_delete_project_cascades(self, test_db, test_project, test_well_log, test_curve_data,
+                                     test_prediction, tmp_path, monkeypatch):
+        """测试：删除项目时在一个事务内删除测井、曲线、预测及存储文件"""
+        monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+        upload = tmp_path / "test_log.las"
+        upload.write_text("~A")
+        key = result_store.write(np.arange(5, dtype=np.float64), {"GR": np.ones(5)})
+        test_well_log.file_path = str(upload)
+        test_prediction.result_key = key
+        test_db.commit()
+        project_id, log_id = test_project.id, test_well_log.id
+        
+        result = ProjectService.delete_project(db=test_db, project_id=project_id)
+        
+        assert result.get("success") == True
+        assert result.get("scheduled") == False
+        test_db.expire_all()
+        assert test_db.query(Project).filter(Project.id == project_id).count() == 0
+        assert test_db.query(WellLog).filter(WellLog.id == log_id).count() == 0
+        assert test_db.query(CurveData).filter(CurveData.log_id == log_id).count() == 0
+        assert test_db.query(Prediction).filter(Prediction.log_id == log_id).count() == 0
+        assert not upload.exists()
+        assert not result_store.exists(key)
+    
+    def test_large_project_marked_and_purged_in_background(self, test_db, test_project, test_well_log,
+                                                           test_curve_data, test_prediction, monkeypatch):
+        """测试：大项目与其测井立即标记删除并不可见，由 LogPurger 按批清除后删除项目记录"""
+        monkeypatch.setattr(settings, "CASCADE_DELETE_INLINE_SAMPLES", 0)
+        test_db.add(WellLog(filename="second.las", project_id=test_project.id, sample_count=10))
+        test_db.commit()
+        project_id = test_project.id
+        
+        result = ProjectService.delete_project(db=test_db, project_id=project_id)
+        
+        assert result.get("scheduled") == True
+        test_db.expire_all()
+        assert ProjectCRUD.get_by_id(test_db, project_id) is None
+        assert test_db.query(WellLog).filter(WellLog.project_id == project_id).count() == 0
+        assert test_db.query(Prediction).count() == 0
+        assert test_db.query(CurveData).count() == 10
+        assert ProjectService.delete_project(db=test_db, project_id=project_id)["error"] == "project_not_found"
+        
+        purger = LogPurger(sessionmaker(bind=test_db.get_bind()), batch_rows=3, pause_ms=0)
+        assert purger.run_once() == 2
+        
+        test_db.expire_all()
+        assert test_db.query(Project).filter(
+            Project.id == project_id
+        ).execution_options(include_deleted=True).count() == 0
+        assert test_db.query(CurveData).count() == 0
+        assert WellLogCRUD.get_deleted(test_db) == []
+
+    def test_project_size_counts_curve_rows(self, test_db, test_project, test_well_log,
+                                            test_curve_data, monkeypatch):
+        """测试：按曲线数据实际行数判断是否后台删除，不依赖上报的 sample_count"""
+        monkeypatch.setattr(settings, "CASCADE_DELETE_INLINE_SAMPLES", 9)
+        test_well_log.sample_count = None
+        test_db.commit()
+        
+        assert CurveDataCRUD.count_by_logs(test_db, WellLog.project_id == test_project.id) == 10
+        assert CurveDataCRUD.count_by_logs(test_db, WellLog.project_id == test_project.id, limit=3) == 3
+        
+        result = ProjectService.delete_project(db=test_db, project_id=test_project.id)
+        
+        assert result.get("scheduled") == True
+        assert test_db.query(CurveData).count() == 10
 
 
 class TestDataService:
@@ -230,6 +323,111 @@ class TestDataService:
         result = DataService.delete_log_with_data(db=test_db, log_id=test_well_log.id)
         
         assert result.get("success") == True
+    
+    def test_delete_log_removes_predictions(self, test_db, test_well_log, test_curve_data, test_prediction):
+        """测试：删除测井时一并删除引用它的预测结果"""
+        log_id = test_well_log.id
+        
+        result = DataService.delete_log_with_data(db=test_db, log_id=log_id)
+        
+        assert result.get("success") == True
+        assert test_db.query(CurveData).filter(CurveData.log_id == log_id).count() == 0
+        assert test_db.query(Prediction).filter(Prediction.log_id == log_id).count() == 0
+
+
+class TestLogPurge:
+    """测试大测井的标记删除与后台分批清除"""
+    
+    @pytest.fixture
+    def large_log(self, test_db, test_well_log, test_curve_data, monkeypatch):
+        monkeypatch.setattr(settings, "CASCADE_DELETE_INLINE_SAMPLES", 0)
+        return test_well_log
+    
+    def test_marked_log_is_hidden_from_queries(self, test_db, test_project, large_log, test_prediction):
+        """测试：标记删除后测井立即不可见，预测结果同时删除，曲线留待清除"""
+        log_id = large_log.id
+        
+        result = DataService.delete_log_with_data(db=test_db, log_id=log_id)
+        
+        assert result.get("success") == True
+        assert result.get("scheduled") == True
+        test_db.expire_all()
+        assert WellLogCRUD.get_by_id(test_db, log_id) is None
+        assert WellLogCRUD.get_by_project(test_db, test_project.id) == []
+        assert WellLogCRUD.count_by_project(test_db, test_project.id) == 0
+        assert test_db.query(Prediction).filter(Prediction.log_id == log_id).count() == 0
+        assert test_db.query(CurveData).filter(CurveData.log_id == log_id).count() == 10
+        assert [log.id for log in WellLogCRUD.get_deleted(test_db)] == [log_id]
+    
+    def test_log_size_counts_curve_rows(self, test_db, test_well_log, test_curve_data, monkeypatch):
+        """测试：按曲线数据实际行数判断是否后台清除，不依赖上报的 sample_count"""
+        monkeypatch.setattr(settings, "CASCADE_DELETE_INLINE_SAMPLES", 9)
+        test_well_log.sample_count = 1
+        test_db.commit()
+        
+        result = DataService.delete_log_with_data(db=test_db, log_id=test_well_log.id)
+        
+        assert result.get("scheduled") == True
+        assert test_db.query(CurveData).count() == 10
+    
+    def test_purger_removes_curves_in_batches(self, test_db, large_log):
+        """测试：后台按批删除曲线数据，完成后删除测井记录"""
+        log_id = large_log.id
+        DataService.delete_log_with_data(db=test_db, log_id=log_id)
+        purger = LogPurger(sessionmaker(bind=test_db.get_bind()), batch_rows=3, pause_ms=0)
+        batches = []
+        original = CurveDataCRUD.delete_batch
+        
+        def delete_batch(db, log_id, limit):
+            deleted = original(db, log_id, limit)
+            batches.append(deleted)
+            return deleted
+        
+        with pytest.MonkeyPatch.context() as patch:
+            patch.setattr(CurveDataCRUD, "delete_batch", staticmethod(delete_batch))
+            assert purger.run_once() == 1
+        
+        assert batches == [3, 3, 3, 1, 0]
+        test_db.expire_all()
+        assert test_db.query(CurveData).count() == 0
+        assert WellLogCRUD.get_deleted(test_db) == []
+        assert purger.status(test_db)["pending"] == []
+    
+    def test_purgers_claim_logs(self, test_db, large_log, monkeypatch):
+        """测试：多个进程的清除线程先认领测井，认领者失效后才可接管，进度对所有进程可见"""
+        log_id = large_log.id
+        DataService.delete_log_with_data(db=test_db, log_id=log_id)
+        session_factory = sessionmaker(bind=test_db.get_bind())
+        first = LogPurger(session_factory, batch_rows=3, pause_ms=0)
+        second = LogPurger(session_factory, batch_rows=3, pause_ms=0)
+        original = CurveDataCRUD.delete_batch
+        
+        def delete_one_batch(db, log_id, limit):
+            # 第一批之后停止，模拟进程在清除途中退出
+            first._stop.set()
+            return original(db, log_id, limit)
+        
+        with pytest.MonkeyPatch.context() as patch:
+            patch.setattr(CurveDataCRUD, "delete_batch", staticmethod(delete_one_batch))
+            assert first.purge_log(test_db, WellLogCRUD.get_deleted(test_db)[0]) == False
+        
+        pending = second.status(test_db)["pending"]
+        assert pending[0]["rows_deleted"] == 3
+        assert pending[0]["batches"] == 1
+        assert pending[0]["claimed_by"] is None
+        
+        # 认领仍有效时其他进程跳过该测井
+        assert WellLogCRUD.claim_purge(test_db, log_id, first.worker_id, datetime.utcnow())
+        assert second.run_once() == 0
+        assert second.status(test_db)["pending"][0]["claimed_by"] == first.worker_id
+        
+        # 认领者超时未提交批次后由其他进程接管
+        monkeypatch.setattr(settings, "LOG_PURGE_CLAIM_TIMEOUT_SECONDS", -1)
+        assert second.run_once() == 1
+        test_db.expire_all()
+        assert test_db.query(CurveData).count() == 0
+        assert WellLogCRUD.get_deleted(test_db) == []
+        assert not WellLogCRUD.record_purge_batch(test_db, log_id, first.worker_id, 1)
 
 
 class TestPredictionService:
@@ -292,6 +490,596 @@ class TestPredictionService:
         
         assert result.get("success") == True
         assert result.get("statistics") is not None
+    
+    def test_model_statistics_aggregates_in_database(self, test_db, test_well_log, test_ai_model):
+        """测试：统计包含百分位和失败率"""
+        for ms in range(1, 101):
+            test_db.add(Prediction(
+                log_id=test_well_log.id, model_id=test_ai_model.id, confidence=0.5,
+                execution_time=ms, status="failed" if ms % 10 == 0 else "success"
+            ))
+        test_db.commit()
+        
+        stats = PredictionService.get_model_statistics(test_db, test_ai_model.id)["statistics"]
+        
+        assert stats["total_predictions"] == 100
+        assert stats["avg_execution_time"] == pytest.approx(50.5)
+        assert stats["p50_execution_time"] == 50
+        assert stats["p95_execution_time"] == 95
+        assert stats["failure_rate"] == pytest.approx(0.1)
+    
+    def test_model_history_buckets(self, test_db, test_well_log, test_ai_model):
+        """测试：按小时分桶统计预测数和耗时"""
+        now = datetime(2024, 1, 1, 12, 30)
+        for minutes_ago, ms in [(5, 100), (10, 300), (70, 50)]:
+            test_db.add(Prediction(
+                log_id=test_well_log.id, model_id=test_ai_model.id, confidence=0.5,
+                execution_time=ms, created_at=now - timedelta(minutes=minutes_ago)
+            ))
+        test_db.commit()
+        
+        result = PredictionService.get_model_history(test_db, test_ai_model.id, hours=3, now=now)
+        history = result["history"]
+        
+        assert result.get("success") == True
+        assert history[-1]["bucket_start"] == datetime(2024, 1, 1, 12, 0)
+        assert history[-1]["predictions"] == 2
+        assert history[-1]["p50_execution_time"] == pytest.approx(200.0)
+        assert history[-2]["predictions"] == 1
+        assert sum(b["predictions"] for b in history) == 3
+    
+    def test_model_history_percentiles_match_numpy(self, test_db, test_well_log, test_ai_model):
+        """测试：数据库中按桶计算的百分位与 numpy.percentile 一致"""
+        now = datetime(2024, 1, 1, 12, 30)
+        timings = {0: [5, 1, 9, 3, 7, 11, 2], 1: [40, 10], 2: [8]}
+        for bucket, values in timings.items():
+            for i, ms in enumerate(values):
+                test_db.add(Prediction(
+                    log_id=test_well_log.id, model_id=test_ai_model.id, confidence=0.5,
+                    execution_time=ms, status="failed" if i == 0 else "success",
+                    created_at=datetime(2024, 1, 1, 12 - bucket, 1 + i)
+                ))
+        test_db.add(Prediction(
+            log_id=test_well_log.id, model_id=test_ai_model.id, confidence=0.5,
+            execution_time=None, created_at=datetime(2024, 1, 1, 12, 20)
+        ))
+        test_db.commit()
+        
+        history = PredictionService.get_model_history(test_db, test_ai_model.id, hours=3, now=now)["history"]
+        
+        for bucket, values in timings.items():
+            point = history[-1 - bucket]
+            assert point["failed"] == 1
+            assert point["p50_execution_time"] == pytest.approx(np.percentile(values, 50), abs=0.01)
+            assert point["p95_execution_time"] == pytest.approx(np.percentile(values, 95), abs=0.01)
+        assert history[-1]["predictions"] == 8
+    
+    def test_model_history_bucket_limit(self, test_db, test_ai_model):
+        """测试：分桶数超过上限时拒绝"""
+        result = PredictionService.get_model_history(test_db, test_ai_model.id, hours=24 * 30, bucket_minutes=1)
+        
+        assert result.get("error") == "too_many_buckets"
+
+
+class TestInferenceService:
+    """测试 InferenceService 滑动窗口推理"""
+    
+    def test_window_starts_cover_whole_log(self):
+        """测试：窗口覆盖整条测井且最后一个窗口右对齐"""
+        starts = InferenceService.window_starts(n_samples=1000, window_size=128, overlap=32)
+        
+        assert starts[0] == 0
+        assert starts[-1] == 1000 - 128
+        assert all(b - a <= 96 for a, b in zip(starts, starts[1:]))
+    
+    def test_stream_predict_identity_has_no_seams(self):
+        """测试：恒等模型拼接后与输入完全一致（无接缝）"""
+        data = np.random.RandomState(0).rand(1000, 3).astype(np.float32)
+        chunks = list(InferenceService.stream_predict(
+            lambda batch: batch, data, window_size=128, overlap=32, batch_size=4
+        ))
+        
+        # 结果按深度顺序流式产出
+        offsets = [offset for offset, _ in chunks]
+        assert offsets == sorted(offsets)
+        assert len(chunks) > 1
+        
+        stitched = np.concatenate([chunk for _, chunk in chunks])
+        assert stitched.shape == data.shape
+        assert np.allclose(stitched, data, atol=1e-6)
+    
+    def test_stream_predict_batch_bounded(self):
+        """测试：每次模型调用的窗口数不超过 batch_size"""
+        batch_sizes = []
+        
+        def predict_fn(batch):
+            batch_sizes.append(batch.shape[0])
+            return batch * 2
+        
+        data = np.ones((5000, 2), dtype=np.float32)
+        result = InferenceService.predict_full(
+            predict_fn, data, window_size=64, overlap=16, batch_size=8
+        )
+        
+        assert max(batch_sizes) <= 8
+        assert np.allclose(result, 2.0)
+    
+    def test_load_log_matrix_streams_and_interpolates(self, test_db, test_well_log):
+        """测试：分块读入 memmap，跨块缺失段的插值与整列插值一致"""
+        rng = np.random.RandomState(1)
+        depths = np.arange(100, dtype=np.float64) * 0.5 + 1000.0
+        present = {
+            "GR": rng.rand(100) > 0.3,
+            "SP": np.isin(np.arange(100), [17, 18, 63]),
+            "DEN": np.ones(100, dtype=bool),
+        }
+        present["GR"][:5] = False
+        present["GR"][90:] = False
+        values = {name: rng.rand(100) * 100 for name in present}
+        test_db.add_all(
+            CurveData(log_id=test_well_log.id, curve_name=name, depth=float(depths[i]), value=float(values[name][i]))
+            for name, mask in present.items() for i in np.flatnonzero(mask)
+        )
+        test_db.commit()
+        
+        loaded_depths, names, matrix = InferenceService.load_log_matrix(
+            test_db, test_well_log.id, ["GR", "SP", "CAL"], chunk_rows=7
+        )
+        
+        assert isinstance(matrix, np.memmap)
+        assert names == ["GR", "SP", "CAL"]
+        assert np.allclose(loaded_depths, depths)
+        for j, name in enumerate(["GR", "SP"]):
+            mask = present[name]
+            expected = np.interp(depths, depths[mask], values[name][mask])
+            assert np.allclose(matrix[:, j], expected)
+        assert np.all(matrix[:, 2] == 0.0)
+    
+    def test_model_source_dir_contains_log_transformer(self):
+        """测试：默认模型代码目录包含 LogTransformer 源码"""
+        assert os.path.isfile(os.path.join(settings.MODEL_SOURCE_DIR, "models", "log_transformer.py"))
+    
+    def test_load_saved_log_transformer(self, tmp_path):
+        """测试：通过 load_predictor 加载 save_pretrained 保存的 LogTransformer 目录"""
+        pytest.importorskip("torch")
+        pytest.importorskip("transformers")
+        log_transformer = InferenceService.log_transformer_class()
+        config_class = log_transformer.config_class
+        network = log_transformer(config_class(
+            hidden_size=8, num_hidden_layers=1, num_attention_heads=2,
+            intermediate_size=16, max_position_embeddings=16, num_curves=3
+        ))
+        network.save_pretrained(str(tmp_path))
+        model = AIModel(name="tiny", model_path=str(tmp_path), parameters_json={})
+        
+        predict_fn, window_size = InferenceService.load_predictor(model)
+        output = predict_fn(np.zeros((2, 16, 3), dtype=np.float32))
+        
+        assert window_size == 16
+        assert output.shape == (2, 16, 3)
+    
+    def test_run_prediction_with_predictor(self, test_db, test_curve_data, test_ai_model):
+        """测试：服务端推理并保存预测结果"""
+        log_id = test_curve_data[0].log_id
+        result = PredictionService.run_prediction(
+            db=test_db,
+            log_id=log_id,
+            model_id=test_ai_model.id,
+            parameters={"window_size": 4, "overlap": 2},
+            predict_fn=lambda batch: batch + 1.0
+        )
+        
+        assert result.get("success") == True
+        prediction = result.get("prediction")
+        assert prediction.execution_time is not None
+        assert prediction.parameters_json["window_size"] == 4
+        assert prediction.result_key is not None
+        values = result_store.read(prediction.result_key)["curves"]["GR"]
+        assert len(values) == len(test_curve_data)
+        assert values[0] == pytest.approx(test_curve_data[0].value + 1.0)
+
+
+class TestComparePredictions:
+    """测试多模型预测比较"""
+    
+    def _add_result(self, db, log_id, model_id, depths, values):
+        key = result_store.write(depths, {"GR": values})
+        return PredictionCRUD.create(
+            db,
+            PredictionCreate(log_id=log_id, model_id=model_id, confidence=0.9),
+            result_key=key
+        )
+    
+    def test_compare_uses_latest_per_model(self, test_db, test_well_log, test_ai_model):
+        """测试：最新预测属于其他模型时仍能取到每个模型的最新结果"""
+        other = AIModel(name="Other Model", model_type="regression", status="active")
+        test_db.add(other)
+        test_db.commit()
+        depths = np.arange(0, 50, 1.0)
+        
+        self._add_result(test_db, test_well_log.id, test_ai_model.id, depths, depths * 0)
+        latest = self._add_result(test_db, test_well_log.id, test_ai_model.id, depths, depths)
+        fine = np.arange(0, 50, 0.5)
+        self._add_result(test_db, test_well_log.id, other.id, fine, fine + 2.0)
+        
+        result = PredictionService.compare_predictions(
+            test_db, test_well_log.id, [test_ai_model.id, other.id]
+        )
+        
+        assert result.get("success") == True
+        assert [c["model_id"] for c in result["comparison"]] == [test_ai_model.id, other.id]
+        assert result["comparison"][0]["prediction_id"] == latest.id
+        
+        metrics = result["metrics"]["curves"]["GR"]
+        assert metrics["rmse"][0][1] == pytest.approx(2.0, abs=1e-3)
+        assert metrics["correlation"][0][1] == pytest.approx(1.0, abs=1e-3)
+        assert metrics["difference"][other.id][10] == pytest.approx(2.0, abs=1e-3)
+
+
+class TestResultStore:
+    """测试预测结果二进制存储"""
+    
+    def test_write_and_read_roundtrip(self):
+        """测试：写入后完整读取"""
+        depths = np.arange(0, 100, 0.5)
+        key = result_store.write(depths, {"GR": depths * 2, "RHOB": depths + 1})
+        
+        results = result_store.read(key)
+        assert results["depths"] == pytest.approx(depths.tolist())
+        assert results["curves"]["RHOB"] == pytest.approx((depths + 1).tolist())
+    
+    def test_read_depth_window_decodes_only_overlapping_chunks(self, monkeypatch):
+        """测试：深度窗口读取只解压相交的数据块"""
+        store = ResultStore(result_store.base_dir, chunk_size=100)
+        depths = np.arange(10000, dtype=np.float64)
+        key = store.write(depths, {"GR": depths})
+        
+        decompressed = []
+        original = zlib.decompress
+        monkeypatch.setattr(zlib, "decompress", lambda data: decompressed.append(1) or original(data))
+        results = store.read(key, depth_from=250, depth_to=320)
+        
+        assert results["depths"][0] == 250
+        assert results["depths"][-1] == 320
+        assert len(decompressed) == 2
+    
+    def test_descending_client_depths(self, test_db, test_well_log, test_ai_model):
+        """测试：客户端按降序提交的深度按升序存储，深度窗口读取正确"""
+        depths = np.arange(2000.0, 1000.0, -0.5)
+        converted, curves = curves_from_json({"depths": depths.tolist(), "curves": {"GR": (depths * 2).tolist()}})
+        
+        assert np.all(np.diff(converted) > 0)
+        assert np.allclose(curves["GR"], converted * 2)
+        
+        store = ResultStore(result_store.base_dir, chunk_size=100)
+        key = store.write(depths, {"GR": depths * 2})
+        results = store.read(key, depth_from=1500, depth_to=1510)
+        
+        assert sorted(results["depths"]) == pytest.approx(np.arange(1500.0, 1510.5, 0.5).tolist())
+        assert results["curves"]["GR"] == pytest.approx([d * 2 for d in results["depths"]])
+    
+    def test_same_content_is_stored_once(self):
+        """测试：相同内容得到相同结果键"""
+        depths = np.arange(10, dtype=np.float64)
+        key1 = result_store.write(depths, {"GR": depths})
+        key2 = result_store.write(depths, {"GR": depths})
+        
+        assert key1 == key2
+    
+    def test_rerun_references_result_and_delete_releases_it(self, test_db, test_well_log, test_ai_model):
+        """测试：重新运行引用同一结果文件，最后一个引用删除后文件被清理"""
+        key = result_store.write(np.arange(5, dtype=np.float64), {"GR": np.ones(5)})
+        original = PredictionCRUD.create(
+            test_db,
+            PredictionCreate(log_id=test_well_log.id, model_id=test_ai_model.id, confidence=0.9),
+            result_key=key
+        )
+        rerun = PredictionService.rerun_prediction(test_db, original.id)["new_prediction"]
+        assert rerun.result_key == key
+        
+        details = PredictionService.get_prediction_details(test_db, rerun.id, depth_from=1, depth_to=2)
+        assert details["prediction"]["results"]["depths"] == [1.0, 2.0]
+        
+        PredictionService.delete_prediction(test_db, original.id)
+        assert result_store.exists(key)
+        PredictionService.delete_prediction(test_db, rerun.id)
+        assert not result_store.exists(key)
+
+
+    def test_client_results_written_to_store(self, test_db, test_well_log, test_ai_model):
+        """测试：客户端提交的结果写入结果存储，不再保存 JSON"""
+        result = PredictionService.create_prediction(test_db, PredictionCreate(
+            log_id=test_well_log.id, model_id=test_ai_model.id, confidence=0.9,
+            results_json={"depth": [10.0, 10.5, 11.0], "PRED": [1, 2, 3]}
+        ))
+        prediction = result["prediction"]
+        
+        assert prediction.results_json is None
+        assert result_store.exists(prediction.result_key)
+        assert (prediction.depth_from, prediction.depth_to) == (10.0, 11.0)
+        details = PredictionService.get_prediction_details(test_db, prediction.id, depth_from=10.5)
+        assert details["prediction"]["results"] == {"depths": [10.5, 11.0], "curves": {"PRED": [2.0, 3.0]}}
+    
+    def test_descending_client_results(self, test_db, test_well_log, test_ai_model):
+        """测试：降序深度的客户端结果按深度窗口读取正确"""
+        result = PredictionService.create_prediction(test_db, PredictionCreate(
+            log_id=test_well_log.id, model_id=test_ai_model.id, confidence=0.9,
+            results_json={"depth": [11.0, 10.5, 10.0], "PRED": [3, 2, 1]}
+        ))
+        prediction = result["prediction"]
+        
+        assert (prediction.depth_from, prediction.depth_to) == (10.0, 11.0)
+        details = PredictionService.get_prediction_details(test_db, prediction.id, depth_from=10.5)
+        assert details["prediction"]["results"] == {"depths": [10.5, 11.0], "curves": {"PRED": [2.0, 3.0]}}
+    
+    @pytest.mark.parametrize("results_json", [
+        {"PRED": "abc"},
+        {"PRED": [1, 2], "RHOB": [1, 2, 3]},
+        {"PRED": [[1, 2]]},
+        '{"PRED": [1, 2',
+    ])
+    def test_invalid_client_results(self, test_db, test_well_log, test_ai_model, results_json):
+        """测试：无法转换的结果格式返回 invalid_results"""
+        result = PredictionService.create_prediction(test_db, PredictionCreate(
+            log_id=test_well_log.id, model_id=test_ai_model.id, confidence=0.9, results_json=results_json
+        ))
+        
+        assert result.get("error") == "invalid_results"
+    
+    def test_rerun_legacy_prediction_references_store(self, test_db, test_prediction):
+        """测试：重新运行旧版 JSON 结果的预测时，新记录引用结果存储而不复制 JSON"""
+        rerun = PredictionService.rerun_prediction(test_db, test_prediction.id)["new_prediction"]
+        
+        assert rerun.results_json is None
+        assert result_store.read(rerun.result_key)["curves"] == {"prediction": [1.0, 2.0, 3.0]}
+    
+    def test_migration_moves_results_json_to_store(self, test_db, test_prediction, test_well_log, test_ai_model):
+        """测试：迁移把已有的 results_json 转入结果存储，无法转换的保留原样"""
+        from app.db.migrations import move_results_to_store
+        legacy = Prediction(
+            log_id=test_well_log.id, model_id=test_ai_model.id, confidence=0.5,
+            results_json={"summary": "no curves"}
+        )
+        test_db.add(legacy)
+        test_db.commit()
+        
+        assert move_results_to_store(test_db.get_bind()) == 1
+        assert move_results_to_store(test_db.get_bind()) == 0
+        
+        test_db.expire_all()
+        assert test_prediction.results_json is None
+        assert result_store.read(test_prediction.result_key)["curves"] == {"prediction": [1.0, 2.0, 3.0]}
+        assert legacy.result_key is None
+        assert legacy.results_json == {"summary": "no curves"}
+
+
+class TestPredictionCache:
+    """测试按内容寻址的预测缓存"""
+    
+    def _run(self, db, log_id, model_id, calls):
+        def predict_fn(batch):
+            calls.append(batch.shape[0])
+            return batch + 1.0
+        return PredictionService.run_prediction(
+            db, log_id, model_id,
+            parameters={"window_size": 4, "overlap": 2},
+            predict_fn=predict_fn
+        )
+    
+    def test_repeat_prediction_hits_cache(self, test_db, test_curve_data, test_ai_model):
+        """测试：相同输入再次预测时不调用模型并复用结果"""
+        log_id = test_curve_data[0].log_id
+        calls = []
+        first = self._run(test_db, log_id, test_ai_model.id, calls)
+        n_calls = len(calls)
+        second = self._run(test_db, log_id, test_ai_model.id, calls)
+        
+        assert first.get("cache_hit") == False
+        assert second.get("cache_hit") == True
+        assert len(calls) == n_calls
+        assert second["prediction"].result_key == first["prediction"].result_key
+        assert second["prediction"].id != first["prediction"].id
+    
+    def test_curve_change_invalidates_cache(self, test_db, test_curve_data, test_ai_model):
+        """测试：曲线数据变化后重新推理"""
+        log_id = test_curve_data[0].log_id
+        calls = []
+        self._run(test_db, log_id, test_ai_model.id, calls)
+        assert PredictionCacheCRUD.count(test_db) == 1
+        
+        CurveDataCRUD.create(test_db, "GR", 200.0, 75.0, "good", log_id)
+        assert PredictionCacheCRUD.count(test_db) == 0
+        
+        result = self._run(test_db, log_id, test_ai_model.id, calls)
+        assert result.get("cache_hit") == False
+    
+    def test_lru_eviction(self, test_db, test_project, test_curve_data, test_ai_model, monkeypatch):
+        """测试：超过缓存上限时淘汰最久未使用的缓存项"""
+        monkeypatch.setattr(settings, "PREDICTION_CACHE_MAX_ENTRIES", 1)
+        log_id = test_curve_data[0].log_id
+        other = WellLog(filename="other.las", file_size=1024, project_id=test_project.id, status="completed")
+        test_db.add(other)
+        test_db.commit()
+        test_db.add_all([
+            CurveData(log_id=other.id, curve_name="GR", depth=float(d), value=1.0) for d in range(10)
+        ])
+        test_db.commit()
+        
+        calls = []
+        self._run(test_db, log_id, test_ai_model.id, calls)
+        self._run(test_db, other.id, test_ai_model.id, calls)
+        
+        assert PredictionCacheCRUD.count(test_db) == 1
+        assert self._run(test_db, log_id, test_ai_model.id, calls).get("cache_hit") == False
+
+
+def _double_predict(batch):
+    """可被 pickle 的测试推理函数（供进程池使用）"""
+    return batch * 2.0
+
+
+class TestBatchScoringService:
+    """测试 BatchScoringService 离线批量打分"""
+    
+    def _add_log_with_curve(self, db, project, filename, n_points=20):
+        log = WellLog(filename=filename, file_size=1024, project_id=project.id, status="completed")
+        db.add(log)
+        db.commit()
+        db.add_all([
+            CurveData(log_id=log.id, curve_name="GR", depth=float(d), value=float(d))
+            for d in range(n_points)
+        ])
+        db.commit()
+        return log
+    
+    def test_score_project_and_resume(self, test_db, test_project, test_ai_model):
+        """测试：打分全部测井，重新运行时跳过已完成的测井"""
+        for i in range(3):
+            self._add_log_with_curve(test_db, test_project, f"well_{i}.las")
+        
+        result = BatchScoringService.score_project(
+            test_db, test_project.id, test_ai_model.id,
+            workers=0, parameters={"window_size": 8, "overlap": 2},
+            predict_fn=_double_predict
+        )
+        
+        assert result.get("success") == True
+        assert result.get("scored") == 3
+        predictions = test_db.query(Prediction).filter(Prediction.model_id == test_ai_model.id).all()
+        assert len(predictions) == 3
+        assert all(p.execution_time is not None for p in predictions)
+        
+        # 中断后重新运行：只处理新增的测井
+        self._add_log_with_curve(test_db, test_project, "well_new.las")
+        resumed = BatchScoringService.score_project(
+            test_db, test_project.id, test_ai_model.id,
+            workers=0, parameters={"window_size": 8, "overlap": 2},
+            predict_fn=_double_predict
+        )
+        
+        assert resumed.get("scored") == 1
+        assert resumed.get("skipped") == 3
+    
+    def test_score_project_with_process_pool(self, tmp_path):
+        """测试：使用进程池并行打分（基于文件数据库）"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'batch.db'}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            user = User(username="scorer", email="scorer@example.com", password_hash="x")
+            db.add(user)
+            db.commit()
+            project = Project(name="Batch", owner_id=user.id)
+            model = AIModel(name="Batch Model", model_type="regression", accuracy=0.9, status="active")
+            db.add_all([project, model])
+            db.commit()
+            for i in range(4):
+                self._add_log_with_curve(db, project, f"well_{i}.las")
+            
+            result = BatchScoringService.score_project(
+                db, project.id, model.id, workers=2,
+                parameters={"window_size": 8, "overlap": 2},
+                commit_every=2, predict_fn=_double_predict
+            )
+            
+            assert result.get("success") == True
+            assert result.get("scored") == 4
+            prediction = db.query(Prediction).first()
+            results = result_store.read(prediction.result_key)
+            assert results["curves"]["GR"][3] == pytest.approx(6.0)
+        finally:
+            db.close()
+            engine.dispose()
+
+
+class TestResponseCache:
+    """测试统计/摘要结果缓存及按标签失效"""
+    
+    def test_log_summary_served_from_cache(self, test_db, test_well_log, fake_response_cache):
+        """测试：第二次获取摘要不查询数据库，结果经序列化后与首次一致"""
+        from sqlalchemy import event
+        first = DataService.get_log_summary(db=test_db, log_id=test_well_log.id)
+        
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(test_db.get_bind(), "before_cursor_execute", listener)
+        try:
+            second = DataService.get_log_summary(db=test_db, log_id=test_well_log.id)
+        finally:
+            event.remove(test_db.get_bind(), "before_cursor_execute", listener)
+        
+        assert statements == []
+        assert second == first
+        assert isinstance(second["summary"]["created_at"], datetime)
+        assert fake_response_cache.hits == 1
+    
+    def test_curve_write_invalidates_log_entries(self, test_db, test_well_log):
+        """测试：写入曲线数据后，测井摘要与统计缓存失效"""
+        assert DataService.get_log_summary(test_db, test_well_log.id)["summary"]["data_points_count"] == 0
+        assert DataService.analyze_log_statistics(test_db, test_well_log.id)["statistics"]["total_data_points"] == 0
+        
+        CurveDataCRUD.create(test_db, "GR", 100.0, 55.0, "good", test_well_log.id)
+        
+        assert DataService.get_log_summary(test_db, test_well_log.id)["summary"]["data_points_count"] == 1
+        assert DataService.analyze_log_statistics(test_db, test_well_log.id)["statistics"]["total_data_points"] == 1
+    
+    def test_not_found_is_not_cached(self, test_db, test_project, fake_response_cache):
+        """测试：失败结果不写入缓存"""
+        ProjectService.get_project_statistics(test_db, 99999)
+        
+        assert len(fake_response_cache.backend) == 0
+    
+    def test_log_upload_invalidates_project_statistics(self, test_db, test_project):
+        """测试：上传测井后项目统计失效"""
+        assert ProjectService.get_project_statistics(test_db, test_project.id)["statistics"]["logs_count"] == 0
+        
+        DataService.upload_well_log(test_db, test_project.id, WellLogCreate(
+            filename="cached.las", file_path="/cached.las", file_size=1024
+        ))
+        
+        assert ProjectService.get_project_statistics(test_db, test_project.id)["statistics"]["logs_count"] == 1
+    
+    def test_prediction_write_invalidates_model_statistics(self, test_db, test_well_log, test_ai_model):
+        """测试：新增预测后模型统计失效，其他模型的缓存不受影响"""
+        from app.core.cache import response_cache
+        response_cache.set("model_statistics:99999", {"success": True}, tags=["model:99999"])
+        assert PredictionService.get_model_statistics(test_db, test_ai_model.id)["statistics"]["total_predictions"] == 0
+        
+        PredictionCRUD.create(test_db, PredictionCreate(
+            log_id=test_well_log.id, model_id=test_ai_model.id, confidence=0.9, execution_time=10
+        ))
+        
+        assert PredictionService.get_model_statistics(test_db, test_ai_model.id)["statistics"]["total_predictions"] == 1
+        assert response_cache.get("model_statistics:99999") == {"success": True}
+    
+    def test_memory_backend_ttl_lru_and_tags(self):
+        """测试：内存后端的过期、LRU 淘汰与按标签失效"""
+        from app.core.cache import MemoryCacheBackend
+        now = [0.0]
+        backend = MemoryCacheBackend(max_entries=2, clock=lambda: now[0])
+        backend.set("a", {"v": 1}, ttl=10, tags=["log:1"])
+        backend.set("b", {"v": 2}, ttl=10, tags=["log:2"])
+        backend.get("a")
+        backend.set("c", {"v": 3}, ttl=10, tags=["log:1"])
+        
+        assert backend.get("b") is None
+        backend.get("a")["v"] = 100
+        assert backend.get("a") == {"v": 1}
+        
+        backend.invalidate_tags(["log:1"])
+        assert len(backend) == 0
+        
+        backend.set("d", {"v": 4}, ttl=10)
+        now[0] = 10.0
+        assert backend.get("d") is None
+    
+    def test_memory_backend_disabled_with_multiple_workers(self, monkeypatch):
+        """测试：多个工作进程时内存后端退化为不缓存，避免各进程返回过期数据"""
+        from app.core.cache import MemoryCacheBackend, NullCacheBackend, create_backend
+        
+        assert isinstance(create_backend("memory"), MemoryCacheBackend)
+        monkeypatch.setattr(settings, "WORKERS", 4)
+        assert isinstance(create_backend("memory"), NullCacheBackend)
 
 
 # ==================== 错误场景测试 ====================